@@ -0,0 +1,321 @@
+"""API HTTP/JSON lokal (hanya baca) untuk dashboard wilayah
+
+Menyajikan data pembayar, transaksi dan ringkasan total dari salah satu
+backend (file xlsx dari uts openpyxl.py atau database dari uts mysql.py).
+Setiap respons membawa ETag dan Last-Modified yang diturunkan dari versi
+dataset, sehingga klien yang melakukan polling dengan If-None-Match /
+If-Modified-Since menerima 304 tanpa query ulang.
+
+Jalankan dari folder data:
+    python "uts api.py" --backend xlsx --port 8000
+    python "uts api.py" --backend mysql --lokasi 2
+
+Endpoint:
+    GET /zakat?page=1&per_page=50&nama=ali
+    GET /transaksi?page=1&per_page=50&mulai=2024-01-01&sampai=2024-12-31
+    GET /ringkasan
+"""
+import os
+import sys
+import json
+import hashlib
+import importlib.util
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from email.utils import formatdate, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import urlsplit, parse_qs
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+API_HOST = "127.0.0.1"  # Hanya lokal; pasang reverse proxy jika perlu diakses dari luar
+API_PORT = 8000
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+# Dataset yang dibaca tiap endpoint: menentukan versi (ETag) respons
+ENDPOINT_DATASETS = {
+    "/zakat": ("zakat",),
+    "/transaksi": ("transaksi", "zakat", "beras"),
+    "/ringkasan": ("zakat", "transaksi"),
+}
+
+def load_backend(module_name, filename):
+    """Memuat script backend (nama file mengandung spasi) sebagai modul"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(BASE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def to_json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, Decimal):
+        return float(value)
+    return value
+
+def rows_to_dicts(names, rows):
+    return [{name: to_json_value(value) for name, value in zip(names, row)} for row in rows]
+
+class XlsxSource:
+    """Membaca file xlsx (dan WAL yang belum di-checkpoint) milik uts openpyxl.py
+
+    Versi dataset diambil dari mtime/ukuran file-filenya, karena penghitung
+    versi di dalam proses aplikasi tidak terlihat dari proses API.
+    """
+
+    def __init__(self):
+        self.xlsx = load_backend("uts_openpyxl", "uts openpyxl.py")
+
+    def dataset_files(self, dataset):
+        x = self.xlsx
+        if dataset == "zakat":
+            return [x.ZAKAT_DATA_FILE]
+        if dataset == "beras":
+            return [x.MASTER_BERAS_FILE, x.HARGA_BERAS_FILE]
+        files = [x.TRANSAKSI_ZAKAT_FILE, x.TRANSAKSI_LEDGER_FILE, x.PARTITION_MANIFEST_FILE]
+        manifest = x.load_partition_manifest()
+        if manifest is not None:
+            files.extend(info["file"] for info in manifest["partitions"].values())
+        return files
+
+    def versions(self, datasets):
+        """(penanda versi, waktu ubah terakhir dalam detik epoch)"""
+        stamps = []
+        last_modified = 0
+        files = {f for d in datasets for f in self.dataset_files(d)}
+        files |= {self.xlsx.WAL_FILE, self.xlsx.WAL_CHECKPOINT_FILE, self.xlsx.WORKBOOK_FILE}
+        for path in sorted(files):
+            if os.path.exists(path):
+                stat = os.stat(path)
+                stamps.append((path, stat.st_mtime_ns, stat.st_size))
+                last_modified = max(last_modified, stat.st_mtime)
+        return stamps, last_modified
+
+    def zakat_page(self, offset, limit, nama=None):
+        rows = self.xlsx.iter_file_rows(self.xlsx.ZAKAT_DATA_FILE)
+        try:
+            if nama:
+                keyword = nama.casefold()
+                rows = (row for row in rows if keyword in str(row[1]).casefold())
+            return rows_to_dicts(self.xlsx.Zakat.FIELDS, islice(rows, offset, offset + limit))
+        finally:
+            rows.close()
+
+    def transaksi_page(self, offset, limit, mulai=None, sampai=None):
+        x = self.xlsx
+        zakat = x.read_batch(x.ZAKAT_DATA_FILE, x.Zakat)
+        nama = dict(zip(zakat.column("id"), zakat.column("nama")))
+        beras = x.read_batch(x.MASTER_BERAS_FILE, x.Beras)
+        nama_beras = dict(zip(beras.column("id"), beras.column("nama_beras")))
+        rows = x.iter_transaksi_rows(mulai, sampai)
+        try:
+            page = [(row[0], row[1], nama.get(row[1]), row[2], nama_beras.get(row[2])) + tuple(row[3:6])
+                    for row in islice(rows, offset, offset + limit)]
+        finally:
+            rows.close()
+        return rows_to_dicts(("id", "id_zakat", "nama", "id_beras", "nama_beras",
+                              "jumlah_beras", "total_harga", "tanggal"), page)
+
+    def summary(self):
+        x = self.xlsx
+        zakat = x.read_batch(x.ZAKAT_DATA_FILE, x.Zakat)
+        per_jenis = {}
+        for jenis, jumlah in zip(zakat.column("jenis_zakat"), zakat.column("jumlah")):
+            entry = per_jenis.setdefault(str(jenis).strip().capitalize(), {"pembayar": 0, "jumlah": 0.0})
+            entry["pembayar"] += 1
+            entry["jumlah"] += float(jumlah or 0)
+        transaksi = {"jumlah_transaksi": 0, "total_beras_kg": 0.0, "total_harga": 0.0}
+        rows = x.iter_transaksi_rows()
+        try:
+            for row in rows:
+                transaksi["jumlah_transaksi"] += 1
+                transaksi["total_beras_kg"] += float(row[3] or 0)
+                transaksi["total_harga"] += float(row[4] or 0)
+        finally:
+            rows.close()
+        return {"pembayar": len(zakat), "per_jenis_zakat": per_jenis, "transaksi": transaksi}
+
+class MySQLSource:
+    """Membaca database uts mysql.py; versi dari tabel data_versi
+
+    Hanya data lokasi SITE_ID yang disajikan, seperti menu uts mysql.py.
+    """
+
+    def __init__(self, lokasi=None):
+        self.db = load_backend("uts_mysql", "uts mysql.py")
+        if lokasi is not None:
+            self.db.SITE_ID = lokasi
+
+    def query(self, sql, params=None):
+        conn = self.db.create_read_connection()  # Replika jika dikonfigurasi, agar dashboard tidak membebani meja
+        if not conn:
+            raise ConnectionError("Tidak bisa terhubung ke MySQL")
+        try:
+            return self.db.fetch_batch(conn, sql, params)
+        finally:
+            conn.close()
+
+    def versions(self, datasets):
+        marks = ", ".join(["%s"] * len(datasets))
+        batch = self.query(f"""SELECT dataset, versi, UNIX_TIMESTAMP(diubah_pada) AS diubah
+                           FROM data_versi WHERE dataset IN ({marks}) ORDER BY dataset""", datasets)
+        stamps = list(batch.rows())
+        last_modified = max((float(row[2]) for row in stamps), default=0)
+        return stamps, last_modified
+
+    def zakat_page(self, offset, limit, nama=None):
+        sql = "SELECT id, nama, jenis_zakat, jumlah, tanggal FROM zakat_data WHERE id_lokasi = %s"
+        params = [self.db.SITE_ID]
+        if nama:
+            sql += " AND nama LIKE %s"
+            params.append(self.db.like_pattern(nama))
+        sql += " ORDER BY id LIMIT %s OFFSET %s"
+        batch = self.query(sql, params + [limit, offset])
+        return rows_to_dicts(batch.names, batch.rows())
+
+    def transaksi_page(self, offset, limit, mulai=None, sampai=None):
+        sql = """SELECT tz.id, tz.id_zakat, z.nama, tz.id_beras, mb.nama_beras,
+                tz.jumlah_beras, tz.total_harga, tz.tanggal
+                FROM transaksi_zakat tz
+                JOIN zakat_data z ON tz.id_zakat = z.id AND z.id_lokasi = tz.id_lokasi
+                JOIN master_beras mb ON tz.id_beras = mb.id"""
+        conditions, params = ["tz.id_lokasi = %s"], [self.db.SITE_ID]
+        if mulai:
+            conditions.append("tz.tanggal >= %s")
+            params.append(mulai)
+        if sampai:
+            conditions.append("tz.tanggal <= %s")
+            params.append(sampai)
+        sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY tz.id LIMIT %s OFFSET %s"
+        batch = self.query(sql, params + [limit, offset])
+        return rows_to_dicts(batch.names, batch.rows())
+
+    def summary(self):
+        per_jenis = self.query("""SELECT jenis_zakat, COUNT(*) AS pembayar, SUM(jumlah) AS jumlah
+                               FROM zakat_data WHERE id_lokasi = %s GROUP BY jenis_zakat""",
+                               [self.db.SITE_ID])
+        transaksi = self.query("""SELECT COUNT(*) AS jumlah_transaksi,
+                               COALESCE(SUM(jumlah_beras), 0) AS total_beras_kg,
+                               COALESCE(SUM(total_harga), 0) AS total_harga FROM transaksi_zakat
+                               WHERE id_lokasi = %s""", [self.db.SITE_ID])
+        return {
+            "pembayar": sum(per_jenis.column("pembayar")),
+            "per_jenis_zakat": {jenis: {"pembayar": count, "jumlah": to_json_value(jumlah)}
+                                for jenis, count, jumlah in per_jenis.rows()},
+            "transaksi": rows_to_dicts(transaksi.names, transaksi.rows())[0],
+        }
+
+def make_handler(source):
+    class ApiHandler(BaseHTTPRequestHandler):
+        server_version = "ZakatAPI/1.0"
+
+        def do_GET(self):
+            self.handle_request(send_body=True)
+
+        def do_HEAD(self):
+            self.handle_request(send_body=False)
+
+        def do_POST(self):
+            self.send_json(405, {"error": "API hanya baca"}, send_body=True)
+
+        do_PUT = do_PATCH = do_DELETE = do_POST
+
+        def handle_request(self, send_body):
+            url = urlsplit(self.path)
+            path = url.path.rstrip("/") or "/"
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            if path == "/":
+                self.send_json(200, {"endpoint": sorted(ENDPOINT_DATASETS)}, send_body=send_body)
+                return
+            if path not in ENDPOINT_DATASETS:
+                self.send_json(404, {"error": f"Endpoint {path} tidak ada"}, send_body=send_body)
+                return
+            try:
+                page = max(int(params.get("page", 1)), 1)
+                per_page = min(max(int(params.get("per_page", DEFAULT_PER_PAGE)), 1), MAX_PER_PAGE)
+            except ValueError:
+                self.send_json(400, {"error": "page dan per_page harus angka"}, send_body=send_body)
+                return
+            try:
+                # Versi dihitung sebelum data dibaca: permintaan bersyarat
+                # yang cocok dijawab 304 tanpa menyentuh data sama sekali
+                stamps, last_modified = source.versions(ENDPOINT_DATASETS[path])
+                etag = '"' + hashlib.sha1(json.dumps([path, sorted(params.items()), stamps],
+                                                     default=str).encode("utf-8")).hexdigest() + '"'
+                headers = {"ETag": etag, "Cache-Control": "no-cache"}
+                if last_modified:
+                    headers["Last-Modified"] = formatdate(last_modified, usegmt=True)
+                if self.not_modified(etag, last_modified):
+                    self.send_response(304)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.end_headers()
+                    return
+
+                offset = (page - 1) * per_page
+                if path == "/zakat":
+                    rows = source.zakat_page(offset, per_page + 1, params.get("nama"))
+                elif path == "/transaksi":
+                    rows = source.transaksi_page(offset, per_page + 1, params.get("mulai"), params.get("sampai"))
+                else:
+                    self.send_json(200, source.summary(), headers, send_body)
+                    return
+                body = {"page": page, "per_page": per_page, "has_next": len(rows) > per_page,
+                        "data": rows[:per_page]}
+                self.send_json(200, body, headers, send_body)
+            except Exception as e:
+                self.send_json(500, {"error": str(e)}, send_body=send_body)
+
+        def not_modified(self, etag, last_modified):
+            if_none_match = self.headers.get("If-None-Match")
+            if if_none_match is not None:
+                # If-None-Match lebih diutamakan daripada If-Modified-Since (RFC 9110)
+                return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+            if_modified_since = self.headers.get("If-Modified-Since")
+            if if_modified_since and last_modified:
+                try:
+                    since = parsedate_to_datetime(if_modified_since).timestamp()
+                except (TypeError, ValueError):
+                    return False
+                return int(last_modified) <= since
+            return False
+
+        def send_json(self, status, body, headers=None, send_body=True):
+            payload = json.dumps(body, default=to_json_value).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            if send_body:
+                self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            sys.stderr.write(f"[{datetime.now(timezone.utc):%Y-%m-%d %H:%M:%S}] {format % args}\n")
+
+    return ApiHandler
+
+def serve(backend="xlsx", host=API_HOST, port=API_PORT, lokasi=None):
+    """Menjalankan server API sampai dihentikan dengan Ctrl+C"""
+    source = MySQLSource(lokasi) if backend == "mysql" else XlsxSource()
+    server = ThreadingHTTPServer((host, port), make_handler(source))
+    print(f"API zakat ({backend}) berjalan di http://{host}:{port}/ - tekan Ctrl+C untuk berhenti")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    backend = args[args.index("--backend") + 1] if "--backend" in args else "xlsx"
+    port = int(args[args.index("--port") + 1]) if "--port" in args else API_PORT
+    lokasi = int(args[args.index("--lokasi") + 1]) if "--lokasi" in args else None
+    if backend not in ("xlsx", "mysql"):
+        print("Error: --backend harus 'xlsx' atau 'mysql'")
+        sys.exit(1)
+    serve(backend, port=port, lokasi=lokasi)
@@ -0,0 +1,314 @@
+"""Uji beban: mensimulasikan banyak meja kasir yang bekerja bersamaan
+
+N worker (thread atau proses) menjalankan campuran operasi yang realistis
+(add_zakat, add_transaksi_zakat, view_*) terhadap salah satu backend, lalu
+dilaporkan throughput, latensi p50/p95/p99, lock wait, error dan jumlah
+tulisan yang hilang (berhasil dilaporkan tetapi tidak ada di data akhir).
+Uji gagal (exit code 1) jika ada ID ganda atau jumlah baris akhir tidak sama
+dengan data awal ditambah tulisan yang berhasil.
+
+Backend xlsx dijalankan di folder sementara; backend MySQL memakai database
+terpisah (LOADTEST_DB) pada server MySQL lokal, sehingga data asli aman.
+
+    python "uts loadtest.py" --backend xlsx --workers 8 --ops 50
+    python "uts loadtest.py" --backend mysql --workers 32 --ops 200 --mode process
+    python "uts loadtest.py" --backend both
+"""
+import os
+import sys
+import time
+import random
+import shutil
+import tempfile
+import builtins
+import threading
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+LOADTEST_DB = "zakat_loadtest"
+SEED_ZAKAT = 20  # Pembayar awal yang dipakai oleh transaksi
+
+# Bobot operasi per meja: lebih banyak transaksi daripada pendaftaran, sesekali melihat daftar
+OPERATION_MIX = (("add_zakat", 3), ("add_transaksi_zakat", 4), ("view_master_beras", 1), ("view_transaksi_zakat", 2))
+
+_backends = {}
+
+def load_backend(name):
+    """Memuat dan menyiapkan modul backend (sekali per proses)"""
+    if name not in _backends:
+        filename = "uts mysql.py" if name == "mysql" else "uts openpyxl.py"
+        spec = importlib.util.spec_from_file_location(f"uts_{name}", os.path.join(BASE_DIR, filename))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        if name == "mysql":
+            module.DATABASE_NAME = LOADTEST_DB
+        _backends[name] = module
+    return _backends[name]
+
+class OutputCounter:
+    """Pengganti stdout selama uji: membuang output, menghitung pesan error dan file terkunci"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.errors = 0
+        self.locked = 0
+
+    def write(self, text):
+        if "Error" in text or "Gagal" in text:
+            with self.lock:
+                self.errors += 1
+                if "sedang digunakan" in text or "lock" in text.lower():
+                    self.locked += 1
+        return len(text)
+
+    def flush(self):
+        pass
+
+def run_operation(backend, op, run_id, worker, seq, zakat_ids, beras_id):
+    """Menjalankan satu operasi; mengembalikan (berhasil, nama yang ditulis)"""
+    if op == "add_zakat":
+        nama = f"LT{run_id}-{worker}-{seq}"
+        return bool(backend.add_zakat(nama, "Fitrah", 2.5, "2026-03-01")), nama
+    if op == "add_transaksi_zakat":
+        return bool(backend.add_transaksi_zakat(random.choice(zakat_ids), beras_id, 2.5, "2026-03-01")), None
+    getattr(backend, op)()  # View: input() dijawab "q" sehingga hanya halaman pertama yang dirender
+    return True, None
+
+def run_worker(task):
+    """Satu meja kasir: menjalankan ops operasi dan mencatat latensi tiap operasi"""
+    backend_name, run_id, worker, ops, zakat_ids, beras_id, seed = task
+    backend = load_backend(backend_name)
+    rng = random.Random(seed)
+    names, weights = zip(*OPERATION_MIX)
+    latencies = {name: [] for name in names}
+    failures = 0
+    exceptions = 0
+    written = []
+    transaksi_ok = 0
+    for seq in range(ops):
+        op = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            ok, nama = run_operation(backend, op, run_id, worker, seq, zakat_ids, beras_id)
+        except Exception:
+            ok, nama = False, None
+            exceptions += 1
+        latencies[op].append(time.perf_counter() - start)
+        if not ok:
+            failures += 1
+        elif nama:
+            written.append(nama)
+        elif op == "add_transaksi_zakat":
+            transaksi_ok += 1
+    return {"latencies": latencies, "failures": failures, "exceptions": exceptions,
+            "written": written, "transaksi_ok": transaksi_ok}
+
+def run_worker_process(task):
+    """Versi proses: stdout dan input() disiapkan di dalam proses anak"""
+    counter = OutputCounter()
+    sys.stdout = counter
+    builtins.input = lambda prompt="": "q"
+    result = run_worker(task)
+    result["output_errors"], result["output_locked"] = counter.errors, counter.locked
+    return result
+
+# ----------------------------------------------
+# Persiapan dan pemeriksaan data per backend
+# ----------------------------------------------
+
+def prepare(backend_name, run_id):
+    """Menyiapkan data awal; mengembalikan (zakat_ids, beras_id, jumlah transaksi awal)"""
+    backend = load_backend(backend_name)
+    if backend_name == "mysql":
+        if not backend.create_tables():
+            raise RuntimeError("Database uji beban tidak bisa disiapkan")
+        backend.add_beras("Beras Uji Beban", 12000)
+        conn = backend.create_database_connection()
+        try:
+            beras_id = backend.fetch_batch(conn, "SELECT MAX(id) AS id FROM master_beras").column("id")[0]
+            for i in range(SEED_ZAKAT):
+                backend.add_zakat(f"LT{run_id}-seed-{i}", "Fitrah", 2.5, "2026-03-01")
+            zakat_ids = backend.fetch_batch(conn, "SELECT id FROM zakat_data WHERE nama LIKE %s",
+                                            (f"LT{run_id}-seed-%",)).column("id")
+        finally:
+            conn.close()
+    else:
+        backend.initialize_files()
+        backend.add_beras("Beras Uji Beban", 12000)
+        beras_id = backend.get_next_id(backend.MASTER_BERAS_FILE) - 1
+        for i in range(SEED_ZAKAT):
+            backend.add_zakat(f"LT{run_id}-seed-{i}", "Fitrah", 2.5, "2026-03-01")
+        zakat_ids = list(range(1, SEED_ZAKAT + 1))
+    return list(zakat_ids), beras_id, count_transaksi(backend_name)
+
+def transaksi_ids(backend_name):
+    """ID semua transaksi yang tersimpan (list, agar duplikat ikut terhitung)"""
+    backend = load_backend(backend_name)
+    if backend_name == "mysql":
+        conn = backend.create_database_connection()
+        try:
+            return backend.fetch_batch(conn, "SELECT id FROM transaksi_zakat").column("id")
+        finally:
+            conn.close()
+    return list(backend.read_transaksi_batch().column("id"))
+
+def count_transaksi(backend_name):
+    return len(transaksi_ids(backend_name))
+
+def stored_zakat(backend_name, run_id):
+    """(ID, nama) pembayar dari uji ini yang benar-benar tersimpan (list, agar duplikat ikut terhitung)"""
+    backend = load_backend(backend_name)
+    prefix = f"LT{run_id}-"
+    if backend_name == "mysql":
+        conn = backend.create_database_connection()
+        try:
+            batch = backend.fetch_batch(conn, "SELECT id, nama FROM zakat_data WHERE nama LIKE %s",
+                                        (prefix + "%",))
+        finally:
+            conn.close()
+    else:
+        backend.checkpoint_wal()
+        batch = backend.read_batch(backend.ZAKAT_DATA_FILE, backend.Zakat)
+    return [(id, nama) for id, nama in zip(batch.column("id"), batch.column("nama"))
+            if str(nama).startswith(prefix)]
+
+def duplicates(values):
+    return len(values) - len(set(values))
+
+def check_report(report):
+    """Pelanggaran yang membuat uji gagal: ID ganda atau jumlah baris akhir yang tidak cocok"""
+    problems = []
+    for dataset in ("zakat", "transaksi"):
+        if report[f"duplicate_id_{dataset}"]:
+            problems.append(f"{report[f'duplicate_id_{dataset}']} ID {dataset} ganda")
+        expected, actual = report[f"rows_{dataset}"]
+        if expected != actual:
+            problems.append(f"baris {dataset} {actual}, seharusnya {expected}")
+    return problems
+
+def mysql_lock_waits():
+    """Jumlah row lock wait InnoDB sejak server berjalan"""
+    backend = load_backend("mysql")
+    conn = backend.create_database_connection()
+    try:
+        status = backend.fetch_batch(conn, "SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_waits'")
+        return int(status.columns[1][0]) if status else 0
+    finally:
+        conn.close()
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(p / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+# ----------------------------------------------
+# Menjalankan uji dan laporan
+# ----------------------------------------------
+
+def run_load_test(backend_name, workers=8, ops=50, mode="thread"):
+    """Menjalankan satu uji beban dan mencetak laporannya"""
+    workdir = None
+    original_cwd = os.getcwd()
+    original_stdout, original_input = sys.stdout, builtins.input
+    if backend_name == "xlsx":
+        workdir = tempfile.mkdtemp(prefix="zakat_loadtest_")
+        os.chdir(workdir)
+    try:
+        run_id = int(time.time())
+        sys.stdout = OutputCounter()  # Pesan "berhasil ditambahkan" dari data awal tidak perlu tampil
+        try:
+            zakat_ids, beras_id, transaksi_awal = prepare(backend_name, run_id)
+        finally:
+            sys.stdout = original_stdout
+        lock_awal = mysql_lock_waits() if backend_name == "mysql" else 0
+        tasks = [(backend_name, run_id, worker, ops, zakat_ids, beras_id, worker * 7919) for worker in range(workers)]
+
+        counter = OutputCounter()
+        start = time.perf_counter()
+        if mode == "process":
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(run_worker_process, tasks))
+        else:
+            sys.stdout = counter
+            builtins.input = lambda prompt="": "q"
+            try:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    results = list(executor.map(run_worker, tasks))
+            finally:
+                sys.stdout, builtins.input = original_stdout, original_input
+        elapsed = time.perf_counter() - start
+
+        written = [nama for r in results for nama in r["written"]]
+        stored_rows = stored_zakat(backend_name, run_id)
+        stored = [nama for _, nama in stored_rows]
+        stored_set = set(stored)
+        transaksi_ok = sum(r["transaksi_ok"] for r in results)
+        transaksi_akhir = transaksi_ids(backend_name)
+        report = {
+            "backend": backend_name, "mode": mode, "workers": workers, "elapsed": elapsed,
+            "latencies": {name: sorted(v for r in results for v in r["latencies"][name]) for name, _ in OPERATION_MIX},
+            "failures": sum(r["failures"] for r in results),
+            "exceptions": sum(r["exceptions"] for r in results),
+            "output_errors": counter.errors + sum(r.get("output_errors", 0) for r in results),
+            "lost_zakat": sum(1 for nama in written if nama not in stored_set),
+            "duplicate_zakat": len(stored) - len(stored_set),
+            "lost_transaksi": max(transaksi_ok - (len(transaksi_akhir) - transaksi_awal), 0),
+            "duplicate_id_zakat": duplicates([id for id, _ in stored_rows]),
+            "duplicate_id_transaksi": duplicates(transaksi_akhir),
+            "rows_zakat": (SEED_ZAKAT + len(written), len(stored_rows)),
+            "rows_transaksi": (transaksi_awal + transaksi_ok, len(transaksi_akhir)),
+        }
+        if backend_name == "mysql":
+            report["lock_waits"] = mysql_lock_waits() - lock_awal
+        else:
+            report["lock_waits"] = counter.locked + sum(r.get("output_locked", 0) for r in results)
+        print_report(report)
+        problems = check_report(report)
+        if problems:
+            raise AssertionError(f"Uji beban {backend_name} gagal: " + "; ".join(problems))
+        return report
+    finally:
+        sys.stdout, builtins.input = original_stdout, original_input
+        os.chdir(original_cwd)
+        if workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+def print_report(report):
+    total_ops = sum(len(v) for v in report["latencies"].values())
+    print(f"\n=== Uji beban: backend {report['backend']} ({report['workers']} {report['mode']}) ===")
+    print(f"Operasi: {total_ops} dalam {report['elapsed']:.2f} detik "
+          f"-> {total_ops / report['elapsed'] if report['elapsed'] else 0:.1f} operasi/detik")
+    print(f"{'Operasi':<22} {'Jumlah':>7} {'p50 (ms)':>10} {'p95 (ms)':>10} {'p99 (ms)':>10}")
+    print("-" * 63)
+    for name, values in report["latencies"].items():
+        print(f"{name:<22} {len(values):>7} {percentile(values, 50) * 1000:>10.1f} "
+              f"{percentile(values, 95) * 1000:>10.1f} {percentile(values, 99) * 1000:>10.1f}")
+    print("-" * 63)
+    print(f"Lock wait            : {report['lock_waits']}")
+    print(f"Operasi gagal        : {report['failures']} (exception: {report['exceptions']}, "
+          f"pesan error: {report['output_errors']})")
+    print(f"Tulisan hilang       : {report['lost_zakat']} zakat, {report['lost_transaksi']} transaksi")
+    print(f"Nama duplikat        : {report['duplicate_zakat']}")
+    print(f"ID duplikat          : {report['duplicate_id_zakat']} zakat, {report['duplicate_id_transaksi']} transaksi")
+    print(f"Baris akhir          : zakat {report['rows_zakat'][1]}/{report['rows_zakat'][0]}, "
+          f"transaksi {report['rows_transaksi'][1]}/{report['rows_transaksi'][0]} (tersimpan/seharusnya)")
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    def option(name, default):
+        return args[args.index(name) + 1] if name in args else default
+    backend = option("--backend", "xlsx")
+    mode = option("--mode", "thread")
+    if backend not in ("xlsx", "mysql", "both") or mode not in ("thread", "process"):
+        print("Penggunaan: --backend xlsx|mysql|both --mode thread|process --workers N --ops N")
+        sys.exit(1)
+    passed = True
+    for name in (("xlsx", "mysql") if backend == "both" else (backend,)):
+        try:
+            run_load_test(name, int(option("--workers", 8)), int(option("--ops", 50)), mode)
+        except AssertionError as e:
+            print(f"GAGAL: {e}")
+            passed = False
+    sys.exit(0 if passed else 1)
@@ -1,5 +1,14 @@
+import os
 import re
+import sys
+import json
+import shutil
+import time
 import datetime
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 try:
     import mysql.connector
 except ImportError:
@@ -57,12 +66,161 @@ def validate_non_empty(prompt):
             return value
         print("Input tidak boleh kosong. Silakan coba lagi.")
 
+# ==============================================
+# MODEL DATA (RECORD DAN BATCH KOLOM)
+# ==============================================
+
+class Zakat:
+    """Satu baris zakat_data (tanpa dict per baris)"""
+    __slots__ = ("id", "nama", "jenis_zakat", "jumlah", "tanggal")
+    FIELDS = __slots__
+
+    def __init__(self, id, nama, jenis_zakat, jumlah, tanggal):
+        self.id = id
+        self.nama = nama
+        self.jenis_zakat = jenis_zakat
+        self.jumlah = jumlah
+        self.tanggal = tanggal
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"Zakat(id={self.id}, nama={self.nama!r})"
+
+class Beras:
+    """Satu baris master_beras"""
+    __slots__ = ("id", "nama_beras", "harga_per_kg")
+    FIELDS = __slots__
+
+    def __init__(self, id, nama_beras, harga_per_kg):
+        self.id = id
+        self.nama_beras = nama_beras
+        self.harga_per_kg = harga_per_kg
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"Beras(id={self.id}, nama_beras={self.nama_beras!r})"
+
+class Transaksi:
+    """Satu baris transaksi_zakat"""
+    __slots__ = ("id", "id_zakat", "id_beras", "jumlah_beras", "total_harga", "tanggal")
+    FIELDS = __slots__
+
+    def __init__(self, id, id_zakat, id_beras, jumlah_beras, total_harga, tanggal):
+        self.id = id
+        self.id_zakat = id_zakat
+        self.id_beras = id_beras
+        self.jumlah_beras = jumlah_beras
+        self.total_harga = total_harga
+        self.tanggal = tanggal
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"Transaksi(id={self.id}, id_zakat={self.id_zakat}, id_beras={self.id_beras})"
+
+FETCH_ROWS = 1000  # Baris per fetchmany saat mengisi RecordBatch
+
+class RecordBatch:
+    """Kumpulan baris yang disimpan per kolom (satu list per kolom)
+
+    Dipakai untuk listing, ekspor dan laporan supaya tidak membuat satu
+    dict/objek per baris.
+    """
+    __slots__ = ("names", "columns")
+
+    def __init__(self, names, columns=None):
+        self.names = tuple(names)
+        self.columns = columns if columns is not None else [[] for _ in self.names]
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        batch = cls(names)
+        appenders = [col.append for col in batch.columns]
+        for row in rows:
+            for append, value in zip(appenders, row):
+                append(value)
+        return batch
+
+    @classmethod
+    def from_cursor(cls, cursor, size=None):
+        """Membuat batch dari cursor (non-dictionary) yang sudah dieksekusi
+
+        Baris diambil per FETCH_ROWS dengan fetchmany langsung ke list kolom,
+        jadi seluruh hasil tidak pernah ada dua kali (list tuple + kolom).
+        """
+        batch = cls([desc[0] for desc in cursor.description])
+        appenders = [col.append for col in batch.columns]
+        size = size or FETCH_ROWS
+        while True:
+            rows = cursor.fetchmany(size)
+            if not rows:
+                return batch
+            for row in rows:
+                for append, value in zip(appenders, row):
+                    append(value)
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, name):
+        return self.columns[self.names.index(name)]
+
+    def rows(self):
+        """Iterasi baris sebagai tuple (dibuat saat dibutuhkan)"""
+        return zip(*self.columns)
+
+    def records(self, record_cls):
+        """Iterasi baris sebagai record __slots__ (Zakat/Beras/Transaksi)"""
+        cols = [self.column(f) for f in record_cls.FIELDS]
+        for values in zip(*cols):
+            yield record_cls(*values)
+
+    def to_dict(self):
+        """Dict kolom -> list, siap untuk pandas.DataFrame"""
+        return dict(zip(self.names, self.columns))
+
 # ==============================================
 # FUNGSI DATABASE DAN TABEL
 # ==============================================
 
-def create_database_connection(database="zakat"):
+DATABASE_NAME = "zakat"  # Bisa diganti, misalnya ke database uji beban
+
+# Multi-lokasi: setiap masjid/titik kumpul punya id_lokasi sendiri. zakat_data
+# dan transaksi_zakat dipartisi per musim (RANGE YEAR(tanggal)) lalu per lokasi
+# (subpartisi KEY id_lokasi). Setiap query memfilter id_lokasi (ditambah
+# rentang tanggal jika ada), sehingga MySQL hanya membuka partisi lokasi dan
+# musim yang relevan dan operasi massal satu lokasi tidak menyentuh lokasi lain.
+SITE_ID = 1              # Lokasi meja ini; bisa diganti dengan --lokasi N
+SITE_SUBPARTITIONS = 8   # Subpartisi lokasi per musim
+PARTITIONED_TABLES = ("zakat_data", "transaksi_zakat")
+
+def nama_lokasi(nama):
+    """Nama file/folder hasil ekspor untuk lokasi ini (lokasi 1 memakai nama lama)"""
+    if SITE_ID == 1:
+        return nama
+    dasar, ext = os.path.splitext(nama)
+    return f"{dasar}_lokasi{SITE_ID}{ext}"
+
+def create_database_connection(database=None):
     """Membuat koneksi ke database MySQL"""
+    database = database or DATABASE_NAME
     try:
         connection = mysql.connector.connect(
             host="localhost",
@@ -75,6 +233,283 @@ def create_database_connection(database="zakat"):
         print(f"Error connecting to MySQL: {e}")
         return None
 
+# Sesi MySQL jangka panjang: satu koneksi per thread (dan per proses) yang
+# dipakai ulang antar pemanggilan fungsi, dengan cache prepared statement
+# server-side per teks SQL. Statement cukup di-parse server sekali; pemanggilan
+# berikutnya hanya mengirim parameter (protokol biner).
+STATEMENT_CACHE_SIZE = 64
+SESSION_RETRIES = 3         # Sambung ulang paling banyak sekian kali per statement
+SESSION_RETRY_DELAY = 0.5   # Detik sebelum percobaan pertama, berlipat dua tiap percobaan
+_sessions = threading.local()
+
+class StatementCursor:
+    """Cursor pengganti untuk kode lama: setiap execute memakai prepared statement dari cache sesi"""
+
+    def __init__(self, session):
+        self.session = session
+        self.current = None
+
+    def execute(self, sql, params=None):
+        self.current = self.session.execute(sql, params)
+
+    def fetchone(self):
+        return self.current.fetchone()
+
+    def fetchall(self):
+        return self.current.fetchall()
+
+    def fetchmany(self, size=1):
+        return self.current.fetchmany(size)
+
+    @property
+    def description(self):
+        return self.current.description
+
+    @property
+    def rowcount(self):
+        return self.current.rowcount
+
+    @property
+    def lastrowid(self):
+        return self.current.lastrowid
+
+    def close(self):
+        self.current = None  # Cursor di cache tetap terbuka agar statement-nya tetap prepared
+
+class Session:
+    """Koneksi yang dipakai ulang beserta cache prepared statement (LRU)"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.pid = os.getpid()
+        self.statements = OrderedDict()  # teks SQL -> (objek teks yang di-prepare, cursor)
+        self.last = None
+        self.dirty = False
+
+    def statement(self, sql):
+        """(objek teks yang di-prepare, cursor) untuk sql dari cache LRU"""
+        entry = self.statements.get(sql)
+        if entry is None:
+            entry = (sql, self.conn.cursor(prepared=True))
+            self.statements[sql] = entry
+            if len(self.statements) > STATEMENT_CACHE_SIZE:
+                _, (_, old_cursor) = self.statements.popitem(last=False)
+                old_cursor.close()  # Membebaskan statement di server
+        else:
+            self.statements.move_to_end(sql)
+        return entry
+
+    def execute(self, sql, params=None):
+        self.drain()
+        for attempt in range(SESSION_RETRIES + 1):
+            try:
+                if attempt:
+                    time.sleep(SESSION_RETRY_DELAY * 2 ** (attempt - 1))
+                    self.reconnect()
+                text, cursor = self.statement(sql)
+                # Connector hanya me-prepare ulang jika objek teksnya berbeda,
+                # jadi objek teks dari cache yang dikirim, bukan sql
+                cursor.execute(text, params or ())
+                break
+            except (mysql.connector.errors.OperationalError, mysql.connector.errors.InterfaceError):
+                if self.dirty or attempt == SESSION_RETRIES:
+                    raise  # Transaksi yang terputus tidak boleh diulang diam-diam
+        self.last = cursor
+        if not sql.lstrip().upper().startswith("SELECT"):
+            self.dirty = True
+        return cursor
+
+    def drain(self):
+        """Membaca sisa hasil query sebelumnya (wajib sebelum statement berikutnya)"""
+        if self.last is not None and self.last.description is not None:
+            self.last.fetchall()
+        self.last = None
+
+    def reconnect(self):
+        self.statements.clear()
+        self.last = None
+        self.conn.reconnect(attempts=1, delay=0)  # Jeda dan batas percobaan diatur execute
+
+    def cursor(self):
+        return StatementCursor(self)
+
+    def commit(self):
+        self.drain()
+        self.conn.commit()
+        self.dirty = False
+
+    def rollback(self):
+        self.drain()
+        self.conn.rollback()
+        self.dirty = False
+
+    def close(self):
+        """Mengembalikan sesi untuk dipakai lagi: transaksi yang tertinggal dibatalkan"""
+        self.drain()
+        if self.dirty or self.conn.in_transaction:
+            self.conn.rollback()
+            self.dirty = False
+
+def get_session():
+    """Sesi MySQL milik thread ini; dibuat saat pertama dipakai atau setelah fork"""
+    session = getattr(_sessions, "session", None)
+    if session is None or session.pid != os.getpid():
+        conn = create_database_connection()
+        if not conn:
+            return None
+        # Koneksi hidup lama: setiap statement harus melihat data terbaru dari klien lain
+        conn.cmd_query("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+        session = Session(conn)
+        _sessions.session = session
+    return session
+
+# Replika baca (opsional): laporan, tampilan daftar besar dan ekspor dibaca dari
+# replika agar JOIN penuh tidak bersaing I/O dengan meja kasir di primary.
+# None = semua ke primary. Contoh: {"host": "127.0.0.1", "port": 3307, "user": "root", "password": ""}
+REPLICA_CONFIG = None
+REPLICA_MAX_LAG_SECONDS = 30   # Replika yang lebih tertinggal dari ini tidak dipakai
+REPLICA_CHECK_SECONDS = 5      # Selang pemeriksaan ulang ketertinggalan / percobaan ulang replika
+REPLICA_CONNECT_TIMEOUT = 2
+_read_sessions = threading.local()
+_replica_state = {"retry_at": 0.0}
+
+def replica_lag(conn):
+    """Detik ketertinggalan replika, atau None jika replikasi tidak berjalan"""
+    for query in ("SHOW REPLICA STATUS", "SHOW SLAVE STATUS"):  # MySQL >= 8.0.22 / versi lama
+        try:
+            status = fetch_batch(conn, query)
+        except Error:
+            continue
+        if not status:
+            return None  # Bukan replika
+        for column in ("Seconds_Behind_Source", "Seconds_Behind_Master"):
+            if column in status.names:
+                return status.column(column)[0]
+    return None
+
+def connect_replica():
+    """Koneksi ke replika jika dikonfigurasi, bisa dihubungi dan cukup baru; selain itu None
+    
+    Setelah gagal, replika baru dicoba lagi setelah REPLICA_CHECK_SECONDS,
+    sehingga fallback ke primary tidak menunggu timeout koneksi setiap kali.
+    """
+    if not REPLICA_CONFIG or time.monotonic() < _replica_state["retry_at"]:
+        return None
+    try:
+        conn = mysql.connector.connect(database=DATABASE_NAME, connection_timeout=REPLICA_CONNECT_TIMEOUT,
+                                       **REPLICA_CONFIG)
+    except Error as e:
+        print(f"Replika tidak tersedia ({e}), membaca dari primary")
+        _replica_state["retry_at"] = time.monotonic() + REPLICA_CHECK_SECONDS
+        return None
+    lag = replica_lag(conn)
+    if lag is None or lag > REPLICA_MAX_LAG_SECONDS:
+        print("Replika " + ("tidak mereplikasi" if lag is None else f"tertinggal {lag} detik")
+              + ", membaca dari primary")
+        conn.close()
+        _replica_state["retry_at"] = time.monotonic() + REPLICA_CHECK_SECONDS
+        return None
+    return conn
+
+def create_read_connection():
+    """Koneksi untuk laporan dan ekspor: replika jika layak, dengan fallback ke primary"""
+    return connect_replica() or create_database_connection()
+
+def get_read_session():
+    """Sesi untuk tampilan hanya-baca milik thread ini (replika jika layak, selain itu primary)
+    
+    Ketertinggalan replika diperiksa ulang paling sering setiap REPLICA_CHECK_SECONDS.
+    """
+    now = time.monotonic()
+    session = getattr(_read_sessions, "session", None)
+    if session is not None and session.pid == os.getpid():
+        if now - session.checked < REPLICA_CHECK_SECONDS:
+            return session
+        lag = replica_lag(session.conn)
+        if lag is not None and lag <= REPLICA_MAX_LAG_SECONDS:
+            session.checked = now
+            return session
+        print("Replika tertinggal, membaca dari primary")
+        session.conn.close()
+        _replica_state["retry_at"] = now + REPLICA_CHECK_SECONDS
+    _read_sessions.session = None
+    conn = connect_replica()
+    if conn is None:
+        return get_session()
+    conn.cmd_query("SET SESSION TRANSACTION ISOLATION LEVEL READ COMMITTED")
+    session = Session(conn)
+    session.checked = now
+    _read_sessions.session = session
+    return session
+
+def ensure_indexes(cursor, table, indexes):
+    """Menambahkan index yang belum ada pada tabel lama (MySQL tidak punya CREATE INDEX IF NOT EXISTS)"""
+    cursor.execute("""SELECT DISTINCT index_name FROM information_schema.statistics
+                   WHERE table_schema = DATABASE() AND table_name = %s""", (table,))
+    existing = {row[0] for row in cursor.fetchall()}
+    for name, columns in indexes.items():
+        if name not in existing:
+            cursor.execute(f"CREATE INDEX {name} ON {table} {columns}")
+
+def ensure_columns(cursor, table, columns):
+    """Menambahkan kolom yang belum ada pada tabel lama"""
+    cursor.execute("""SELECT column_name FROM information_schema.columns
+                   WHERE table_schema = DATABASE() AND table_name = %s""", (table,))
+    existing = {row[0] for row in cursor.fetchall()}
+    for name, definition in columns.items():
+        if name not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {definition}")
+
+def partisi_musim_sql(tahun_awal, tahun_akhir):
+    """Klausa PARTITION BY: satu partisi per musim tahun_awal..tahun_akhir, subpartisi per lokasi"""
+    parts = [f"PARTITION p_lama VALUES LESS THAN ({tahun_awal})"]
+    parts += [f"PARTITION p{tahun} VALUES LESS THAN ({tahun + 1})" for tahun in range(tahun_awal, tahun_akhir + 1)]
+    parts.append("PARTITION p_maks VALUES LESS THAN MAXVALUE")
+    return (f"PARTITION BY RANGE (YEAR(tanggal)) SUBPARTITION BY KEY (id_lokasi) "
+            f"SUBPARTITIONS {SITE_SUBPARTITIONS} ({', '.join(parts)})")
+
+def partisi_musim(cursor, table):
+    """Tahun-tahun yang sudah punya partisi sendiri di tabel (kosong jika belum dipartisi)"""
+    cursor.execute("""SELECT DISTINCT partition_name FROM information_schema.partitions
+                   WHERE table_schema = DATABASE() AND table_name = %s""", (table,))
+    return sorted(int(name[1:]) for (name,) in cursor.fetchall()
+                  if name and re.fullmatch(r"p\d{4}", name))
+
+def pastikan_partisi_musim(cursor, table, tahun):
+    """Memecah p_maks sampai musim tahun (dan sebelumnya) punya partisi sendiri"""
+    tahun_ada = partisi_musim(cursor, table)
+    for baru in range(max(tahun_ada, default=tahun) + 1, tahun + 1):
+        cursor.execute(f"""ALTER TABLE {table} REORGANIZE PARTITION p_maks INTO (
+                       PARTITION p{baru} VALUES LESS THAN ({baru + 1}),
+                       PARTITION p_maks VALUES LESS THAN MAXVALUE)""")
+
+def migrasi_partisi(cursor):
+    """Mengubah tabel lama (tanpa lokasi) menjadi tabel berpartisi musim dan lokasi
+    
+    Semua data lama menjadi milik lokasi 1. Tabel berpartisi InnoDB tidak
+    mendukung foreign key, jadi foreign key ke/dari tabel ini dilepas dan
+    validasinya dilakukan aplikasi (add_transaksi_zakat, delete_zakat).
+    """
+    for table in PARTITIONED_TABLES:
+        ensure_columns(cursor, table, {"id_lokasi": "SMALLINT NOT NULL DEFAULT 1 AFTER id"})
+    belum = [table for table in PARTITIONED_TABLES if not partisi_musim(cursor, table)]
+    if not belum:
+        return
+    marks = ", ".join(["%s"] * len(PARTITIONED_TABLES))
+    cursor.execute(f"""SELECT table_name, constraint_name FROM information_schema.referential_constraints
+                   WHERE constraint_schema = DATABASE()
+                   AND (table_name IN ({marks}) OR referenced_table_name IN ({marks}))""",
+                   PARTITIONED_TABLES * 2)
+    for table, constraint in cursor.fetchall():
+        cursor.execute(f"ALTER TABLE {table} DROP FOREIGN KEY {constraint}")
+    tahun_ini = datetime.date.today().year
+    for table in belum:
+        print(f"Mempartisi tabel {table} per musim dan lokasi...")
+        cursor.execute(f"SELECT MIN(YEAR(tanggal)) FROM {table}")
+        tahun_awal = min(cursor.fetchone()[0] or tahun_ini, tahun_ini)
+        cursor.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, id_lokasi, tanggal)")
+        cursor.execute(f"ALTER TABLE {table} {partisi_musim_sql(tahun_awal, tahun_ini + 1)}")
+
 def create_tables():
     """Membuat database dan tabel jika belum ada"""
     try:
@@ -88,17 +523,101 @@ def create_tables():
         cursor = connection.cursor()
         
         # Buat database jika belum ada
-        cursor.execute("CREATE DATABASE IF NOT EXISTS zakat")
-        cursor.execute("USE zakat")
+        cursor.execute(f"CREATE DATABASE IF NOT EXISTS {DATABASE_NAME}")
+        cursor.execute(f"USE {DATABASE_NAME}")
+        tahun_ini = datetime.date.today().year
         
-        # Buat tabel zakat_data
+        # Daftar lokasi (masjid / titik kumpul)
         cursor.execute("""
+        CREATE TABLE IF NOT EXISTS lokasi (
+            id SMALLINT PRIMARY KEY,
+            nama VARCHAR(100) NOT NULL
+        )
+        """)
+        cursor.execute("INSERT IGNORE INTO lokasi (id, nama) VALUES (%s, %s)", (SITE_ID, f"Lokasi {SITE_ID}"))
+        
+        # Buat tabel zakat_data (berpartisi musim dan lokasi, jadi primary
+        # key memuat id_lokasi dan tanggal)
+        cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS zakat_data (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            nama VARCHAR(100) NOT NULL,
+            id INT AUTO_INCREMENT,
+            id_lokasi SMALLINT NOT NULL DEFAULT 1,
+            nama VARCHAR(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
             jenis_zakat ENUM('Fitrah', 'Mal') NOT NULL,
             jumlah DECIMAL(10, 2) NOT NULL,
-            tanggal DATE NOT NULL
+            tanggal DATE NOT NULL,
+            updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                ON UPDATE CURRENT_TIMESTAMP(6),
+            PRIMARY KEY (id, id_lokasi, tanggal),
+            INDEX idx_zakat_nama (nama),
+            INDEX idx_zakat_tanggal (tanggal),
+            INDEX idx_zakat_jenis_tanggal (jenis_zakat, tanggal),
+            INDEX idx_zakat_updated (updated_at, id),
+            INDEX idx_zakat_lokasi_nama (id_lokasi, nama),
+            INDEX idx_zakat_lokasi_updated (id_lokasi, updated_at, id)
+        ) {partisi_musim_sql(tahun_ini, tahun_ini + 1)}
+        """)
+        ensure_columns(cursor, "zakat_data", {
+            "updated_at": "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+        })
+        # Collation _unicode_ci mengabaikan huruf besar/kecil dan diakritik, sehingga
+        # pencarian nama LIKE 'awalan%' sudah ter-normalisasi dan tetap memakai index
+        cursor.execute("""SELECT collation_name FROM information_schema.columns
+                       WHERE table_schema = DATABASE() AND table_name = 'zakat_data' AND column_name = 'nama'""")
+        if cursor.fetchone()[0] != "utf8mb4_unicode_ci":
+            cursor.execute("""ALTER TABLE zakat_data MODIFY nama VARCHAR(100)
+                           CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL""")
+        ensure_indexes(cursor, "zakat_data", {
+            "idx_zakat_nama": "(nama)",
+            "idx_zakat_tanggal": "(tanggal)",
+            "idx_zakat_jenis_tanggal": "(jenis_zakat, tanggal)",
+            "idx_zakat_updated": "(updated_at, id)",
+        })
+        
+        # Catatan penghapusan untuk ekspor inkremental
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ekspor_hapus (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            dataset VARCHAR(20) NOT NULL,
+            id_data INT NOT NULL,
+            id_lokasi SMALLINT NOT NULL DEFAULT 1,
+            dihapus_pada TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+        )
+        """)
+        ensure_columns(cursor, "ekspor_hapus", {"id_lokasi": "SMALLINT NOT NULL DEFAULT 1"})
+        
+        # Versi data per dataset, dinaikkan oleh setiap fungsi yang mengubah data
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS data_versi (
+            dataset VARCHAR(20) PRIMARY KEY,
+            versi BIGINT NOT NULL DEFAULT 0,
+            diubah_pada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ON UPDATE CURRENT_TIMESTAMP
+        )
+        """)
+        ensure_columns(cursor, "data_versi", {
+            "diubah_pada": "TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP",
+        })
+        
+        # Outbox (change data capture): satu baris per perubahan, diisi dalam
+        # transaksi yang sama dengan perubahannya
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS outbox (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            dataset VARCHAR(20) NOT NULL,
+            operasi ENUM('insert', 'update', 'delete', 'arsip') NOT NULL,
+            id_data INT NOT NULL,
+            data JSON NULL,
+            dibuat_pada TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+        )
+        """)
+        # Posisi terakhir yang sudah diproses setiap konsumen outbox
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS outbox_konsumen (
+            nama VARCHAR(50) PRIMARY KEY,
+            posisi BIGINT NOT NULL DEFAULT 0,
+            diperbarui_pada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ON UPDATE CURRENT_TIMESTAMP
         )
         """)
         
@@ -111,19 +630,114 @@ def create_tables():
         )
         """)
         
-        # Buat tabel transaksi_zakat
-        cursor.execute("""
+        # Buat tabel transaksi_zakat (berpartisi seperti zakat_data; tabel
+        # berpartisi tidak mendukung foreign key, id_zakat dan id_beras
+        # divalidasi oleh add_transaksi_zakat)
+        cursor.execute(f"""
         CREATE TABLE IF NOT EXISTS transaksi_zakat (
+            id INT AUTO_INCREMENT,
+            id_lokasi SMALLINT NOT NULL DEFAULT 1,
+            id_zakat INT NOT NULL,
+            id_beras INT NOT NULL,
+            jumlah_beras DECIMAL(10, 2) NOT NULL,
+            total_harga DECIMAL(10, 2) NOT NULL,
+            tanggal DATE NOT NULL,
+            updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6)
+                ON UPDATE CURRENT_TIMESTAMP(6),
+            PRIMARY KEY (id, id_lokasi, tanggal),
+            INDEX idx_transaksi_beras_tanggal (id_beras, tanggal),
+            INDEX idx_transaksi_lokasi_zakat (id_lokasi, id_zakat),
+            INDEX idx_transaksi_lokasi_updated (id_lokasi, updated_at, id)
+        ) {partisi_musim_sql(tahun_ini, tahun_ini + 1)}
+        """)
+        # Transaksi juga bisa berubah (hitung ulang harga, sinkronisasi), jadi
+        # updated_at ikut naik setiap kali barisnya diubah
+        ensure_columns(cursor, "transaksi_zakat", {
+            "updated_at": "TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+        })
+        
+        # Tabel lama: tambah lokasi dan partisi, lalu pastikan musim depan
+        # sudah punya partisi sendiri
+        migrasi_partisi(cursor)
+        for table in PARTITIONED_TABLES:
+            pastikan_partisi_musim(cursor, table, tahun_ini + 1)
+        ensure_indexes(cursor, "zakat_data", {
+            "idx_zakat_lokasi_nama": "(id_lokasi, nama)",
+            "idx_zakat_lokasi_updated": "(id_lokasi, updated_at, id)",
+        })
+        ensure_indexes(cursor, "transaksi_zakat", {
+            "idx_transaksi_beras_tanggal": "(id_beras, tanggal)",
+            "idx_transaksi_lokasi_zakat": "(id_lokasi, id_zakat)",
+            "idx_transaksi_lokasi_updated": "(id_lokasi, updated_at, id)",
+        })
+        
+        # Riwayat harga beras; harga master_beras berlaku sebelum entri pertama
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS harga_beras (
             id INT AUTO_INCREMENT PRIMARY KEY,
+            id_beras INT NOT NULL,
+            harga_per_kg DECIMAL(10, 2) NOT NULL,
+            berlaku_mulai DATE NOT NULL,
+            FOREIGN KEY (id_beras) REFERENCES master_beras(id),
+            INDEX idx_harga_beras_berlaku (id_beras, berlaku_mulai, id)
+        )
+        """)
+        
+        # Arsip musim yang sudah ditutup: kolom sama dengan tabel aktif, tanpa
+        # foreign key, agar tabel aktif tetap kecil
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS zakat_data_arsip (
+            id INT PRIMARY KEY,
+            id_lokasi SMALLINT NOT NULL DEFAULT 1,
+            nama VARCHAR(100) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci NOT NULL,
+            jenis_zakat ENUM('Fitrah', 'Mal') NOT NULL,
+            jumlah DECIMAL(10, 2) NOT NULL,
+            tanggal DATE NOT NULL,
+            diarsipkan_pada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_zakat_arsip_tanggal_nama (tanggal, nama),
+            INDEX idx_zakat_arsip_lokasi (id_lokasi, tanggal, nama)
+        )
+        """)
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transaksi_zakat_arsip (
+            id INT PRIMARY KEY,
+            id_lokasi SMALLINT NOT NULL DEFAULT 1,
             id_zakat INT NOT NULL,
             id_beras INT NOT NULL,
             jumlah_beras DECIMAL(10, 2) NOT NULL,
             total_harga DECIMAL(10, 2) NOT NULL,
             tanggal DATE NOT NULL,
-            FOREIGN KEY (id_zakat) REFERENCES zakat_data(id),
-            FOREIGN KEY (id_beras) REFERENCES master_beras(id)
+            diarsipkan_pada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            INDEX idx_transaksi_arsip_tanggal (tanggal),
+            INDEX idx_transaksi_arsip_lokasi (id_lokasi, tanggal)
+        )
+        """)
+        for table, index, columns in (("zakat_data_arsip", "idx_zakat_arsip_lokasi", "(id_lokasi, tanggal, nama)"),
+                                      ("transaksi_zakat_arsip", "idx_transaksi_arsip_lokasi", "(id_lokasi, tanggal)")):
+            ensure_columns(cursor, table, {"id_lokasi": "SMALLINT NOT NULL DEFAULT 1 AFTER id"})
+            ensure_indexes(cursor, table, {index: columns})
+        # Ringkasan per lokasi per musim tetap tersedia tanpa membaca tabel arsip
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS ringkasan_musim (
+            id_lokasi SMALLINT NOT NULL DEFAULT 1,
+            tahun SMALLINT NOT NULL,
+            pembayar_fitrah INT NOT NULL,
+            pembayar_mal INT NOT NULL,
+            jumlah_fitrah DECIMAL(14, 2) NOT NULL,
+            jumlah_mal DECIMAL(14, 2) NOT NULL,
+            jumlah_transaksi INT NOT NULL,
+            total_beras_kg DECIMAL(14, 2) NOT NULL,
+            total_harga DECIMAL(16, 2) NOT NULL,
+            diarsipkan_pada TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+                ON UPDATE CURRENT_TIMESTAMP,
+            PRIMARY KEY (id_lokasi, tahun)
         )
         """)
+        cursor.execute("""SELECT COUNT(*) FROM information_schema.columns WHERE table_schema = DATABASE()
+                       AND table_name = 'ringkasan_musim' AND column_name = 'id_lokasi'""")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute("""ALTER TABLE ringkasan_musim ADD COLUMN id_lokasi SMALLINT NOT NULL DEFAULT 1 FIRST,
+                           DROP PRIMARY KEY, ADD PRIMARY KEY (id_lokasi, tahun)""")
         
         # Tambahkan data default jika tabel master_beras kosong
         cursor.execute("SELECT COUNT(*) FROM master_beras")
@@ -152,16 +766,202 @@ def create_tables():
 # FUNGSI OPERASI DATABASE
 # ==============================================
 
+# Versi data: setiap fungsi yang mengubah data menaikkan versi dataset-nya
+# di tabel data_versi (dalam transaksi yang sama), sehingga tampilan yang
+# sudah diformat bisa dipakai ulang selama versinya tidak berubah, juga
+# ketika perubahan datang dari klien lain.
+RENDER_CACHE_PAGES = 64
+_render_cache = OrderedDict()
+
+def bump_data_version(cursor, *datasets):
+    """Menaikkan versi dataset (zakat, beras, harga, transaksi)"""
+    for dataset in datasets:
+        cursor.execute("""INSERT INTO data_versi (dataset, versi) VALUES (%s, 1)
+                       ON DUPLICATE KEY UPDATE versi = versi + 1""", (dataset,))
+
+def data_versions(conn, *datasets):
+    """Versi terkini dataset, diambil dengan satu query kecil"""
+    batch = fetch_batch(conn, "SELECT dataset, versi FROM data_versi")
+    versions = dict(zip(batch.column("dataset"), batch.column("versi")))
+    return tuple(versions.get(dataset, 0) for dataset in datasets)
+
+# Outbox: setiap fungsi yang mengubah data juga mencatat barisnya (sebagai
+# JSON) ke tabel outbox dalam transaksi yang sama, sehingga sistem lain
+# (laporan, kantor wilayah, cetak kuitansi) cukup membaca perubahan sejak
+# posisi terakhirnya, tanpa ekspor ulang.
+OUTBOX_SUMBER = {
+    "zakat": ("zakat_data", "JSON_OBJECT('id', id, 'id_lokasi', id_lokasi, 'nama', nama, 'jenis_zakat', jenis_zakat, "
+                            "'jumlah', jumlah, 'tanggal', tanggal)"),
+    "beras": ("master_beras", "JSON_OBJECT('id', id, 'nama_beras', nama_beras, 'harga_per_kg', harga_per_kg)"),
+    "harga": ("harga_beras", "JSON_OBJECT('id', id, 'id_beras', id_beras, 'harga_per_kg', harga_per_kg, "
+                             "'berlaku_mulai', berlaku_mulai)"),
+    "transaksi": ("transaksi_zakat", "JSON_OBJECT('id', id, 'id_lokasi', id_lokasi, 'id_zakat', id_zakat, 'id_beras', id_beras, "
+                                     "'jumlah_beras', jumlah_beras, 'total_harga', total_harga, 'tanggal', tanggal)"),
+}
+OUTBOX_BATCH = 500
+OUTBOX_GAP_SECONDS = 600  # Cadangan jika innodb_trx tidak bisa dibaca: celah lebih tua dari ini dilewati
+
+def catat_outbox(cursor, dataset, operasi, kondisi, params=(), semua_lokasi=False):
+    """Mencatat baris dataset yang memenuhi kondisi (WHERE) ke outbox
+    
+    Untuk insert/update dipanggil setelah perubahan, untuk delete/arsip
+    sebelum baris dihapus agar isi terakhirnya ikut tercatat. Dataset per
+    lokasi dibatasi ke SITE_ID, kecuali perubahan yang memang lintas lokasi.
+    """
+    table, data = OUTBOX_SUMBER[dataset]
+    params = tuple(params)
+    if table in PARTITIONED_TABLES and not semua_lokasi:
+        kondisi = f"id_lokasi = %s AND ({kondisi})"
+        params = (SITE_ID,) + params
+    cursor.execute(f"""INSERT INTO outbox (dataset, operasi, id_data, data)
+                   SELECT %s, %s, id, {data} FROM {table} WHERE {kondisi}""",
+                   (dataset, operasi) + params)
+
+def posisi_konsumen(conn, nama):
+    """Posisi outbox terakhir yang sudah diproses konsumen (0 untuk konsumen baru)"""
+    batch = fetch_batch(conn, "SELECT posisi FROM outbox_konsumen WHERE nama = %s", (nama,))
+    return batch.column("posisi")[0] if batch else 0
+
+def simpan_posisi_konsumen(conn, nama, posisi):
+    cursor = conn.cursor()
+    try:
+        cursor.execute("""INSERT INTO outbox_konsumen (nama, posisi) VALUES (%s, %s)
+                       ON DUPLICATE KEY UPDATE posisi = GREATEST(posisi, VALUES(posisi))""", (nama, posisi))
+        conn.commit()
+    finally:
+        cursor.close()
+
+def awal_transaksi_tertua(conn):
+    """Waktu mulai transaksi InnoDB aktif tertua milik koneksi lain, None jika tidak ada
+
+    Melempar Error jika user tidak punya hak PROCESS untuk membaca innodb_trx.
+    """
+    batch = fetch_batch(conn, """SELECT MIN(trx_started) AS mulai FROM information_schema.innodb_trx
+                        WHERE trx_mysql_thread_id <> CONNECTION_ID()""")
+    return batch.column("mulai")[0] if len(batch) else None
+
+def batas_commit(conn):
+    """Waktu server yang sebelumnya semua perubahan bertanda waktu sudah commit
+
+    Baris dicap dengan waktu statement, yang tidak lebih awal dari awal
+    transaksinya, jadi baris yang belum commit selalu bertanda waktu di atau
+    sesudah awal transaksi aktif tertua. NOW(6) dibaca sebelum innodb_trx
+    sehingga transaksi yang dimulai di antaranya tetap tertutup batas.
+    Tanpa hak membaca innodb_trx, batas mundur OUTBOX_GAP_SECONDS.
+    """
+    sekarang = fetch_batch(conn, "SELECT NOW(6) AS sekarang").column("sekarang")[0]
+    try:
+        tertua = awal_transaksi_tertua(conn)
+    except Error:
+        return sekarang - datetime.timedelta(seconds=OUTBOX_GAP_SECONDS)
+    return min(sekarang, tertua) if tertua else sekarang
+
+def baca_outbox(conn, posisi, batch_size=OUTBOX_BATCH, datasets=None):
+    """Perubahan setelah posisi secara berurutan; mengembalikan (perubahan, posisi_baru)
+    
+    ID outbox dibagikan saat INSERT, bukan saat commit, jadi transaksi yang
+    lebih lama bisa commit setelah ID yang lebih besar terlihat. Pembacaan
+    berhenti di celah ID selama masih ada transaksi aktif yang dimulai
+    sebelum baris sesudah celah dibuat, karena transaksi itu mungkin pemilik
+    ID yang hilang. Celah baru dilewati jika transaksi seperti itu sudah
+    tidak ada (ID-nya milik transaksi yang di-rollback). innodb_trx dibaca
+    sebelum outbox, jadi transaksi yang commit di antaranya tetap terlihat.
+    Tanpa hak membaca innodb_trx, celah dilewati setelah OUTBOX_GAP_SECONDS.
+    """
+    try:
+        tertua = awal_transaksi_tertua(conn)
+        pakai_umur = False
+    except Error:
+        tertua = None
+        pakai_umur = True
+    batch = fetch_batch(conn, """SELECT id, dataset, operasi, id_data, data, dibuat_pada,
+                        TIMESTAMPDIFF(MICROSECOND, dibuat_pada, NOW(6)) / 1000000 AS umur,
+                        dibuat_pada >= %s AS tertunda
+                        FROM outbox WHERE id > %s ORDER BY id LIMIT %s""", (tertua, posisi, batch_size))
+    perubahan = []
+    for id, dataset, operasi, id_data, data, dibuat_pada, umur, tertunda in batch.rows():
+        if id != posisi + 1 and (umur < OUTBOX_GAP_SECONDS if pakai_umur else tertunda):
+            break
+        posisi = id
+        if datasets is None or dataset in datasets:
+            perubahan.append({"posisi": id, "dataset": dataset, "operasi": operasi, "id": id_data,
+                              "data": json.loads(data) if data else None,
+                              "waktu": dibuat_pada.isoformat()})
+    return perubahan, posisi
+
+def stream_outbox(nama, batch_size=OUTBOX_BATCH, datasets=None, ikuti=False, jeda=1.0):
+    """Menghasilkan batch perubahan untuk konsumen nama, mulai dari posisi tersimpannya
+    
+    Posisi disimpan saat batch berikutnya diminta, jadi batch yang sedang
+    diproses ketika konsumen berhenti akan dikirim lagi (at-least-once).
+    Tanpa ikuti, generator selesai begitu tidak ada perubahan baru.
+    """
+    conn = create_database_connection()
+    if not conn:
+        return
+    conn.autocommit = True  # Setiap polling melihat data terbaru
+    try:
+        posisi = posisi_konsumen(conn, nama)
+        while True:
+            perubahan, posisi_baru = baca_outbox(conn, posisi, batch_size, datasets)
+            if perubahan:
+                yield perubahan
+            if posisi_baru != posisi:
+                simpan_posisi_konsumen(conn, nama, posisi_baru)
+                posisi = posisi_baru
+            elif ikuti:
+                time.sleep(jeda)
+            else:
+                return
+    finally:
+        conn.close()
+
+def bersihkan_outbox(hari=30):
+    """Menghapus perubahan lebih tua dari hari yang sudah diproses semua konsumen"""
+    conn = create_database_connection()
+    if not conn:
+        return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""DELETE FROM outbox WHERE dibuat_pada < NOW() - INTERVAL %s DAY
+                       AND id <= (SELECT COALESCE(MIN(posisi), 0) FROM outbox_konsumen)""", (hari,))
+        jumlah = cursor.rowcount
+        conn.commit()
+        print(f"{jumlah} perubahan lama dihapus dari outbox")
+        return True
+    except Error as err:
+        print(f"Error database: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def render_cache_get(key):
+    value = _render_cache.get(key)
+    if value is not None:
+        _render_cache.move_to_end(key)
+    return value
+
+def render_cache_put(key, value):
+    _render_cache[key] = value
+    _render_cache.move_to_end(key)
+    while len(_render_cache) > RENDER_CACHE_PAGES:
+        _render_cache.popitem(last=False)
+
 def add_zakat(nama, jenis_zakat, jumlah, tanggal):
     """Menambahkan data pembayar zakat baru"""
-    conn = create_database_connection()
+    conn = get_session()
     if not conn:
         return False
     cursor = None
     try:
         cursor = conn.cursor()
-        query = "INSERT INTO zakat_data (nama, jenis_zakat, jumlah, tanggal) VALUES (%s, %s, %s, %s)"
-        cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal))
+        query = "INSERT INTO zakat_data (id_lokasi, nama, jenis_zakat, jumlah, tanggal) VALUES (%s, %s, %s, %s, %s)"
+        cursor.execute(query, (SITE_ID, nama, jenis_zakat, jumlah, tanggal))
+        catat_outbox(cursor, "zakat", "insert", "id = %s", (cursor.lastrowid,))
+        bump_data_version(cursor, "zakat")
         conn.commit()
         return True
     except Error as err:
@@ -174,7 +974,7 @@ def add_zakat(nama, jenis_zakat, jumlah, tanggal):
 
 def update_zakat(id, nama, jenis_zakat, jumlah, tanggal):
     """Memperbarui data pembayar zakat"""
-    conn = create_database_connection()
+    conn = get_session()
     if not conn:
         return False
     cursor = None
@@ -182,10 +982,14 @@ def update_zakat(id, nama, jenis_zakat, jumlah, tanggal):
         cursor = conn.cursor()
         query = """UPDATE zakat_data 
                 SET nama = %s, jenis_zakat = %s, jumlah = %s, tanggal = %s 
-                WHERE id = %s"""
-        cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal, id))
+                WHERE id = %s AND id_lokasi = %s"""
+        cursor.execute(query, (nama, jenis_zakat, jumlah, tanggal, id, SITE_ID))
+        updated = cursor.rowcount > 0
+        if updated:
+            catat_outbox(cursor, "zakat", "update", "id = %s", (id,))
+            bump_data_version(cursor, "zakat")
         conn.commit()
-        return cursor.rowcount > 0
+        return updated
     except Error as err:
         print(f"Error database: {err}")
         conn.rollback()
@@ -196,7 +1000,7 @@ def update_zakat(id, nama, jenis_zakat, jumlah, tanggal):
 
 def delete_zakat(id):
     """Menghapus data pembayar zakat"""
-    conn = create_database_connection()
+    conn = get_session()
     if not conn:
         return False
     cursor = None
@@ -204,14 +1008,20 @@ def delete_zakat(id):
         cursor = conn.cursor()
         
         # Cek apakah ada transaksi terkait
-        cursor.execute("SELECT COUNT(*) FROM transaksi_zakat WHERE id_zakat = %s", (id,))
+        cursor.execute("SELECT COUNT(*) FROM transaksi_zakat WHERE id_lokasi = %s AND id_zakat = %s", (SITE_ID, id))
         if cursor.fetchone()[0] > 0:
             print("Tidak bisa menghapus. Data memiliki transaksi terkait.")
             return False
             
-        cursor.execute("DELETE FROM zakat_data WHERE id = %s", (id,))
+        catat_outbox(cursor, "zakat", "delete", "id = %s", (id,))
+        cursor.execute("DELETE FROM zakat_data WHERE id = %s AND id_lokasi = %s", (id, SITE_ID))
+        deleted = cursor.rowcount > 0
+        if deleted:
+            cursor.execute("INSERT INTO ekspor_hapus (dataset, id_data, id_lokasi) VALUES ('zakat', %s, %s)",
+                           (id, SITE_ID))
+            bump_data_version(cursor, "zakat")
         conn.commit()
-        return cursor.rowcount > 0
+        return deleted
     except Error as err:
         print(f"Error database: {err}")
         conn.rollback()
@@ -222,7 +1032,7 @@ def delete_zakat(id):
 
 def add_beras(nama_beras, harga_per_kg):
     """Menambahkan data master beras"""
-    conn = create_database_connection()
+    conn = get_session()
     if not conn:
         return False
     cursor = None
@@ -230,6 +1040,8 @@ def add_beras(nama_beras, harga_per_kg):
         cursor = conn.cursor()
         query = "INSERT INTO master_beras (nama_beras, harga_per_kg) VALUES (%s, %s)"
         cursor.execute(query, (nama_beras, harga_per_kg))
+        catat_outbox(cursor, "beras", "insert", "id = %s", (cursor.lastrowid,))
+        bump_data_version(cursor, "beras")
         conn.commit()
         return True
     except Error as err:
@@ -240,48 +1052,260 @@ def add_beras(nama_beras, harga_per_kg):
         if cursor: cursor.close()
         conn.close()
 
-def view_master_beras():
-    """Menampilkan data master beras"""
-    conn = create_database_connection()
+# Harga per kg yang berlaku untuk beras mb pada tanggal %s. Index
+# (id_beras, berlaku_mulai, id) membuat ini satu pencarian index, bukan scan.
+HARGA_BERLAKU_SQL = """COALESCE((SELECT h.harga_per_kg FROM harga_beras h
+        WHERE h.id_beras = mb.id AND h.berlaku_mulai <= %s
+        ORDER BY h.berlaku_mulai DESC, h.id DESC LIMIT 1), mb.harga_per_kg)"""
+
+def add_harga_beras(id_beras, harga_per_kg, berlaku_mulai):
+    """Menambahkan harga beras yang berlaku mulai tanggal tertentu
+    
+    Transaksi beras tersebut sejak tanggal itu langsung dihitung ulang
+    dalam transaksi database yang sama.
+    """
+    conn = get_session()
     if not conn:
-        return
+        return False
+    cursor = None
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM master_beras WHERE id = %s", (id_beras,))
+        if not cursor.fetchone():
+            print("ID beras tidak valid!")
+            return False
+        cursor.execute("INSERT INTO harga_beras (id_beras, harga_per_kg, berlaku_mulai) VALUES (%s, %s, %s)",
+                       (id_beras, harga_per_kg, berlaku_mulai))
+        catat_outbox(cursor, "harga", "insert", "id = %s", (cursor.lastrowid,))
+        jumlah = reprice_transaksi(cursor, id_beras, berlaku_mulai)
+        bump_data_version(cursor, "harga")
+        conn.commit()
+        print(f"{jumlah} transaksi dihitung ulang dengan harga yang berlaku")
+        return True
+    except Error as err:
+        print(f"Error database: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def reprice_transaksi(cursor, id_beras=None, mulai=None):
+    """Menghitung ulang total_harga transaksi dengan satu UPDATE berbasis set
+    
+    Hanya transaksi beras id_beras (atau semua) sejak tanggal mulai yang
+    disentuh; mengembalikan jumlah baris yang berubah. Harga beras berlaku
+    untuk semua lokasi, jadi ini satu-satunya operasi lintas lokasi; filter
+    tanggal tetap membatasinya ke partisi musim sejak mulai. Baris yang
+    totalnya berubah mendapat updated_at baru (ON UPDATE), sehingga ikut
+    terbawa ekspor inkremental, dan dicatat ke outbox.
+    """
+    query = f"""UPDATE transaksi_zakat tz JOIN master_beras mb ON mb.id = tz.id_beras
+            SET tz.total_harga = tz.jumlah_beras * {HARGA_BERLAKU_SQL.replace("%s", "tz.tanggal")}"""
+    conditions, params = [], []
+    if id_beras is not None:
+        conditions.append("tz.id_beras = %s")
+        params.append(id_beras)
+    if mulai is not None:
+        conditions.append("tz.tanggal >= %s")
+        params.append(mulai)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    cursor.execute(query, params)
+    changed = cursor.rowcount
+    if changed:
+        kondisi = " AND ".join(c.replace("tz.", "") for c in conditions) or "TRUE"
+        catat_outbox(cursor, "transaksi", "update", kondisi, params, semua_lokasi=True)
+        bump_data_version(cursor, "transaksi")
+    return changed
+
+def hitung_ulang_transaksi():
+    """Menghitung ulang total_harga semua transaksi dari riwayat harga"""
+    conn = get_session()
+    if not conn:
+        return False
     cursor = None
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM master_beras")
-        results = cursor.fetchall()
+        jumlah = reprice_transaksi(cursor)
+        conn.commit()
+        print(f"{jumlah} transaksi dihitung ulang dengan harga yang berlaku")
+        return True
+    except Error as err:
+        print(f"Error database: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def view_harga_beras(id_beras):
+    """Menampilkan riwayat harga satu jenis beras"""
+    conn = get_session()
+    if not conn:
+        return
+    try:
+        key = ("harga", id_beras) + data_versions(conn, "beras", "harga")
+        lines = render_cache_get(key)
+        if lines is None:
+            beras = fetch_batch(conn, "SELECT nama_beras, harga_per_kg FROM master_beras WHERE id = %s",
+                                (id_beras,))
+            if not beras:
+                print("ID beras tidak valid!")
+                return
+            riwayat = fetch_batch(conn, """SELECT berlaku_mulai, harga_per_kg FROM harga_beras
+                                  WHERE id_beras = %s ORDER BY berlaku_mulai, id""", (id_beras,))
+            lines = [f"\nRiwayat Harga {beras.column('nama_beras')[0]}:",
+                     "{:<15} {:<15}".format("Berlaku Mulai", "Harga per Kg"),
+                     "-"*30,
+                     "{:<15} Rp{:<10,.2f}".format("(awal)", beras.column("harga_per_kg")[0])]
+            for berlaku_mulai, harga in riwayat.rows():
+                lines.append("{:<15} Rp{:<10,.2f}".format(str(berlaku_mulai), harga))
+            render_cache_put(key, lines)
+        print("\n".join(lines))
+    except Error as err:
+        print(f"Error database: {err}")
+    finally:
+        conn.close()
+
+PAGE_SIZE = 20
+
+def render_paged(title, header, width, fetch_page, format_row, page_size=PAGE_SIZE,
+                 cache_key=None, empty_message=None):
+    """Menampilkan daftar per halaman
+    
+    fetch_page(kata_kunci, offset, limit) menjalankan query dengan LIMIT/OFFSET,
+    sehingga hanya satu halaman yang ada di memori. Diambil page_size + 1 baris
+    untuk mengetahui apakah masih ada halaman berikutnya. Dengan cache_key
+    (yang harus memuat versi data), halaman yang sudah diformat dipakai ulang.
+    Perintah: n(ext), p(rev), j <hal>, f <teks>, q(uit).
+    """
+    page = 0
+    keyword = ""
+    past_end = False
+    while True:
+        key = cache_key and (cache_key, keyword, page, page_size)
+        cached = render_cache_get(key) if key else None
+        if cached is not None:
+            page_rows, has_next = cached
+        else:
+            page_rows = fetch_page(keyword, page * page_size, page_size + 1)
+            has_next = len(page_rows) > page_size
+            page_rows = [format_row(row) for row in page_rows[:page_size]]
+            if key:
+                render_cache_put(key, (page_rows, has_next))
         
-        if not results:
-            print("\nBelum ada data master beras")
+        if not page_rows and page == 0 and not keyword and empty_message:
+            print(empty_message)
             return
-            
-        print("\n{:<5} {:<20} {:<15}".format("ID", "Nama Beras", "Harga per Kg"))
-        print("-"*45)
-        for row in results:
-            print("{:<5} {:<20} Rp{:<10,.2f}".format(row[0], row[1], row[2]))
+        
+        if not page_rows and page > 0:
+            page -= 1
+            past_end = True
+            continue
+        if past_end:
+            print("Sudah di halaman terakhir")
+            past_end = False
+        
+        print(f"\n{title}:")
+        print("-" * width)
+        print(header)
+        print("-" * width)
+        if not page_rows:
+            print("Tidak ada data" + (f" yang cocok dengan '{keyword}'" if keyword else ""))
+        for line in page_rows:
+            print(line)
+        print("-" * width)
+        print(f"Halaman {page + 1}" + (f" | filter: '{keyword}'" if keyword else ""))
+        
+        command = input("[n]ext [p]rev [j <hal>] [f <teks>] [q]uit: ").strip()
+        action, _, argument = command.partition(" ")
+        action = action.lower()
+        if action in ("", "n"):
+            if has_next:
+                page += 1
+            elif action == "":
+                return  # Enter di halaman terakhir menutup daftar
+            else:
+                print("Sudah di halaman terakhir")
+        elif action == "p":
+            page = max(page - 1, 0)
+        elif action == "j":
+            try:
+                page = max(int(argument) - 1, 0)
+            except ValueError:
+                print("Error: Nomor halaman harus angka")
+        elif action == "f":
+            keyword = argument.strip()
+            page = 0
+        elif action == "q":
+            return
+        else:
+            print("Perintah tidak dikenal")
+
+def like_pattern(keyword):
+    """Pola LIKE '%kata%' dengan karakter wildcard di-escape"""
+    escaped = keyword.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "%" + escaped + "%"
+
+def make_page_fetcher(conn, query, filter_columns, order_by, where=None, where_params=()):
+    """Membuat fungsi fetch_page untuk render_paged dari query SELECT
+    
+    where (dengan where_params) selalu dipakai, misalnya filter lokasi;
+    kata kunci pencarian ditambahkan dengan AND.
+    """
+    def fetch_page(keyword, offset, limit):
+        sql = query
+        conditions = [where] if where else []
+        params = list(where_params)
+        if keyword:
+            conditions.append("(" + " OR ".join(f"{column} LIKE %s" for column in filter_columns) + ")")
+            params.extend([like_pattern(keyword)] * len(filter_columns))
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += f" ORDER BY {order_by} LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+        return list(fetch_batch(conn, sql, params).rows())
+    return fetch_page
+
+def view_master_beras():
+    """Menampilkan data master beras per halaman"""
+    conn = get_read_session()
+    if not conn:
+        return
+    try:
+        fetch_page = make_page_fetcher(
+            conn, "SELECT id, nama_beras, harga_per_kg FROM master_beras", ["nama_beras"], "id")
+        render_paged(
+            "Data Master Beras",
+            "{:<5} {:<20} {:<15}".format("ID", "Nama Beras", "Harga per Kg"),
+            45, fetch_page,
+            lambda row: "{:<5} {:<20} Rp{:<10,.2f}".format(row[0], row[1], row[2]),
+            cache_key=("beras",) + data_versions(conn, "beras"),
+            empty_message="\nBelum ada data master beras")
     except Error as err:
         print(f"Error database: {err}")
     finally:
-        if cursor: cursor.close()
         conn.close()
 
 def add_transaksi_zakat(id_zakat, id_beras, jumlah_beras, tanggal):
     """Menambahkan transaksi zakat beras"""
-    conn = create_database_connection()
+    conn = get_session()
     if not conn:
         return False
     cursor = None
     try:
         cursor = conn.cursor()
         
-        # Validasi ID zakat
-        cursor.execute("SELECT id FROM zakat_data WHERE id = %s", (id_zakat,))
+        # Validasi ID zakat (pengganti foreign key, yang tidak didukung tabel berpartisi)
+        cursor.execute("SELECT id FROM zakat_data WHERE id = %s AND id_lokasi = %s", (id_zakat, SITE_ID))
         if not cursor.fetchone():
             print("ID zakat tidak valid!")
             return False
             
-        # Validasi dan ambil harga beras
-        cursor.execute("SELECT harga_per_kg FROM master_beras WHERE id = %s", (id_beras,))
+        # Validasi dan ambil harga beras yang berlaku pada tanggal transaksi
+        cursor.execute(f"SELECT {HARGA_BERLAKU_SQL} FROM master_beras mb WHERE mb.id = %s",
+                       (tanggal, id_beras))
         result = cursor.fetchone()
         if not result:
             print("ID beras tidak valid!")
@@ -289,9 +1313,11 @@ def add_transaksi_zakat(id_zakat, id_beras, jumlah_beras, tanggal):
             
         total_harga = result[0] * jumlah_beras
         query = """INSERT INTO transaksi_zakat 
-                (id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
-                VALUES (%s, %s, %s, %s, %s)"""
-        cursor.execute(query, (id_zakat, id_beras, jumlah_beras, total_harga, tanggal))
+                (id_lokasi, id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
+                VALUES (%s, %s, %s, %s, %s, %s)"""
+        cursor.execute(query, (SITE_ID, id_zakat, id_beras, jumlah_beras, total_harga, tanggal))
+        catat_outbox(cursor, "transaksi", "insert", "id = %s", (cursor.lastrowid,))
+        bump_data_version(cursor, "transaksi")
         conn.commit()
         return True
     except Error as err:
@@ -302,68 +1328,939 @@ def add_transaksi_zakat(id_zakat, id_beras, jumlah_beras, tanggal):
         if cursor: cursor.close()
         conn.close()
 
-def view_transaksi_zakat():
-    """Menampilkan data transaksi zakat"""
+# Zakat fitrah per jiwa dalam kg beras (sekitar 3,5 liter)
+FITRAH_KG_PER_JIWA = 2.5
+ROSTER_COLUMNS = ["Nama", "Jumlah Jiwa", "ID Beras"]
+BULK_INSERT_ROWS = 1000
+
+def baca_roster(path):
+    """Membaca roster keluarga (xlsx/csv) menjadi DataFrame dengan kolom ROSTER_COLUMNS
+    
+    Mengembalikan (df, errors); baris kosong dilewati, baris tidak valid
+    dicatat di errors sebagai "baris N: ...".
+    """
+    df = pd.read_csv(path) if path.lower().endswith(".csv") else pd.read_excel(path)
+    df.columns = [str(c).strip() for c in df.columns]
+    kolom = {c.casefold(): c for c in df.columns}
+    hilang = [c for c in ROSTER_COLUMNS if c.casefold() not in kolom]
+    if hilang:
+        return None, [f"kolom tidak ditemukan: {', '.join(hilang)}"]
+    df = df[[kolom[c.casefold()] for c in ROSTER_COLUMNS]]
+    df.columns = ROSTER_COLUMNS
+    df = df.dropna(how="all")
+    
+    df["Nama"] = df["Nama"].astype("string").str.strip()
+    jiwa = pd.to_numeric(df["Jumlah Jiwa"], errors="coerce")
+    id_beras = pd.to_numeric(df["ID Beras"], errors="coerce")
+    baris = df.index + 2  # Baris 1 adalah header
+    errors = [f"baris {n}: nama kosong" for n in baris[df["Nama"].fillna("").eq("")]]
+    errors += [f"baris {n}: jumlah jiwa dan ID beras harus berupa angka"
+               for n in baris[jiwa.isna() | id_beras.isna()]]
+    errors += [f"baris {n}: jumlah jiwa harus lebih besar dari 0" for n in baris[jiwa <= 0]]
+    df["Jumlah Jiwa"] = jiwa.fillna(0).astype(int)
+    df["ID Beras"] = id_beras.fillna(0).astype(int)
+    return df, errors
+
+def hitung_fitrah(conn, df, tanggal):
+    """Menambahkan kolom kg dan total_harga ke roster dalam satu operasi kolom
+    
+    Harga per kg yang berlaku pada tanggal diambil dengan satu query untuk
+    semua jenis beras, lalu dipetakan ke seluruh roster sekaligus.
+    """
+    harga = fetch_batch(conn, f"SELECT mb.id, {HARGA_BERLAKU_SQL} AS harga FROM master_beras mb", (tanggal,))
+    harga_per_id = dict(zip(harga.column("id"), (float(h) for h in harga.column("harga"))))
+    df["kg"] = df["Jumlah Jiwa"] * FITRAH_KG_PER_JIWA
+    df["total_harga"] = df["kg"] * df["ID Beras"].map(harga_per_id)
+    return df
+
+def add_fitrah_batch(roster_path, tanggal):
+    """Mencatat zakat fitrah seluruh keluarga dalam roster dengan penulisan massal
+    
+    Setiap keluarga menjadi pembayar Fitrah (jumlah = nilai rupiah berasnya)
+    dengan satu transaksi. Roster divalidasi dulu; jika ada baris tidak valid
+    tidak ada yang disimpan. Pembayar ditulis satu per satu agar ID-nya diambil dari
+    lastrowid (ID multi-baris tidak dijamin berurutan, misalnya dengan
+    innodb_autoinc_lock_mode=2 atau auto_increment_increment > 1);
+    transaksi ditulis dengan INSERT multi-baris (BULK_INSERT_ROWS per
+    statement). Semuanya dalam satu transaksi database.
+    """
+    if not os.path.exists(roster_path):
+        print(f"File roster {roster_path} tidak ditemukan!")
+        return False
+    try:
+        df, errors = baca_roster(roster_path)
+    except Exception as e:
+        print(f"Error membaca roster: {e}")
+        return False
+    
     conn = create_database_connection()
     if not conn:
-        return
+        return False
     cursor = None
     try:
-        cursor = conn.cursor(dictionary=True)
+        if df is not None and not errors:
+            df = hitung_fitrah(conn, df, tanggal)
+            errors = [f"ID beras {b} tidak ditemukan (keluarga {n})"
+                      for n, b in zip(df["Nama"][df["total_harga"].isna()], df["ID Beras"][df["total_harga"].isna()])]
+            if df.empty:
+                errors.append("roster tidak berisi keluarga")
+        if errors:
+            print(f"Roster tidak valid, tidak ada data yang disimpan ({len(errors)} masalah):")
+            for pesan in errors[:10]:
+                print(f"  - {pesan}")
+            if len(errors) > 10:
+                print(f"  ... dan {len(errors) - 10} lainnya")
+            return False
+        
+        cursor = conn.cursor()
+        id_zakat = []
+        # jumlah dalam rupiah seperti pembayar lain; kg beras ada di baris transaksi
+        for nama, total in zip(df["Nama"], df["total_harga"].round(2).tolist()):
+            cursor.execute("""INSERT INTO zakat_data (id_lokasi, nama, jenis_zakat, jumlah, tanggal)
+                           VALUES (%s, %s, %s, %s, %s)""", (SITE_ID, nama, "Fitrah", total, tanggal))
+            id_zakat.append(cursor.lastrowid)
+        for start in range(0, len(id_zakat), BULK_INSERT_ROWS):
+            chunk = id_zakat[start:start + BULK_INSERT_ROWS]
+            catat_outbox(cursor, "zakat", "insert", f"id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+        
+        transaksi_rows = list(zip([SITE_ID] * len(id_zakat), id_zakat, df["ID Beras"].tolist(), df["kg"].tolist(),
+                                  df["total_harga"].round(2).tolist(), [tanggal] * len(id_zakat)))
+        for start in range(0, len(transaksi_rows), BULK_INSERT_ROWS):
+            chunk = transaksi_rows[start:start + BULK_INSERT_ROWS]
+            cursor.executemany("""INSERT INTO transaksi_zakat (id_lokasi, id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
+                               VALUES (%s, %s, %s, %s, %s, %s)""", chunk)
+            # Pembayar baru punya tepat satu transaksi, jadi id_zakat menunjuk barisnya
+            catat_outbox(cursor, "transaksi", "insert", f"id_zakat IN ({', '.join(['%s'] * len(chunk))})",
+                         [row[1] for row in chunk])
+        bump_data_version(cursor, "zakat", "transaksi")
+        conn.commit()
+        
+        print(f"\nZakat fitrah {len(df)} keluarga ({int(df['Jumlah Jiwa'].sum())} jiwa) berhasil dicatat")
+        print(f"Total beras: {df['kg'].sum():,.2f} kg")
+        print(f"Total harga: Rp{df['total_harga'].sum():,.2f}")
+        return True
+    except Error as err:
+        print(f"Error database: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def view_transaksi_zakat():
+    """Menampilkan data transaksi zakat per halaman"""
+    conn = get_read_session()
+    if not conn:
+        return
+    try:
         query = """SELECT tz.id, z.nama, z.jenis_zakat, mb.nama_beras, 
                 tz.jumlah_beras, tz.total_harga, tz.tanggal
                 FROM transaksi_zakat tz
-                JOIN zakat_data z ON tz.id_zakat = z.id
+                JOIN zakat_data z ON tz.id_zakat = z.id AND z.id_lokasi = tz.id_lokasi
                 JOIN master_beras mb ON tz.id_beras = mb.id"""
-        cursor.execute(query)
+        fetch_page = make_page_fetcher(conn, query, ["z.nama", "mb.nama_beras"], "tz.id",
+                                       where="tz.id_lokasi = %s", where_params=(SITE_ID,))
         
-        results = cursor.fetchall()
-        if not results:
-            print("\nBelum ada data transaksi")
-            return
-            
-        print("\n{:<5} {:<20} {:<15} {:<15} {:<10} {:<15} {:<10}".format(
-            "ID", "Nama", "Jenis Zakat", "Beras", "Jumlah", "Total", "Tanggal"))
-        print("-"*90)
-        for row in results:
-            print(f"{row['id']:<5} {row['nama']:<20} {row['jenis_zakat']:<15} "
-                f"{row['nama_beras']:<15} {row['jumlah_beras']:<10} "
-                f"Rp{row['total_harga']:<10,.2f} {row['tanggal']}")
+        def format_row(row):
+            id, nama, jenis_zakat, nama_beras, jumlah_beras, total_harga, tanggal = row
+            return (f"{id:<5} {nama:<20} {jenis_zakat:<15} "
+                    f"{nama_beras:<15} {jumlah_beras:<10} "
+                    f"Rp{total_harga:<10,.2f} {tanggal}")
+        
+        render_paged(
+            "Data Transaksi Zakat",
+            "{:<5} {:<20} {:<15} {:<15} {:<10} {:<15} {:<10}".format(
+                "ID", "Nama", "Jenis Zakat", "Beras", "Jumlah", "Total", "Tanggal"),
+            90, fetch_page, format_row,
+            cache_key=("transaksi",) + data_versions(conn, "transaksi", "zakat", "beras"),
+            empty_message="\nBelum ada data transaksi")
     except Error as err:
         print(f"Error database: {err}")
     finally:
-        if cursor: cursor.close()
         conn.close()
 
-def export_to_excel():
+def fetch_batch(conn, query, params=None):
+    """Menjalankan query dan mengembalikan hasilnya sebagai RecordBatch"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(query, params or ())
+        return RecordBatch.from_cursor(cursor)
+    finally:
+        cursor.close()
+
+# Ekspor berjalan di thread terpisah dengan koneksinya sendiri, jadi kasir
+# tetap bisa mencatat pembayaran. Job menghitung baris yang sudah ditulis,
+# memeriksa permintaan batal di antara potongan baris dan menyimpan pesan
+# hasilnya untuk ditampilkan menu.
+EXPORT_PROGRESS_ROWS = 1000
+
+class ExportCancelled(BaseException):
+    """Dilempar di dalam ekspor yang job-nya dibatalkan
+
+    Turunan BaseException (seperti KeyboardInterrupt) supaya penanganan
+    error umum di fungsi ekspor tidak melaporkannya sebagai kegagalan.
+    """
+
+class ExportJob:
+    """Satu ekspor yang berjalan di thread latar"""
+
+    def __init__(self, id, nama, func, args=()):
+        self.id = id
+        self.nama = nama
+        self.total = 0
+        self.ditulis = 0
+        self.status = "berjalan"
+        self.pesan = []
+        self.gagal = False
+        self.dilaporkan = False
+        self.mulai = time.perf_counter()
+        self.berakhir = None
+        self.batal = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(func, args),
+                                       name=f"ekspor-{id}", daemon=True)
+
+    def run(self, func, args):
+        try:
+            func(*args, job=self)
+            self.status = "gagal" if self.gagal else "selesai"
+        except ExportCancelled:
+            self.status = "dibatalkan"
+        except Exception as e:
+            self.pesan.append(f"Error ekspor: {e}")
+            self.status = "gagal"
+        finally:
+            self.berakhir = time.perf_counter()
+
+    def tambah_total(self, baris):
+        self.total += baris
+
+    def maju(self, baris):
+        """Mencatat baris yang sudah ditulis; melempar ExportCancelled jika job dibatalkan"""
+        self.ditulis += baris
+        if self.batal.is_set():
+            raise ExportCancelled()
+
+    def log(self, pesan, error=False):
+        self.pesan.append(pesan)
+        self.gagal = self.gagal or error
+
+    def berjalan(self):
+        return self.berakhir is None
+
+    def kecepatan(self):
+        """Baris per detik sejauh ini"""
+        durasi = (self.berakhir or time.perf_counter()) - self.mulai
+        return self.ditulis / durasi if durasi > 0 else 0.0
+
+    def eta(self):
+        """Perkiraan sisa detik, atau None jika belum bisa dihitung"""
+        kecepatan = self.kecepatan()
+        if self.status != "berjalan" or not self.total or kecepatan <= 0:
+            return None
+        return max(self.total - self.ditulis, 0) / kecepatan
+
+_export_jobs = OrderedDict()  # id -> ExportJob
+
+def export_message(job, pesan, error=False):
+    """Mencetak pesan hasil ekspor, atau menyimpannya di job jika berjalan di latar"""
+    if job is None:
+        print(pesan)
+    else:
+        job.log(pesan, error)
+
+def tulis_excel(path, df, job=None, sheet_name="Sheet1"):
+    """Menulis DataFrame ke xlsx per EXPORT_PROGRESS_ROWS baris
+    
+    File ditulis ke file sementara lalu diganti namanya, jadi ekspor yang
+    dibatalkan atau gagal tidak meninggalkan file setengah jadi.
+    """
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(os.path.abspath(path)))
+    os.close(fd)
+    try:
+        with pd.ExcelWriter(tmp_path, engine="openpyxl") as writer:
+            for start in range(0, max(len(df), 1), EXPORT_PROGRESS_ROWS):
+                chunk = df.iloc[start:start + EXPORT_PROGRESS_ROWS]
+                chunk.to_excel(writer, index=False, sheet_name=sheet_name,
+                               startrow=start + 1 if start else 0, header=start == 0)
+                if job is not None:
+                    job.maju(len(chunk))
+            if job is not None:
+                job.status = "menyimpan"
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    finally:
+        if job is not None and job.status == "menyimpan":
+            job.status = "berjalan"
+
+def start_export_job(nama, func, *args):
+    """Menjalankan fungsi ekspor (yang menerima job=) di thread latar"""
+    for job in _export_jobs.values():
+        if job.nama == nama and job.berjalan():
+            print(f"Ekspor {nama} masih berjalan (#{job.id})")
+            return None
+    job = ExportJob(len(_export_jobs) + 1, nama, func, args)
+    _export_jobs[job.id] = job
+    job.thread.start()
+    print(f"Ekspor #{job.id} ({nama}) berjalan di latar. Lihat progresnya di menu Progres Ekspor Latar.")
+    return job
+
+def format_durasi(detik):
+    if detik is None:
+        return "-"
+    menit, detik = divmod(int(detik), 60)
+    return f"{menit:02d}:{detik:02d}"
+
+def view_export_jobs():
+    """Menampilkan progres, kecepatan dan ETA ekspor latar"""
+    if not _export_jobs:
+        print("Belum ada ekspor latar.")
+        return
+    print("{:<4} {:<12} {:<11} {:<22} {:>12} {:>6}".format(
+        "ID", "Ekspor", "Status", "Baris", "Baris/detik", "ETA"))
+    print("-"*72)
+    for job in _export_jobs.values():
+        progres = f"{job.ditulis}/{job.total}" if job.total else str(job.ditulis)
+        if job.total:
+            progres += f" ({min(job.ditulis / job.total, 1.0):.0%})"
+        print("{:<4} {:<12} {:<11} {:<22} {:>12.0f} {:>6}".format(
+            job.id, job.nama, job.status, progres, job.kecepatan(), format_durasi(job.eta())))
+
+def cancel_export_job(id):
+    """Meminta ekspor latar berhenti; file setengah jadinya dihapus"""
+    try:
+        job = _export_jobs.get(int(id))
+    except ValueError:
+        job = None
+    if job is None:
+        print("Ekspor tidak ditemukan.")
+        return False
+    if not job.berjalan():
+        print(f"Ekspor #{job.id} sudah {job.status}.")
+        return False
+    job.batal.set()
+    print(f"Ekspor #{job.id} akan dihentikan.")
+    return True
+
+def report_finished_exports():
+    """Mencetak hasil ekspor latar yang selesai sejak pemanggilan terakhir"""
+    for job in _export_jobs.values():
+        if job.berjalan() or job.dilaporkan:
+            continue
+        job.dilaporkan = True
+        print(f"\n[Ekspor #{job.id} {job.nama} {job.status}]")
+        for pesan in job.pesan:
+            print(pesan)
+
+def wait_export_jobs():
+    """Menunggu ekspor yang masih berjalan sebelum program keluar"""
+    berjalan = [job for job in _export_jobs.values() if job.berjalan()]
+    if berjalan:
+        print("Menunggu ekspor latar selesai...")
+        for job in berjalan:
+            job.thread.join()
+        report_finished_exports()
+
+def export_to_excel(job=None):
     """Mengekspor data zakat ke file Excel"""
+    conn = None
     try:
-        conn = create_database_connection()
+        conn = create_read_connection()
         if not conn:
+            export_message(job, "Gagal terhubung ke database.", error=True)
             return
-            
+        batch_zakat = fetch_batch(conn, ZAKAT_EXPORT_QUERY, (SITE_ID,))
+        batch_transaksi = fetch_batch(conn, TRANSAKSI_EXPORT_QUERY, (SITE_ID,))
+        conn.close()
+        conn = None
+        if job is not None:
+            job.tambah_total(len(batch_zakat) + len(batch_transaksi))
+        file_zakat, file_transaksi = nama_lokasi("data_zakat.xlsx"), nama_lokasi("data_transaksi_zakat.xlsx")
+        
         # Ekspor data zakat
-        df_zakat = pd.read_sql("SELECT * FROM zakat_data", conn)
-        df_zakat.to_excel("data_zakat.xlsx", index=False)
+        tulis_excel(file_zakat, pd.DataFrame(batch_zakat.to_dict()), job)
         
         # Ekspor data transaksi
-        df_transaksi = pd.read_sql("""
-            SELECT tz.id, z.nama, z.jenis_zakat, mb.nama_beras, 
-                   tz.jumlah_beras, tz.total_harga, tz.tanggal
-            FROM transaksi_zakat tz
-            JOIN zakat_data z ON tz.id_zakat = z.id
-            JOIN master_beras mb ON tz.id_beras = mb.id
-        """, conn)
-        df_transaksi.to_excel("data_transaksi_zakat.xlsx", index=False)
-        
-        print("Data berhasil diekspor ke:")
-        print("- data_zakat.xlsx (Data pembayar zakat)")
-        print("- data_transaksi_zakat.xlsx (Data transaksi zakat)")
+        tulis_excel(file_transaksi, pd.DataFrame(batch_transaksi.to_dict()), job)
+        
+        export_message(job, "Data berhasil diekspor ke:")
+        export_message(job, f"- {file_zakat} (Data pembayar zakat)")
+        export_message(job, f"- {file_transaksi} (Data transaksi zakat)")
+    except Exception as e:
+        export_message(job, f"Error ekspor data: {e}", error=True)
+    finally:
+        if conn: conn.close()
+
+# Ekspor inkremental: setiap dataset menyimpan watermark di EXPORT_STATE_FILE
+# (satu file per lokasi). zakat_data dan transaksi_zakat memakai (updated_at,
+# id) sehingga baris yang diubah ikut terbawa, penghapusannya dicatat di
+# ekspor_hapus. master_beras hanya bertambah sehingga cukup memakai id.
+EXPORT_STATE_FILE = "export_state_mysql.json"
+EXPORT_DELTA_DIR = "export_delta"
+
+# Query ekspor lokasi ini (parameter pertama: id_lokasi)
+ZAKAT_EXPORT_QUERY = "SELECT id, nama, jenis_zakat, jumlah, tanggal FROM zakat_data WHERE id_lokasi = %s"
+TRANSAKSI_EXPORT_QUERY = """
+    SELECT tz.id, z.nama, z.jenis_zakat, mb.nama_beras,
+           tz.jumlah_beras, tz.total_harga, tz.tanggal
+    FROM transaksi_zakat tz
+    JOIN zakat_data z ON tz.id_zakat = z.id AND z.id_lokasi = tz.id_lokasi
+    JOIN master_beras mb ON tz.id_beras = mb.id
+    WHERE tz.id_lokasi = %s
+"""
+
+# Query delta: kolom yang sama ditambah updated_at untuk watermark
+ZAKAT_DELTA_QUERY = "SELECT id, nama, jenis_zakat, jumlah, tanggal, updated_at FROM zakat_data WHERE id_lokasi = %s"
+TRANSAKSI_DELTA_QUERY = """
+    SELECT tz.id, z.nama, z.jenis_zakat, mb.nama_beras,
+           tz.jumlah_beras, tz.total_harga, tz.tanggal, tz.updated_at
+    FROM transaksi_zakat tz
+    JOIN zakat_data z ON tz.id_zakat = z.id AND z.id_lokasi = tz.id_lokasi
+    JOIN master_beras mb ON tz.id_beras = mb.id
+    WHERE tz.id_lokasi = %s
+"""
+
+def load_export_state():
+    """Membaca watermark ekspor terakhir lokasi ini"""
+    state = {}
+    if os.path.exists(nama_lokasi(EXPORT_STATE_FILE)):
+        with open(nama_lokasi(EXPORT_STATE_FILE), "r", encoding="utf-8") as f:
+            state = json.load(f)
+    for dataset in ("zakat", "transaksi"):
+        wm = state.setdefault(dataset, {})
+        # Watermark lama transaksi hanya berisi id; ekspor berikutnya mengirim
+        # ulang semua transaksi sekali sebagai "ubah"
+        wm.setdefault("max_id", wm.get("id", 0))
+        wm.setdefault("updated_at", None)
+        wm.setdefault("id", 0)
+    state.setdefault("beras", {"id": 0})
+    state.setdefault("hapus", {"id": 0})
+    return state
+
+def ambil_delta(conn, query, wm, batas, alias=""):
+    """Baris lokasi ini yang baru atau berubah sejak watermark (updated_at, id), urut watermark
+
+    Hanya baris bertanda waktu sebelum batas (lihat batas_commit) yang
+    diambil; baris sesudahnya mungkin didahului baris transaksi yang belum
+    commit, jadi menunggu ekspor berikutnya agar watermark tidak melewatinya.
+    """
+    query += f" AND {alias}updated_at < %s"
+    params = (SITE_ID, batas)
+    if wm["updated_at"]:
+        query += f" AND ({alias}updated_at > %s OR ({alias}updated_at = %s AND {alias}id > %s))"
+        params += (wm["updated_at"], wm["updated_at"], wm["id"])
+    query += f" ORDER BY {alias}updated_at, {alias}id"
+    return fetch_batch(conn, query, params)
+
+def save_export_state(state):
+    """Menyimpan watermark ekspor secara atomik"""
+    tmp_path = nama_lokasi(EXPORT_STATE_FILE) + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2, default=str)
+    os.replace(tmp_path, nama_lokasi(EXPORT_STATE_FILE))
+
+def export_incremental(job=None):
+    """Mengekspor hanya baris yang baru/berubah/dihapus sejak ekspor terakhir"""
+    conn = None
+    written = []
+    try:
+        conn = create_read_connection()
+        if not conn:
+            export_message(job, "Gagal terhubung ke database.", error=True)
+            return
+        state = load_export_state()
+        os.makedirs(EXPORT_DELTA_DIR, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        
+        batas = batas_commit(conn)
+        
+        # Penghapusan zakat dan transaksi sejak ekspor terakhir. ID penanda
+        # dibagikan saat INSERT, jadi hanya penanda sebelum batas yang dibaca
+        # agar watermark id tidak melewati penanda yang belum commit
+        hapus = fetch_batch(conn, """SELECT id, dataset, id_data FROM ekspor_hapus
+                            WHERE dataset IN ('zakat', 'transaksi') AND id_lokasi = %s AND id > %s
+                            AND dihapus_pada < %s ORDER BY id""", (SITE_ID, state["hapus"]["id"], batas))
+        
+        # Zakat dan transaksi: baru atau diubah sejak watermark (updated_at, id)
+        for dataset, query, alias in (("zakat", ZAKAT_DELTA_QUERY, ""),
+                                      ("transaksi", TRANSAKSI_DELTA_QUERY, "tz.")):
+            wm = state[dataset]
+            batch = ambil_delta(conn, query, wm, batas, alias)
+            dihapus = [id for ds, id in zip(hapus.column("dataset"), hapus.column("id_data")) if ds == dataset]
+            if not (batch or dihapus):
+                continue
+            df = pd.DataFrame(batch.to_dict()).drop(columns=["updated_at"], errors="ignore")
+            df.insert(0, "status", ["baru" if i > wm["max_id"] else "ubah" for i in batch.column("id")])
+            if dihapus:
+                df = pd.concat([df, pd.DataFrame({"status": "hapus", "id": dihapus})], ignore_index=True)
+            if job is not None:
+                job.tambah_total(len(df))
+            filename = os.path.join(EXPORT_DELTA_DIR, nama_lokasi(dataset) + f"_delta_{timestamp}.xlsx")
+            tulis_excel(filename, df, job)
+            written.append((filename, len(df)))
+            if batch:
+                state[dataset] = {"updated_at": batch.column("updated_at")[-1], "id": batch.column("id")[-1],
+                                  "max_id": max(wm["max_id"], max(batch.column("id")))}
+        if hapus:
+            state["hapus"]["id"] = hapus.column("id")[-1]
+        
+        # Master beras (milik semua lokasi): hanya bertambah
+        wm = state["beras"]
+        batch = fetch_batch(conn, "SELECT id, nama_beras, harga_per_kg FROM master_beras WHERE id > %s ORDER BY id",
+                            (wm["id"],))
+        if batch:
+            df = pd.DataFrame(batch.to_dict())
+            df.insert(0, "status", "baru")
+            if job is not None:
+                job.tambah_total(len(df))
+            filename = os.path.join(EXPORT_DELTA_DIR, nama_lokasi("beras") + f"_delta_{timestamp}.xlsx")
+            tulis_excel(filename, df, job)
+            written.append((filename, len(df)))
+            wm["id"] = batch.column("id")[-1]
+        
+        save_export_state(state)
+        if not written:
+            export_message(job, "Tidak ada perubahan sejak ekspor terakhir.")
+            return
+        export_message(job, "Ekspor inkremental selesai:")
+        for filename, count in written:
+            export_message(job, f"- {filename} ({count} baris)")
+    except ExportCancelled:
+        # Watermark belum disimpan, jadi delta yang sudah ditulis ikut dibuang
+        for filename, _ in written:
+            os.remove(filename)
+        raise
     except Exception as e:
-        print(f"Error ekspor data: {e}")
+        export_message(job, f"Error ekspor inkremental: {e}", error=True)
     finally:
         if conn: conn.close()
 
+def consolidate_deltas():
+    """Menggabungkan file delta lokasi ini menjadi satu file konsolidasi per dataset"""
+    try:
+        if not os.path.isdir(EXPORT_DELTA_DIR):
+            print("Belum ada file delta.")
+            return
+        for dataset in ("zakat", "beras", "transaksi"):
+            dasar = nama_lokasi(dataset)
+            prefix = f"{dasar}_delta_"
+            delta_files = sorted(f for f in os.listdir(EXPORT_DELTA_DIR)
+                                 if f.startswith(prefix) and f.endswith(".xlsx"))
+            if not delta_files:
+                continue
+            
+            target = os.path.join(EXPORT_DELTA_DIR, f"{dasar}_konsolidasi.xlsx")
+            frames = []
+            if os.path.exists(target):
+                frames.append(pd.read_excel(target).assign(status="baru"))
+            frames.extend(pd.read_excel(os.path.join(EXPORT_DELTA_DIR, f)) for f in delta_files)
+            
+            # Urutan file = urutan waktu, jadi perubahan terakhir yang dipakai
+            merged = pd.concat(frames, ignore_index=True).drop_duplicates(subset="id", keep="last")
+            merged = merged[merged["status"] != "hapus"].drop(columns=["status"]).sort_values("id")
+            merged.to_excel(target, index=False)
+            for f in delta_files:
+                os.remove(os.path.join(EXPORT_DELTA_DIR, f))
+            print(f"{len(delta_files)} file delta {dataset} digabung ke {target}")
+    except Exception as e:
+        print(f"Error konsolidasi delta: {e}")
+
+# Ekspor paralel: serialisasi xlsx (pembuatan XML) berat di CPU, jadi setiap
+# dataset atau potongan baris ditulis di proses terpisah.
+EXPORT_WORKERS = os.cpu_count() or 1
+EXPORT_SHARD_ROWS = 50000
+
+def write_export_part(task):
+    """Menulis satu dataset/potongan ke file xlsx (dijalankan di proses worker)"""
+    path, sheet_name, columns = task
+    pd.DataFrame(columns).to_excel(path, index=False, sheet_name=sheet_name)
+    return path, len(next(iter(columns.values()), []))
+
+def build_export_tasks(output_dir, batches, shard_rows):
+    """Memecah setiap RecordBatch menjadi tugas (path, sheet, kolom) per potongan baris"""
+    tasks = []
+    for dataset, batch in batches.items():
+        if len(batch) <= shard_rows:
+            tasks.append((os.path.join(output_dir, f"data_{dataset}.xlsx"), dataset, batch.to_dict()))
+            continue
+        for part, start in enumerate(range(0, len(batch), shard_rows), start=1):
+            columns = {name: col[start:start + shard_rows] for name, col in zip(batch.names, batch.columns)}
+            path = os.path.join(output_dir, f"data_{dataset}_part{part:03d}.xlsx")
+            tasks.append((path, f"{dataset} {part}", columns))
+    return tasks
+
+def run_export_tasks(tasks, workers, job=None):
+    """Menjalankan tugas ekspor langsung (1 worker) atau di process pool
+    
+    Dengan job, progres dihitung per tugas yang selesai dan pembatalan
+    membuang tugas yang belum mulai.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        results = []
+        for task in tasks:
+            results.append(write_export_part(task))
+            if job is not None:
+                job.maju(results[-1][1])
+        return results
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        if job is None:
+            return list(pool.map(write_export_part, tasks))
+        futures = [pool.submit(write_export_part, task) for task in tasks]
+        results = []
+        try:
+            for future in as_completed(futures):
+                results.append(future.result())
+                job.maju(results[-1][1])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return results
+
+def export_parallel(workers=None, shard_rows=None, job=None):
+    """Mengekspor data zakat, beras dan transaksi secara paralel"""
+    workers = workers or EXPORT_WORKERS
+    shard_rows = shard_rows or EXPORT_SHARD_ROWS
+    conn = None
+    output_dir = None
+    try:
+        conn = create_read_connection()
+        if not conn:
+            export_message(job, "Gagal terhubung ke database.", error=True)
+            return
+        batches = {
+            "zakat": fetch_batch(conn, ZAKAT_EXPORT_QUERY, (SITE_ID,)),
+            "beras": fetch_batch(conn, "SELECT id, nama_beras, harga_per_kg FROM master_beras"),
+            "transaksi_zakat": fetch_batch(conn, TRANSAKSI_EXPORT_QUERY, (SITE_ID,)),
+        }
+        conn.close()
+        conn = None
+        if job is not None:
+            job.tambah_total(sum(len(batch) for batch in batches.values()))
+        
+        output_dir = nama_lokasi("data_export") + "_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        os.makedirs(output_dir, exist_ok=True)
+        start = time.perf_counter()
+        results = run_export_tasks(build_export_tasks(output_dir, batches, shard_rows), workers, job)
+        elapsed = time.perf_counter() - start
+        
+        export_message(job, f"Data berhasil diekspor ke folder: {os.path.abspath(output_dir)}")
+        for path, count in sorted(results):
+            export_message(job, f"- {os.path.basename(path)} ({count} baris)")
+        export_message(job, f"Waktu serialisasi: {elapsed:.2f} detik dengan {workers} worker")
+    except ExportCancelled:
+        if output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+    except Exception as e:
+        export_message(job, f"Error ekspor paralel: {e}", error=True)
+    finally:
+        if conn: conn.close()
+
+def benchmark_prepared(iterations=500):
+    """Membandingkan latensi query teks biasa dengan prepared statement dari cache sesi
+    
+    Memakai query yang sama dengan add_zakat, validasi add_transaksi_zakat dan
+    halaman view_transaksi_zakat. INSERT dilakukan dalam transaksi yang
+    dibatalkan di akhir, jadi data tidak berubah.
+    """
+    text_conn = create_database_connection()
+    session = get_session()
+    if not text_conn or not session:
+        return
+    try:
+        ids = fetch_batch(text_conn, """SELECT (SELECT MIN(id) FROM zakat_data WHERE id_lokasi = %s) AS z,
+                          (SELECT MIN(id) FROM master_beras) AS b""", (SITE_ID,))
+        id_zakat, id_beras = ids.column("z")[0], ids.column("b")[0]
+        if id_zakat is None or id_beras is None:
+            print("Benchmark membutuhkan minimal satu data zakat dan satu data beras")
+            return
+        transaksi_page = """SELECT tz.id, z.nama, z.jenis_zakat, mb.nama_beras,
+                tz.jumlah_beras, tz.total_harga, tz.tanggal
+                FROM transaksi_zakat tz
+                JOIN zakat_data z ON tz.id_zakat = z.id AND z.id_lokasi = tz.id_lokasi
+                JOIN master_beras mb ON tz.id_beras = mb.id WHERE tz.id_lokasi = %s ORDER BY tz.id LIMIT %s OFFSET %s"""
+        statements = [
+            ("INSERT zakat (add_zakat)",
+             "INSERT INTO zakat_data (id_lokasi, nama, jenis_zakat, jumlah, tanggal) VALUES (%s, %s, %s, %s, %s)",
+             (SITE_ID, "Benchmark", "Fitrah", 2.5, "2026-01-01")),
+            ("SELECT validasi zakat", "SELECT id FROM zakat_data WHERE id = %s AND id_lokasi = %s", (id_zakat, SITE_ID)),
+            ("SELECT harga berlaku", f"SELECT {HARGA_BERLAKU_SQL} FROM master_beras mb WHERE mb.id = %s",
+             ("2026-01-01", id_beras)),
+            ("JOIN halaman transaksi", transaksi_page, (SITE_ID, PAGE_SIZE + 1, 0)),
+        ]
+        
+        def measure(run):
+            latencies = []
+            for _ in range(iterations):
+                start = time.perf_counter()
+                run()
+                latencies.append(time.perf_counter() - start)
+            latencies.sort()
+            return latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.95)]
+        
+        print(f"\nBenchmark prepared statement ({iterations} kali per query):")
+        print("{:<26} {:>14} {:>14} {:>14} {:>14}".format(
+            "Query", "Teks p50 (us)", "Teks p95 (us)", "Prep p50 (us)", "Prep p95 (us)"))
+        print("-"*86)
+        for label, sql, params in statements:
+            def run_text():
+                cursor = text_conn.cursor()
+                cursor.execute(sql, params)
+                if cursor.description is not None:
+                    cursor.fetchall()
+                cursor.close()
+            
+            def run_prepared():
+                cursor = session.execute(sql, params)
+                if cursor.description is not None:
+                    cursor.fetchall()
+            
+            text_p50, text_p95 = measure(run_text)
+            prep_p50, prep_p95 = measure(run_prepared)
+            print("{:<26} {:>14.0f} {:>14.0f} {:>14.0f} {:>14.0f}".format(
+                label, text_p50 * 1e6, text_p95 * 1e6, prep_p50 * 1e6, prep_p95 * 1e6))
+    except Error as err:
+        print(f"Error database: {err}")
+    finally:
+        text_conn.rollback()
+        text_conn.close()
+        session.rollback()
+
+def benchmark_export_parallel(rows=200000, worker_counts=None, shard_rows=None):
+    """Mengukur waktu ekspor paralel dengan data sintetis untuk beberapa jumlah worker"""
+    shard_rows = shard_rows or EXPORT_SHARD_ROWS
+    cpu = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, 2, 4, cpu})
+    tanggal = [datetime.date(2025, 3, 1 + i % 28) for i in range(rows)]
+    batches = {
+        "zakat": RecordBatch(Zakat.FIELDS, [
+            list(range(1, rows // 4 + 1)), [f"Nama {i}" for i in range(rows // 4)],
+            ["Fitrah"] * (rows // 4), [35000.0] * (rows // 4), tanggal[:rows // 4]]),
+        "transaksi_zakat": RecordBatch(Transaksi.FIELDS, [
+            list(range(1, rows + 1)), [i % 1000 + 1 for i in range(rows)], [i % 3 + 1 for i in range(rows)],
+            [2.5] * rows, [30000.0] * rows, tanggal]),
+    }
+    print(f"Benchmark ekspor paralel: {rows} transaksi, shard {shard_rows} baris, {cpu} CPU")
+    print("{:<8} {:<10} {:<8}".format("Worker", "Detik", "Speedup"))
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for workers in worker_counts:
+            tasks = build_export_tasks(tmp_dir, batches, shard_rows)
+            start = time.perf_counter()
+            run_export_tasks(tasks, workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print("{:<8} {:<10.2f} {:<8.2f}".format(workers, elapsed, baseline / elapsed))
+
+def search_zakat(nama_prefix=None, tanggal_mulai=None, tanggal_akhir=None, jenis_zakat=None, limit=200):
+    """Mencari pembayar zakat berdasarkan awalan nama, rentang tanggal dan jenis zakat
+
+    Setiap kriteria memakai index (LIKE 'awalan%' pada idx_zakat_lokasi_nama,
+    rentang pada idx_zakat_tanggal / idx_zakat_jenis_tanggal). Filter lokasi
+    dan rentang tanggal sekaligus memangkas partisi yang dibaca.
+    """
+    conn = get_session()
+    if not conn:
+        return RecordBatch(Zakat.FIELDS)
+    try:
+        conditions = ["id_lokasi = %s"]
+        params = [SITE_ID]
+        if nama_prefix:
+            escaped = nama_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            conditions.append("nama LIKE %s")
+            params.append(escaped + "%")
+        if jenis_zakat:
+            conditions.append("jenis_zakat = %s")
+            params.append(jenis_zakat)
+        if tanggal_mulai:
+            conditions.append("tanggal >= %s")
+            params.append(tanggal_mulai)
+        if tanggal_akhir:
+            conditions.append("tanggal <= %s")
+            params.append(tanggal_akhir)
+        
+        query = "SELECT id, nama, jenis_zakat, jumlah, tanggal FROM zakat_data WHERE " + " AND ".join(conditions)
+        query += " ORDER BY nama LIMIT %s"
+        params.append(limit)
+        return fetch_batch(conn, query, params)
+    except Error as err:
+        print(f"Error database: {err}")
+        return RecordBatch(Zakat.FIELDS)
+    finally:
+        conn.close()
+
+def lookup_payers(conn, teks, limit=10):
+    """Pembayar teratas yang namanya diawali teks (untuk pencarian sambil mengetik)
+    
+    id_lokasi = ? AND LIKE 'awalan%' + ORDER BY nama berjalan sebagai range
+    scan pada idx_zakat_lokasi_nama dan berhenti setelah limit baris, sehingga
+    waktunya tidak bergantung pada jumlah pembayar.
+    """
+    query = """SELECT id, nama, jenis_zakat FROM zakat_data WHERE id_lokasi = %s AND nama LIKE %s
+            ORDER BY nama LIMIT %s"""
+    escaped = " ".join(teks.split()).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return fetch_batch(conn, query, (SITE_ID, escaped + "%", limit))
+
+def pilih_pembayar(conn):
+    """Memilih pembayar dengan mengetik sebagian nama atau langsung ID-nya
+    
+    Mengembalikan (id, nama), atau None jika dibatalkan dengan input kosong.
+    """
+    while True:
+        teks = input("\nKetik nama pembayar untuk mencari, atau ID (kosong = batal): ").strip()
+        if not teks:
+            return None
+        if teks.isdigit():
+            hasil = fetch_batch(conn, "SELECT id, nama FROM zakat_data WHERE id = %s AND id_lokasi = %s",
+                                (int(teks), SITE_ID))
+            if hasil:
+                return hasil.column("id")[0], hasil.column("nama")[0]
+            print("ID pembayar tidak valid!")
+            continue
+        hasil = lookup_payers(conn, teks)
+        if not hasil:
+            print("Tidak ada pembayar yang cocok")
+            continue
+        if len(hasil) == 1:
+            id, nama, jenis_zakat = next(hasil.rows())
+            if input(f"Pilih {id} - {nama} ({jenis_zakat})? (y/n): ").strip().lower() == "y":
+                return id, nama
+            continue
+        print("{:<5} {:<25} {:<15}".format("ID", "Nama", "Jenis Zakat"))
+        print("-"*45)
+        for id, nama, jenis_zakat in hasil.rows():
+            print("{:<5} {:<25} {:<15}".format(id, nama, jenis_zakat))
+
+def arsip_musim(tahun):
+    """Memindahkan musim (tahun) yang sudah ditutup di lokasi ini ke tabel arsip
+    
+    Semua transaksi lokasi ini bertanggal di tahun itu dipindahkan. Pembayar
+    tahun itu ikut dipindahkan hanya jika tidak punya transaksi aktif di luar
+    musim tersebut. Setiap query difilter id_lokasi dan rentang musim, jadi
+    hanya subpartisi lokasi ini di partisi musim itu yang dibaca dan
+    dihapus; lokasi lain tidak tersentuh. Salin, ringkasan dan hapus berjalan
+    dalam satu transaksi database, jadi kegagalan di tengah jalan tidak
+    meninggalkan data ganda. Mengarsipkan musim yang sama lagi hanya
+    memindahkan baris yang tersisa.
+    """
+    if tahun >= datetime.date.today().year:
+        print("Hanya musim yang sudah lewat yang bisa diarsipkan!")
+        return False
+    conn = get_session()
+    if not conn:
+        return False
+    cursor = None
+    mulai, akhir = datetime.date(tahun, 1, 1), datetime.date(tahun + 1, 1, 1)
+    musim = (SITE_ID, mulai, akhir)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""INSERT INTO transaksi_zakat_arsip
+                       (id, id_lokasi, id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
+                       SELECT id, id_lokasi, id_zakat, id_beras, jumlah_beras, total_harga, tanggal
+                       FROM transaksi_zakat WHERE id_lokasi = %s AND tanggal >= %s AND tanggal < %s""", musim)
+        jumlah_transaksi = cursor.rowcount
+        cursor.execute("""INSERT INTO zakat_data_arsip (id, id_lokasi, nama, jenis_zakat, jumlah, tanggal)
+                       SELECT z.id, z.id_lokasi, z.nama, z.jenis_zakat, z.jumlah, z.tanggal FROM zakat_data z
+                       WHERE z.id_lokasi = %s AND z.tanggal >= %s AND z.tanggal < %s
+                       AND NOT EXISTS (SELECT 1 FROM transaksi_zakat t WHERE t.id_lokasi = z.id_lokasi
+                                       AND t.id_zakat = z.id AND (t.tanggal < %s OR t.tanggal >= %s))""",
+                       musim + (mulai, akhir))
+        jumlah_zakat = cursor.rowcount
+        
+        catat_outbox(cursor, "transaksi", "arsip", "tanggal >= %s AND tanggal < %s", (mulai, akhir))
+        catat_outbox(cursor, "zakat", "arsip", """tanggal >= %s AND tanggal < %s AND id IN (SELECT id
+                     FROM zakat_data_arsip WHERE id_lokasi = %s AND tanggal >= %s AND tanggal < %s)""",
+                     (mulai, akhir) + musim)
+        cursor.execute("""DELETE FROM transaksi_zakat WHERE id_lokasi = %s AND tanggal >= %s AND tanggal < %s""",
+                       musim)
+        cursor.execute("""DELETE z FROM zakat_data z JOIN zakat_data_arsip a ON a.id = z.id
+                       WHERE z.id_lokasi = %s AND z.tanggal >= %s AND z.tanggal < %s
+                       AND a.id_lokasi = z.id_lokasi AND a.tanggal >= %s AND a.tanggal < %s""",
+                       musim + (mulai, akhir))
+        
+        # Ringkasan dihitung ulang dari arsip, sehingga arsip bertahap tetap benar
+        cursor.execute("""SELECT
+                       COALESCE(SUM(jenis_zakat = 'Fitrah'), 0), COALESCE(SUM(jenis_zakat = 'Mal'), 0),
+                       COALESCE(SUM(CASE WHEN jenis_zakat = 'Fitrah' THEN jumlah END), 0),
+                       COALESCE(SUM(CASE WHEN jenis_zakat = 'Mal' THEN jumlah END), 0)
+                       FROM zakat_data_arsip WHERE id_lokasi = %s AND tanggal >= %s AND tanggal < %s""", musim)
+        ringkasan_zakat = cursor.fetchone()
+        cursor.execute("""SELECT COUNT(*), COALESCE(SUM(jumlah_beras), 0), COALESCE(SUM(total_harga), 0)
+                       FROM transaksi_zakat_arsip WHERE id_lokasi = %s AND tanggal >= %s AND tanggal < %s""",
+                       musim)
+        ringkasan_transaksi = cursor.fetchone()
+        cursor.execute("""INSERT INTO ringkasan_musim (id_lokasi, tahun, pembayar_fitrah, pembayar_mal,
+                       jumlah_fitrah, jumlah_mal, jumlah_transaksi, total_beras_kg, total_harga)
+                       VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                       ON DUPLICATE KEY UPDATE pembayar_fitrah = VALUES(pembayar_fitrah),
+                       pembayar_mal = VALUES(pembayar_mal), jumlah_fitrah = VALUES(jumlah_fitrah),
+                       jumlah_mal = VALUES(jumlah_mal), jumlah_transaksi = VALUES(jumlah_transaksi),
+                       total_beras_kg = VALUES(total_beras_kg), total_harga = VALUES(total_harga)""",
+                       (SITE_ID, tahun) + tuple(ringkasan_zakat) + tuple(ringkasan_transaksi))
+        bump_data_version(cursor, "zakat", "transaksi", "arsip")
+        conn.commit()
+        print(f"Musim {tahun} diarsipkan: {jumlah_zakat} data zakat, {jumlah_transaksi} transaksi")
+        return True
+    except Error as err:
+        print(f"Error database: {err}")
+        conn.rollback()
+        return False
+    finally:
+        if cursor: cursor.close()
+        conn.close()
+
+def view_ringkasan_musim():
+    """Menampilkan ringkasan setiap musim lokasi ini yang sudah diarsipkan"""
+    conn = get_read_session()
+    if not conn:
+        return
+    try:
+        key = ("ringkasan_musim",) + data_versions(conn, "arsip")
+        lines = render_cache_get(key)
+        if lines is None:
+            batch = fetch_batch(conn, """SELECT tahun, pembayar_fitrah, pembayar_mal, jumlah_transaksi,
+                                total_beras_kg, total_harga FROM ringkasan_musim
+                                WHERE id_lokasi = %s ORDER BY tahun""", (SITE_ID,))
+            lines = ["{:<6} {:<10} {:<10} {:<10} {:<12} {:<15}".format(
+                         "Tahun", "Fitrah", "Mal", "Transaksi", "Beras (kg)", "Total Harga"),
+                     "-"*70]
+            for tahun, fitrah, mal, transaksi, beras, harga in batch.rows():
+                lines.append("{:<6} {:<10} {:<10} {:<10} {:<12,.2f} Rp{:<13,.2f}".format(
+                    tahun, fitrah, mal, transaksi, beras, harga))
+            if not batch:
+                lines = ["Belum ada musim yang diarsipkan"]
+            render_cache_put(key, lines)
+        print("\n".join(lines))
+    except Error as err:
+        print(f"Error database: {err}")
+    finally:
+        conn.close()
+
+def cari_arsip(tahun, nama_prefix=None, limit=PAGE_SIZE):
+    """Mencari pembayar di arsip satu musim lokasi ini (index id_lokasi, tanggal, nama)"""
+    conn = get_read_session()
+    if not conn:
+        return RecordBatch(Zakat.FIELDS)
+    try:
+        query = """SELECT id, nama, jenis_zakat, jumlah, tanggal FROM zakat_data_arsip
+                WHERE id_lokasi = %s AND tanggal >= %s AND tanggal < %s"""
+        params = [SITE_ID, datetime.date(tahun, 1, 1), datetime.date(tahun + 1, 1, 1)]
+        if nama_prefix:
+            escaped = nama_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            query += " AND nama LIKE %s"
+            params.append(escaped + "%")
+        query += " ORDER BY nama LIMIT %s"
+        params.append(limit)
+        return fetch_batch(conn, query, params)
+    except Error as err:
+        print(f"Error database: {err}")
+        return RecordBatch(Zakat.FIELDS)
+    finally:
+        conn.close()
+
 # ==============================================
 # FUNGSI MENU UTAMA
 # ==============================================
@@ -392,42 +2289,44 @@ def menu_edit_zakat():
     id_zakat = get_int_input("ID pembayar yang akan diedit: ")
     
     # Validasi ID
-    conn = create_database_connection()
+    conn = get_session()
     if not conn:
         return
     
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT * FROM zakat_data WHERE id = %s", (id_zakat,))
-    old_data = cursor.fetchone()
+    cursor = conn.cursor()
+    cursor.execute("SELECT id, nama, jenis_zakat, jumlah, tanggal FROM zakat_data WHERE id = %s AND id_lokasi = %s",
+                   (id_zakat, SITE_ID))
+    row = cursor.fetchone()
     conn.close()
     
-    if not old_data:
+    if not row:
         print("ID tidak ditemukan!")
         return
+    old_data = Zakat.from_row(row)
     
     print("\nData saat ini:")
-    print(f"Nama: {old_data['nama']}")
-    print(f"Jenis Zakat: {old_data['jenis_zakat']}")
-    print(f"Jumlah: Rp{old_data['jumlah']:,.2f}")
-    print(f"Tanggal: {old_data['tanggal']}")
+    print(f"Nama: {old_data.nama}")
+    print(f"Jenis Zakat: {old_data.jenis_zakat}")
+    print(f"Jumlah: Rp{old_data.jumlah:,.2f}")
+    print(f"Tanggal: {old_data.tanggal}")
     
     print("\nMasukkan data baru (kosongkan jika tidak ingin diubah):")
-    nama = input(f"Nama [{old_data['nama']}]: ").strip() or old_data['nama']
+    nama = input(f"Nama [{old_data.nama}]: ").strip() or old_data.nama
     
-    jenis_zakat = input(f"Jenis zakat (Fitrah/Mal) [{old_data['jenis_zakat']}]: ").strip().capitalize()
+    jenis_zakat = input(f"Jenis zakat (Fitrah/Mal) [{old_data.jenis_zakat}]: ").strip().capitalize()
     while jenis_zakat and jenis_zakat not in ["Fitrah", "Mal"]:
         print("Jenis zakat harus Fitrah atau Mal!")
-        jenis_zakat = input(f"Jenis zakat (Fitrah/Mal) [{old_data['jenis_zakat']}]: ").strip().capitalize()
-    jenis_zakat = jenis_zakat or old_data['jenis_zakat']
+        jenis_zakat = input(f"Jenis zakat (Fitrah/Mal) [{old_data.jenis_zakat}]: ").strip().capitalize()
+    jenis_zakat = jenis_zakat or old_data.jenis_zakat
     
-    jumlah = input(f"Jumlah zakat (Rp) [{old_data['jumlah']}]: ").strip()
-    jumlah = float(jumlah) if jumlah else old_data['jumlah']
+    jumlah = input(f"Jumlah zakat (Rp) [{old_data.jumlah}]: ").strip()
+    jumlah = float(jumlah) if jumlah else old_data.jumlah
     
-    tanggal = input(f"Tanggal pembayaran (YYYY-MM-DD) [{old_data['tanggal']}]: ").strip()
+    tanggal = input(f"Tanggal pembayaran (YYYY-MM-DD) [{old_data.tanggal}]: ").strip()
     while tanggal and not re.match(r'^\d{4}-\d{2}-\d{2}$', tanggal):
         print("Format tanggal tidak valid. Gunakan format YYYY-MM-DD.")
-        tanggal = input(f"Tanggal pembayaran (YYYY-MM-DD) [{old_data['tanggal']}]: ").strip()
-    tanggal = tanggal or old_data['tanggal']
+        tanggal = input(f"Tanggal pembayaran (YYYY-MM-DD) [{old_data.tanggal}]: ").strip()
+    tanggal = tanggal or old_data.tanggal
     
     if update_zakat(id_zakat, nama, jenis_zakat, jumlah, tanggal):
         print("\nData berhasil diperbarui!")
@@ -444,6 +2343,37 @@ def menu_hapus_zakat():
     else:
         print("\nGagal menghapus data. Pastikan tidak ada transaksi terkait.")
 
+def menu_cari_zakat():
+    """Menu untuk mencari data pembayar zakat"""
+    print("\n=== CARI DATA PEMBAYAR ZAKAT ===")
+    print("(kosongkan untuk mengabaikan kriteria)")
+    nama_prefix = input("Awalan nama: ").strip()
+    
+    jenis_zakat = input("Jenis zakat (Fitrah/Mal): ").strip().capitalize()
+    while jenis_zakat and jenis_zakat not in ["Fitrah", "Mal"]:
+        print("Jenis zakat harus Fitrah atau Mal!")
+        jenis_zakat = input("Jenis zakat (Fitrah/Mal): ").strip().capitalize()
+    
+    tanggal_mulai = input("Dari tanggal (YYYY-MM-DD): ").strip()
+    while tanggal_mulai and not re.match(r'^\d{4}-\d{2}-\d{2}$', tanggal_mulai):
+        print("Format tanggal tidak valid. Gunakan format YYYY-MM-DD.")
+        tanggal_mulai = input("Dari tanggal (YYYY-MM-DD): ").strip()
+    
+    tanggal_akhir = input("Sampai tanggal (YYYY-MM-DD): ").strip()
+    while tanggal_akhir and not re.match(r'^\d{4}-\d{2}-\d{2}$', tanggal_akhir):
+        print("Format tanggal tidak valid. Gunakan format YYYY-MM-DD.")
+        tanggal_akhir = input("Sampai tanggal (YYYY-MM-DD): ").strip()
+    
+    results = search_zakat(nama_prefix, tanggal_mulai, tanggal_akhir, jenis_zakat)
+    if not results:
+        print("\nTidak ada data yang cocok.")
+        return
+    
+    print("\n{:<5} {:<20} {:<15} {:<15} {:<10}".format("ID", "Nama", "Jenis Zakat", "Jumlah", "Tanggal"))
+    print("-"*70)
+    for z in results.records(Zakat):
+        print(f"{z.id:<5} {z.nama:<20} {z.jenis_zakat:<15} Rp{z.jumlah:<12,.2f} {z.tanggal}")
+
 def menu_tambah_beras():
     """Menu untuk menambahkan data master beras"""
     print("\n=== TAMBAH DATA MASTER BERAS ===")
@@ -455,37 +2385,41 @@ def menu_tambah_beras():
     else:
         print("\nGagal menambahkan data beras!")
 
+def menu_ubah_harga_beras():
+    """Menu untuk mencatat harga beras baru dengan tanggal berlaku"""
+    print("\n=== UBAH HARGA BERAS ===")
+    id_beras = get_int_input("ID beras: ")
+    view_harga_beras(id_beras)
+    harga = get_float_input("Harga baru per kg (Rp): ")
+    berlaku_mulai = get_date_input("Berlaku mulai (YYYY-MM-DD): ")
+    
+    if add_harga_beras(id_beras, harga, berlaku_mulai):
+        print("\nHarga beras berhasil dicatat!")
+    else:
+        print("\nGagal mencatat harga beras!")
+
 def menu_tambah_transaksi():
     """Menu untuk menambahkan transaksi zakat beras"""
     print("\n=== TAMBAH TRANSAKSI ZAKAT BERAS ===")
     
-    # Tampilkan daftar pembayar zakat
-    conn = create_database_connection()
+    # Cari pembayar sambil mengetik, tanpa memuat seluruh daftar
+    conn = get_session()
     if not conn:
         return
     
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute("SELECT id, nama FROM zakat_data")
-    pembayar = cursor.fetchall()
-    
-    if not pembayar:
+    if not fetch_batch(conn, "SELECT id FROM zakat_data WHERE id_lokasi = %s LIMIT 1", (SITE_ID,)):
         print("Belum ada data pembayar zakat. Silakan tambahkan dulu.")
         conn.close()
         return
     
-    print("\nDaftar Pembayar Zakat:")
-    for p in pembayar:
-        print(f"{p['id']}. {p['nama']}")
-    
-    id_zakat = get_int_input("\nPilih ID pembayar: ")
-    if id_zakat not in [p['id'] for p in pembayar]:
-        print("ID pembayar tidak valid!")
+    pembayar = pilih_pembayar(conn)
+    if pembayar is None:
         conn.close()
         return
+    id_zakat = pembayar[0]
     
     # Tampilkan daftar beras
-    cursor.execute("SELECT id, nama_beras, harga_per_kg FROM master_beras")
-    beras = cursor.fetchall()
+    beras = fetch_batch(conn, "SELECT id, nama_beras, harga_per_kg FROM master_beras")
     conn.close()
     
     if not beras:
@@ -493,11 +2427,11 @@ def menu_tambah_transaksi():
         return
     
     print("\nDaftar Beras:")
-    for b in beras:
-        print(f"{b['id']}. {b['nama_beras']} (Rp{b['harga_per_kg']:,.2f}/kg)")
+    for b in beras.records(Beras):
+        print(f"{b.id}. {b.nama_beras} (Rp{b.harga_per_kg:,.2f}/kg)")
     
     id_beras = get_int_input("\nPilih ID beras: ")
-    if id_beras not in [b['id'] for b in beras]:
+    if id_beras not in set(beras.column("id")):
         print("ID beras tidak valid!")
         return
     
@@ -509,6 +2443,40 @@ def menu_tambah_transaksi():
     else:
         print("\nGagal membuat transaksi.")
 
+def menu_fitrah_batch():
+    """Menu untuk menghitung dan mencatat zakat fitrah dari roster keluarga"""
+    print("\n=== ZAKAT FITRAH PER KELUARGA ===")
+    print(f"Roster (xlsx/csv) berisi kolom: {', '.join(ROSTER_COLUMNS)}")
+    print(f"Setiap jiwa membayar {FITRAH_KG_PER_JIWA} kg beras")
+    roster_path = validate_non_empty("Path file roster: ").strip('"')
+    tanggal = get_date_input("Tanggal transaksi (YYYY-MM-DD): ")
+    add_fitrah_batch(roster_path, tanggal)
+
+def menu_arsip_musim():
+    """Menu untuk mengarsipkan musim yang sudah ditutup"""
+    print("\n=== ARSIPKAN MUSIM ===")
+    tahun = get_int_input("Tahun musim yang sudah ditutup (YYYY): ")
+    konfirmasi = input(f"Pindahkan data musim {tahun} ke arsip? (y/n): ").strip().lower()
+    if konfirmasi == "y":
+        arsip_musim(tahun)
+
+def menu_lihat_arsip():
+    """Menu untuk melihat ringkasan dan mencari di arsip musim"""
+    print("\n=== ARSIP MUSIM ===")
+    view_ringkasan_musim()
+    tahun = input("\nTahun untuk mencari pembayar (kosongkan untuk kembali): ").strip()
+    if not tahun.isdigit():
+        return
+    nama = input("Awalan nama (kosongkan untuk semua): ").strip()
+    hasil = cari_arsip(int(tahun), nama or None)
+    if not hasil:
+        print("Tidak ada data yang cocok di arsip.")
+        return
+    print("{:<5} {:<20} {:<10} {:<10} {:<12}".format("ID", "Nama", "Jenis", "Jumlah", "Tanggal"))
+    print("-"*60)
+    for z in hasil.records(Zakat):
+        print("{:<5} {:<20} {:<10} {:<10} {:<12}".format(z.id, z.nama, z.jenis_zakat, z.jumlah, str(z.tanggal)))
+
 # ==============================================
 # MAIN PROGRAM
 # ==============================================
@@ -522,7 +2490,8 @@ def main():
     
     # Menu utama
     while True:
-        print("\n===== SISTEM MANAJEMEN ZAKAT =====")
+        report_finished_exports()
+        print(f"\n===== SISTEM MANAJEMEN ZAKAT (LOKASI {SITE_ID}) =====")
         print("1. Tambah Data Pembayar Zakat")
         print("2. Edit Data Pembayar Zakat")
         print("3. Hapus Data Pembayar Zakat")
@@ -531,9 +2500,20 @@ def main():
         print("6. Buat Transaksi Zakat Beras")
         print("7. Lihat Transaksi Zakat")
         print("8. Ekspor Data ke Excel")
-        print("9. Keluar")
+        print("9. Cari Data Pembayar Zakat")
+        print("10. Ekspor Inkremental (Perubahan Saja)")
+        print("11. Konsolidasi File Delta")
+        print("12. Ekspor Paralel Semua Data")
+        print("13. Ubah Harga Beras (Berlaku Mulai Tanggal)")
+        print("14. Hitung Ulang Total Transaksi")
+        print("15. Arsipkan Musim yang Sudah Ditutup")
+        print("16. Lihat Arsip Musim")
+        print("17. Hitung Zakat Fitrah per Keluarga (Roster)")
+        print("18. Progres Ekspor Latar")
+        print("19. Batalkan Ekspor Latar")
+        print("20. Keluar")
         
-        choice = input("\nPilih menu [1-9]: ").strip()
+        choice = input("\nPilih menu [1-20]: ").strip()
         
         if choice == "1":
             menu_tambah_zakat()
@@ -552,13 +2532,54 @@ def main():
             print("\n=== DAFTAR TRANSAKSI ZAKAT ===")
             view_transaksi_zakat()
         elif choice == "8":
-            print("\n=== EKSPOR DATA ===")
-            export_to_excel()
+            start_export_job("lengkap", export_to_excel)
         elif choice == "9":
+            menu_cari_zakat()
+        elif choice == "10":
+            start_export_job("inkremental", export_incremental)
+        elif choice == "11":
+            print("\n=== KONSOLIDASI DELTA ===")
+            consolidate_deltas()
+        elif choice == "12":
+            start_export_job("paralel", export_parallel)
+        elif choice == "13":
+            menu_ubah_harga_beras()
+        elif choice == "14":
+            print("\n=== HITUNG ULANG TRANSAKSI ===")
+            hitung_ulang_transaksi()
+        elif choice == "15":
+            menu_arsip_musim()
+        elif choice == "16":
+            menu_lihat_arsip()
+        elif choice == "17":
+            menu_fitrah_batch()
+        elif choice == "18":
+            print("\n=== PROGRES EKSPOR LATAR ===")
+            view_export_jobs()
+        elif choice == "19":
+            cancel_export_job(input("ID ekspor yang akan dibatalkan: ").strip())
+        elif choice == "20":
+            wait_export_jobs()
             print("\nTerima kasih telah menggunakan Sistem Manajemen Zakat.")
             break
         else:
-            print("\nPilihan tidak valid. Silakan pilih 1-9.")
+            print("\nPilihan tidak valid. Silakan pilih 1-20.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--lokasi" in sys.argv:
+        # Lokasi (masjid / titik kumpul) yang dilayani proses ini: --lokasi N
+        SITE_ID = int(sys.argv[sys.argv.index("--lokasi") + 1])
+    if "--benchmark-export" in sys.argv:
+        benchmark_export_parallel()
+    elif "--benchmark-prepared" in sys.argv:
+        benchmark_prepared()
+    elif "--outbox" in sys.argv:
+        # Mengalirkan perubahan sebagai JSON per baris: --outbox NAMA_KONSUMEN [--ikuti]
+        nama = sys.argv[sys.argv.index("--outbox") + 1]
+        for perubahan in stream_outbox(nama, ikuti="--ikuti" in sys.argv):
+            for item in perubahan:
+                print(json.dumps(item, default=str), flush=True)
+    elif "--bersihkan-outbox" in sys.argv:
+        bersihkan_outbox()
+    else:
+        main()
\ No newline at end of file
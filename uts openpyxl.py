@@ -8,36 +8,434 @@ except ImportError:
     exit()
 
 import os
-from datetime import datetime
+import sys
+import csv
+import json
+import atexit
+import mmap
+import time
+import struct
+import gzip
+import shutil
+import queue
+import signal
+import socket
+import socketserver
+import tempfile
+import threading
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from collections import OrderedDict, deque
+from datetime import datetime, date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # Optional: only used for zero-copy ledger scans
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows: the WAL lock then only serializes threads of one process
 
 # Excel file paths
 ZAKAT_DATA_FILE = "zakat_data.xlsx"
 MASTER_BERAS_FILE = "master_beras.xlsx"
 TRANSAKSI_ZAKAT_FILE = "transaksi_zakat.xlsx"
 
+# Effective-dated price history: the master_beras price applies until the first entry
+HARGA_BERAS_FILE = "harga_beras.xlsx"
+HARGA_BERAS_HEADERS = ["ID", "ID Beras", "Harga per Kg", "Berlaku Mulai"]
+
+# Binary transaction ledger (fixed-width, append-only)
+TRANSAKSI_LEDGER_FILE = "transaksi_zakat.ledger"
+USE_TRANSAKSI_LEDGER = False  # Set True to store transactions in the ledger instead of xlsx
+
+# Time partitions: transactions split into one workbook per year or month
+PARTITION_MANIFEST_FILE = "transaksi_partisi.json"
+TRANSAKSI_HEADERS = ["ID", "ID Zakat", "ID Beras", "Jumlah Beras", "Total Harga", "Tanggal"]
+
+# Single-workbook layout: when WORKBOOK_FILE exists, zakat, beras, harga and
+# transaksi are sheets of that one file (plus a hidden index sheet with row
+# counts and max IDs), so a lookup or join across datasets is a single load.
+# Switch layouts with --migrate-single-workbook / --migrate-split-files.
+WORKBOOK_FILE = "zakat_gabungan.xlsx"
+WORKBOOK_SHEETS = {
+    ZAKAT_DATA_FILE: ("Zakat Data", ["ID", "Nama", "Jenis Zakat", "Jumlah", "Tanggal"]),
+    MASTER_BERAS_FILE: ("Master Beras", ["ID", "Nama Beras", "Harga per Kg"]),
+    HARGA_BERAS_FILE: ("Harga Beras", HARGA_BERAS_HEADERS),
+    TRANSAKSI_ZAKAT_FILE: ("Transaksi Zakat", TRANSAKSI_HEADERS),
+}
+WORKBOOK_INDEX_SHEET = "Indeks"
+WORKBOOK_INDEX_HEADERS = ["File", "Sheet", "Baris", "ID Maks"]
+
+# Zakat fitrah per person, in kg of beras (about 3.5 liters)
+FITRAH_KG_PER_JIWA = 2.5
+ROSTER_HEADERS = ["Nama", "Jumlah Jiwa", "ID Beras"]
+
+# Paged listings
+PAGE_SIZE = 20
+RENDER_CACHE_PAGES = 64  # Formatted listings kept for unchanged data (LRU)
+
+# Reverse index: id_zakat / id_beras -> number of transactions referencing it
+REFERENCE_INDEX_FILE = "transaksi_refindex.json"
+
+# Closed seasons (years) moved out of the live files into gzip JSON-lines archives
+ARCHIVE_DIR = "arsip"
+ARCHIVE_SUMMARY_FILE = os.path.join(ARCHIVE_DIR, "ringkasan_arsip.json")
+
+# Write-ahead log: mutations are appended here and folded into the xlsx files
+# by a checkpoint instead of rewriting a workbook on every operation
+WAL_FILE = "zakat.wal"
+WAL_CHECKPOINT_FILE = "zakat.wal.checkpoint"  # The log being folded by a checkpoint
+WAL_LOCK_FILE = "zakat.wal.lock"              # flock target shared by every desk
+WAL_CONFLICT_FILE = "zakat.wal.konflik"       # Appends that reused an existing ID
+USE_WAL = True
+WAL_CHECKPOINT_ENTRIES = 200  # Checkpoint automatically after this many logged mutations
+
+# Desk daemon: one process (--daemon) owns the workbooks in memory and desks
+# talk to it over a Unix socket instead of loading and saving the files
+DAEMON_SOCKET = "zakat_daemon.sock"
+DAEMON_FLUSH_SECONDS = 5.0      # Save changed workbooks at most this long after a mutation
+DAEMON_FLUSH_MUTATIONS = 1000   # ... or as soon as this many mutations are pending
+DAEMON_GROUP_COMMIT = 256       # Mutations sharing one WAL write + fsync
+DAEMON_CHANGE_LOG = 4096        # Recent mutations per file kept for incremental readers
+
+# Incremental export
+EXPORT_STATE_FILE = "export_state.json"
+EXPORT_DELTA_DIR = "export_delta"
+
+# Parallel export
+EXPORT_WORKERS = os.cpu_count() or 1
+EXPORT_SHARD_ROWS = 50000  # Larger datasets are split into part files of this many rows
+
+class Zakat:
+    """Single zakat_data row stored without a per-row dict"""
+    __slots__ = ("id", "nama", "jenis_zakat", "jumlah", "tanggal")
+    FIELDS = __slots__
+
+    def __init__(self, id, nama, jenis_zakat, jumlah, tanggal):
+        self.id = id
+        self.nama = nama
+        self.jenis_zakat = jenis_zakat
+        self.jumlah = jumlah
+        self.tanggal = tanggal
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row[:5])
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"Zakat(id={self.id}, nama={self.nama!r})"
+
+class Beras:
+    """Single master_beras row"""
+    __slots__ = ("id", "nama_beras", "harga_per_kg")
+    FIELDS = __slots__
+
+    def __init__(self, id, nama_beras, harga_per_kg):
+        self.id = id
+        self.nama_beras = nama_beras
+        self.harga_per_kg = harga_per_kg
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row[:3])
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"Beras(id={self.id}, nama_beras={self.nama_beras!r})"
+
+class HargaBeras:
+    """Single harga_beras row: a price valid from berlaku_mulai onwards"""
+    __slots__ = ("id", "id_beras", "harga_per_kg", "berlaku_mulai")
+    FIELDS = __slots__
+
+    def __init__(self, id, id_beras, harga_per_kg, berlaku_mulai):
+        self.id = id
+        self.id_beras = id_beras
+        self.harga_per_kg = harga_per_kg
+        self.berlaku_mulai = berlaku_mulai
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row[:4])
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"HargaBeras(id={self.id}, id_beras={self.id_beras}, berlaku_mulai={self.berlaku_mulai!r})"
+
+class Transaksi:
+    """Single transaksi_zakat row"""
+    __slots__ = ("id", "id_zakat", "id_beras", "jumlah_beras", "total_harga", "tanggal")
+    FIELDS = __slots__
+
+    def __init__(self, id, id_zakat, id_beras, jumlah_beras, total_harga, tanggal):
+        self.id = id
+        self.id_zakat = id_zakat
+        self.id_beras = id_beras
+        self.jumlah_beras = jumlah_beras
+        self.total_harga = total_harga
+        self.tanggal = tanggal
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row[:6])
+
+    def as_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+    def __repr__(self):
+        return f"Transaksi(id={self.id}, id_zakat={self.id_zakat}, id_beras={self.id_beras})"
+
+class RecordBatch:
+    """Column-oriented container: one list per column instead of one object per row"""
+    __slots__ = ("names", "columns")
+
+    def __init__(self, names, columns=None):
+        self.names = tuple(names)
+        self.columns = columns if columns is not None else [[] for _ in self.names]
+
+    @classmethod
+    def from_rows(cls, names, rows):
+        batch = cls(names)
+        appenders = [col.append for col in batch.columns]
+        width = len(appenders)
+        for row in rows:
+            if not row or row[0] is None:
+                continue
+            for append, value in zip(appenders, row[:width]):
+                append(value)
+        return batch
+
+    def __len__(self):
+        return len(self.columns[0]) if self.columns else 0
+
+    def column(self, name):
+        return self.columns[self.names.index(name)]
+
+    def rows(self):
+        """Iterate rows as tuples, built lazily"""
+        return zip(*self.columns)
+
+    def records(self, record_cls):
+        """Iterate rows as Zakat/Beras/Transaksi records"""
+        cols = [self.column(f) for f in record_cls.FIELDS]
+        for values in zip(*cols):
+            yield record_cls(*values)
+
+    def index_by(self, key, record_cls):
+        """Map key column -> record, for joins"""
+        return {getattr(record, key): record for record in self.records(record_cls)}
+
+_batch_cache = {}  # file_path -> (mtime_ns, size, RecordBatch)
+
+def read_file_batch(file_path, record_cls):
+    """Load the data rows of an Excel file, reusing the last parse while the file is unchanged"""
+    target = storage_file(file_path)
+    if not os.path.exists(target):
+        return RecordBatch(record_cls.FIELDS)
+    stat = os.stat(target)
+    cached = _batch_cache.get(file_path)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+    if target != file_path:
+        load_single_workbook(stat)
+        return _batch_cache[file_path][2]
+    wb = load_workbook(file_path, read_only=True)
+    try:
+        ws = wb.active
+        batch = RecordBatch.from_rows(record_cls.FIELDS, ws.iter_rows(min_row=2, values_only=True))
+    finally:
+        wb.close()
+    _batch_cache[file_path] = (stat.st_mtime_ns, stat.st_size, batch)
+    return batch
+
+_wal_batch_cache = {}  # file_path -> [file RecordBatch, WAL key, merged RecordBatch, {id: position} or None]
+
+def merged_batch(file_path, record_cls):
+    """Cache entry holding the file's rows with pending WAL entries applied
+
+    Reused while the parsed file batch and the WAL files are unchanged, so
+    lookups between two mutations do not rebuild every row.
+    """
+    batch = read_file_batch(file_path, record_cls)
+    wal_key = None
+    if USE_WAL:
+        read_wal()
+        wal_key = _wal_cache["key"]
+    cached = _wal_batch_cache.get(file_path)
+    if cached and cached[0] is batch and cached[1] == wal_key:
+        return cached
+    merged = batch
+    entries = wal_entries(file_path)
+    if entries:
+        rows = {row[0]: row for row in batch.rows()}
+        apply_wal_entries(rows, entries)
+        merged = RecordBatch.from_rows(record_cls.FIELDS, rows.values())
+    cached = [batch, wal_key, merged, None]
+    _wal_batch_cache[file_path] = cached
+    return cached
+
+def read_batch(file_path, record_cls):
+    """Load the data rows of an Excel file into a RecordBatch, including pending WAL entries"""
+    if _daemon["client"] is not None:
+        return _daemon["client"].batch(file_path, record_cls)
+    return merged_batch(file_path, record_cls)[2]
+
+def find_record(file_path, record_cls, id):
+    """Return the record with the given ID, or None"""
+    if _daemon["client"] is not None:
+        batch = _daemon["client"].batch(file_path, record_cls)
+        try:
+            index = batch.column("id").index(id)
+        except ValueError:
+            return None
+    else:
+        cached = merged_batch(file_path, record_cls)
+        batch = cached[2]
+        if cached[3] is None:
+            cached[3] = {row_id: i for i, row_id in enumerate(batch.column("id"))}
+        index = cached[3].get(id)
+        if index is None:
+            return None
+    return record_cls(*(col[index] for col in batch.columns))
+
+SHEET_RECORDS = {ZAKAT_DATA_FILE: Zakat, MASTER_BERAS_FILE: Beras,
+                 HARGA_BERAS_FILE: HargaBeras, TRANSAKSI_ZAKAT_FILE: Transaksi}
+
+def single_workbook():
+    """True when the data lives in WORKBOOK_FILE instead of one file per dataset"""
+    return os.path.exists(WORKBOOK_FILE)
+
+def storage_file(file_path):
+    """The file that actually holds a dataset's rows"""
+    if file_path in WORKBOOK_SHEETS and single_workbook():
+        return WORKBOOK_FILE
+    return file_path
+
+def dataset_sheet(wb, file_path):
+    """The worksheet of a dataset inside a workbook loaded from storage_file(file_path)"""
+    if storage_file(file_path) != file_path:
+        return wb[WORKBOOK_SHEETS[file_path][0]]
+    return wb.active
+
+def open_sheet(file_path, read_only=False):
+    """Load the workbook holding a dataset; returns (workbook, worksheet)"""
+    wb = load_workbook(storage_file(file_path), read_only=read_only)
+    return wb, dataset_sheet(wb, file_path)
+
+def update_workbook_index(wb):
+    """Recount the rows and max IDs of every sheet into the hidden index sheet"""
+    if WORKBOOK_INDEX_SHEET in wb.sheetnames:
+        wb.remove(wb[WORKBOOK_INDEX_SHEET])
+    index = wb.create_sheet(WORKBOOK_INDEX_SHEET)
+    index.sheet_state = "hidden"
+    index.append(WORKBOOK_INDEX_HEADERS)
+    for file_path, (title, _) in WORKBOOK_SHEETS.items():
+        ids = [int(id) for (id,) in wb[title].iter_rows(min_row=2, max_col=1, values_only=True)
+               if isinstance(id, (int, float))]
+        index.append([file_path, title, len(ids), max(ids, default=0)])
+
+def save_sheet(wb, file_path):
+    """Atomically save a workbook loaded with open_sheet"""
+    target = storage_file(file_path)
+    if target != file_path:
+        update_workbook_index(wb)
+    save_workbook_atomic(wb, target)
+
+def load_single_workbook(stat):
+    """Parse every sheet of WORKBOOK_FILE in one load into the batch and max-ID caches"""
+    wb = load_workbook(WORKBOOK_FILE, read_only=True)
+    try:
+        index = {}
+        if WORKBOOK_INDEX_SHEET in wb.sheetnames:
+            for row in wb[WORKBOOK_INDEX_SHEET].iter_rows(min_row=2, values_only=True):
+                if row and row[0] is not None:
+                    index[row[0]] = int(row[3] or 0)
+        for file_path, (title, _) in WORKBOOK_SHEETS.items():
+            batch = RecordBatch.from_rows(SHEET_RECORDS[file_path].FIELDS,
+                                          wb[title].iter_rows(min_row=2, values_only=True))
+            _batch_cache[file_path] = (stat.st_mtime_ns, stat.st_size, batch)
+            max_id = index.get(file_path)
+            if max_id is None:
+                max_id = max((int(id) for id in batch.column("id") if isinstance(id, (int, float))), default=0)
+            _max_id_cache[file_path] = (stat.st_mtime_ns, stat.st_size, max_id)
+    finally:
+        wb.close()
+
+def write_sheets(path, sheets):
+    """Write [(title, headers, rows)] as a new workbook in one atomic write-only save"""
+    wb = Workbook(write_only=True)
+    for title, headers, rows in sheets:
+        ws = wb.create_sheet(title)
+        if title == WORKBOOK_INDEX_SHEET:
+            ws.sheet_state = "hidden"
+        ws.append(headers)
+        for row in rows:
+            ws.append(list(row))
+    save_workbook_atomic(wb, path)
+
+def write_single_workbook(tables, path=WORKBOOK_FILE):
+    """Write {file_path: rows} as the sheets of the single workbook, with its index"""
+    sheets = []
+    index = []
+    for file_path, (title, headers) in WORKBOOK_SHEETS.items():
+        rows = list(tables.get(file_path, ()))
+        ids = [int(row[0]) for row in rows if isinstance(row[0], (int, float))]
+        sheets.append((title, headers, rows))
+        index.append([file_path, title, len(ids), max(ids, default=0)])
+    sheets.append((WORKBOOK_INDEX_SHEET, WORKBOOK_INDEX_HEADERS, index))
+    write_sheets(path, sheets)
+
 def initialize_files():
     """Initialize Excel files with headers if they don't exist"""
     try:
-        if not os.path.exists(ZAKAT_DATA_FILE):
+        if not os.path.exists(storage_file(ZAKAT_DATA_FILE)):
             wb = Workbook()
             ws = wb.active
             ws.title = "Zakat Data"
             ws.append(["ID", "Nama", "Jenis Zakat", "Jumlah", "Tanggal"])
             wb.save(ZAKAT_DATA_FILE)
         
-        if not os.path.exists(MASTER_BERAS_FILE):
+        if not os.path.exists(storage_file(MASTER_BERAS_FILE)):
             wb = Workbook()
             ws = wb.active
             ws.title = "Master Beras"
             ws.append(["ID", "Nama Beras", "Harga per Kg"])
             wb.save(MASTER_BERAS_FILE)
         
-        if not os.path.exists(TRANSAKSI_ZAKAT_FILE):
+        if not os.path.exists(storage_file(HARGA_BERAS_FILE)):
+            wb = Workbook()
+            ws = wb.active
+            ws.title = "Harga Beras"
+            ws.append(HARGA_BERAS_HEADERS)
+            wb.save(HARGA_BERAS_FILE)
+        
+        if not os.path.exists(storage_file(TRANSAKSI_ZAKAT_FILE)) and not os.path.exists(PARTITION_MANIFEST_FILE):
             wb = Workbook()
             ws = wb.active
             ws.title = "Transaksi Zakat"
             ws.append(["ID", "ID Zakat", "ID Beras", "Jumlah Beras", "Total Harga", "Tanggal"])
             wb.save(TRANSAKSI_ZAKAT_FILE)
+        
+        # Replay mutations logged before the last exit/crash
+        if not checkpoint_wal():
+            exit()
+        
+        # Older files stored tanggal as text
+        migrate_tanggal_column(ZAKAT_DATA_FILE, 5)
+        migrate_tanggal_column(TRANSAKSI_ZAKAT_FILE, 6)
     except PermissionError:
         print("Error: Tidak bisa membuat file. Pastikan tidak ada file Excel yang sedang terbuka.")
         exit()
@@ -46,34 +444,362 @@ def initialize_files():
         exit()
 
 def get_next_id(file_path):
-    """Get the next available ID for a given Excel file"""
+    """Get the next available ID for a given Excel file (pending WAL appends included)"""
     try:
-        if not os.path.exists(file_path):
-            return 1
-        
-        wb = load_workbook(file_path)
-        ws = wb.active
+        if _daemon["client"] is not None:
+            return _daemon["client"].call("reserve_id", file_path)  # Unique across desks
         max_id = 0
+        target = storage_file(file_path)
+        if os.path.exists(target):
+            stat = os.stat(target)
+            cached = _max_id_cache.get(file_path)
+            if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+                max_id = cached[2]
+            elif target != file_path:
+                load_single_workbook(stat)  # Max IDs come from the hidden index sheet
+                max_id = _max_id_cache[file_path][2]
+            else:
+                wb = load_workbook(file_path, read_only=True)
+                ws = wb.active
+                
+                for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
+                    if row and row[0] is not None and isinstance(row[0], (int, float)):
+                        current_id = int(row[0])
+                        if current_id > max_id:
+                            max_id = current_id
+                wb.close()
+                _max_id_cache[file_path] = (stat.st_mtime_ns, stat.st_size, max_id)
         
-        for row in ws.iter_rows(min_row=2, max_col=1, values_only=True):
-            if row and row[0] is not None and isinstance(row[0], (int, float)):
-                current_id = int(row[0])
-                if current_id > max_id:
-                    max_id = current_id
+        for entry in wal_entries(file_path):
+            if entry["op"] == "append":
+                max_id = max(max_id, entry["id"])
         
+        # IDs of archived rows are never handed out again
+        max_id = max(max_id, load_archive_summary()["max_id"].get(file_path, 0))
         return max_id + 1
     except Exception as e:
         print(f"Error mendapatkan ID: {str(e)}")
         return 1  # Return default ID if error occurs
 
+_max_id_cache = {}  # file_path -> (mtime_ns, size, max_id)
+
+# Data versions: every mutating function bumps the counter of each dataset it
+# changed; cached listing output is keyed on the versions it was built from,
+# so an unchanged view is served without re-reading or re-formatting. The
+# counter only sees this process, so the key also carries the stat of the
+# files and the WAL: a write by sync, the API or a checkpoint moves those.
+_data_versions = {}  # dataset -> counter (zakat, beras, harga, transaksi)
+DATASET_FILES = {"zakat": ZAKAT_DATA_FILE, "beras": MASTER_BERAS_FILE,
+                 "harga": HARGA_BERAS_FILE, "transaksi": TRANSAKSI_ZAKAT_FILE}
+_render_cache = OrderedDict()
+
+def bump_data_version(*datasets):
+    for dataset in datasets:
+        _data_versions[dataset] = _data_versions.get(dataset, 0) + 1
+
+def file_stamp(file_path):
+    """(mtime_ns, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+def dataset_files(dataset):
+    """Every file whose change can alter what a dataset's listing shows"""
+    file_path = DATASET_FILES.get(dataset)
+    if file_path is None:
+        return []
+    files = [storage_file(file_path)]
+    if dataset == "transaksi":
+        files += [TRANSAKSI_LEDGER_FILE, PARTITION_MANIFEST_FILE]
+        manifest = load_partition_manifest()
+        if manifest is not None:
+            files += [partition_file(key) for key in sorted(manifest["partitions"])]
+    return files
+
+def dataset_stamp(dataset):
+    return tuple(file_stamp(f) for f in dataset_files(dataset))
+
+def data_versions(*datasets):
+    if _daemon["client"] is not None:
+        # The daemon's counters also move when another desk changes the data
+        versions = _daemon["client"].call("versions")
+        return tuple(versions.get(DATASET_FILES.get(dataset), 0) for dataset in datasets)
+    wal = (file_stamp(WAL_CHECKPOINT_FILE), file_stamp(WAL_FILE)) if USE_WAL else None
+    return tuple((_data_versions.get(dataset, 0), dataset_stamp(dataset), wal)
+                 for dataset in datasets)
+
+def render_cache_get(key):
+    value = _render_cache.get(key)
+    if value is not None:
+        _render_cache.move_to_end(key)
+    return value
+
+def render_cache_put(key, value):
+    _render_cache[key] = value
+    _render_cache.move_to_end(key)
+    while len(_render_cache) > RENDER_CACHE_PAGES:
+        _render_cache.popitem(last=False)
+
 def validate_date(date_str):
     """Validate date format (YYYY-MM-DD)"""
+    if isinstance(date_str, date):
+        return True
     try:
         datetime.strptime(date_str, "%Y-%m-%d")
         return True
-    except ValueError:
+    except (ValueError, TypeError):
+        return False
+
+def parse_date(value):
+    """Return a native date from a date/datetime cell or a YYYY-MM-DD string"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+
+def format_date(value):
+    """Format a tanggal cell (date or legacy string) as YYYY-MM-DD"""
+    if isinstance(value, (datetime, date)):
+        return value.strftime("%Y-%m-%d")
+    return "" if value is None else str(value)
+
+def migrate_tanggal_column(file_path, column):
+    """Convert legacy string dates in a tanggal column to native dates
+
+    Only the first data row is probed, since new rows are always written as
+    dates; the full rewrite happens once per file.
+    """
+    if not os.path.exists(storage_file(file_path)):
+        return
+    wb, ws = open_sheet(file_path, read_only=True)
+    try:
+        first = next(ws.iter_rows(min_row=2, max_row=2, values_only=True), None)
+    finally:
+        wb.close()
+    if not first or len(first) < column or not isinstance(first[column - 1], str):
+        return
+
+    wb, ws = open_sheet(file_path)
+    for (cell,) in ws.iter_rows(min_row=2, min_col=column, max_col=column):
+        if isinstance(cell.value, str) and validate_date(cell.value.strip()):
+            cell.value = parse_date(cell.value)
+            cell.number_format = "yyyy-mm-dd"
+    save_sheet(wb, file_path)
+
+# Column holding tanggal in each file (0-based, ID included); WAL lines store
+# it as YYYY-MM-DD text and it is turned back into a date on replay.
+WAL_DATE_COLUMNS = {ZAKAT_DATA_FILE: 4, TRANSAKSI_ZAKAT_FILE: 5, HARGA_BERAS_FILE: 3}
+_wal_cache = {"key": None, "entries": []}
+_wal_lock = {"lock": threading.RLock(), "depth": 0, "handle": None}
+
+@contextmanager
+def wal_lock():
+    """Exclusive lock across threads and desks, re-entrant within a thread
+
+    Held around reserving an ID plus logging (or saving) its row, so two
+    writers never hand out the same ID, and around a whole checkpoint, so
+    no entry is logged while the log is being folded.
+    """
+    with _wal_lock["lock"]:
+        if _wal_lock["depth"] == 0 and fcntl is not None:
+            _wal_lock["handle"] = open(WAL_LOCK_FILE, "a")
+            fcntl.flock(_wal_lock["handle"], fcntl.LOCK_EX)
+        _wal_lock["depth"] += 1
+        try:
+            yield
+        finally:
+            _wal_lock["depth"] -= 1
+            if _wal_lock["depth"] == 0 and _wal_lock["handle"] is not None:
+                fcntl.flock(_wal_lock["handle"], fcntl.LOCK_UN)
+                _wal_lock["handle"].close()
+                _wal_lock["handle"] = None
+
+def wal_date_column(file_path):
+    if file_path.startswith("transaksi_zakat_"):
+        return WAL_DATE_COLUMNS[TRANSAKSI_ZAKAT_FILE]  # Partition files share the layout
+    return WAL_DATE_COLUMNS.get(file_path)
+
+def read_wal_file(path):
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break  # Torn write at the tail after a crash
+            column = wal_date_column(entry["file"])
+            if entry.get("values") and column is not None:
+                entry["values"][column] = parse_date(entry["values"][column])
+            entries.append(entry)
+    return entries
+
+def read_wal():
+    """Return the WAL entries that have not been checkpointed yet
+
+    A log moved aside by a running (or crashed) checkpoint comes first, so
+    readers keep seeing its rows until the workbooks have been saved.
+    """
+    key = []
+    for path in (WAL_CHECKPOINT_FILE, WAL_FILE):
+        if os.path.exists(path):
+            stat = os.stat(path)
+            key.append((path, stat.st_mtime_ns, stat.st_size))
+    key = tuple(key)
+    if _wal_cache["key"] == key:
+        return _wal_cache["entries"]
+    entries = []
+    for path, _, _ in key:
+        entries.extend(read_wal_file(path))
+    _wal_cache["key"] = key
+    _wal_cache["entries"] = entries
+    return entries
+
+def wal_entries(file_path):
+    """Pending WAL entries for one Excel file"""
+    if not USE_WAL:
+        return []
+    return [entry for entry in read_wal() if entry["file"] == file_path]
+
+def apply_wal_entries(rows, entries):
+    """Apply WAL entries to an {id: row} mapping; replaying an entry twice is harmless"""
+    for entry in entries:
+        if entry["op"] == "append":
+            rows.setdefault(entry["id"], tuple(entry["values"]))
+        elif entry["op"] == "update" and entry["id"] in rows:
+            rows[entry["id"]] = tuple(entry["values"])
+        elif entry["op"] == "delete":
+            rows.pop(entry["id"], None)
+
+def wal_append(op, file_path, id, values=None):
+    """Durably log one mutation (fsync) and checkpoint when the log grows large"""
+    if _daemon["client"] is not None:
+        _daemon["client"].call("apply", op, file_path, id, values)
+        return
+    entry = {"op": op, "file": file_path, "id": id}
+    if values is not None:
+        entry["values"] = [format_date(v) if isinstance(v, date) else v for v in values]
+    with wal_lock():
+        # An ID that is already taken would be dropped on replay: refuse it instead
+        if op == "append" and id < get_next_id(file_path):
+            raise ValueError(f"ID {id} sudah dipakai di {file_path}")
+        with open(WAL_FILE, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        if len(read_wal()) >= WAL_CHECKPOINT_ENTRIES:
+            checkpoint_wal()
+
+def save_workbook_atomic(wb, file_path):
+    """Save to a temp file next to the target and rename it over the original"""
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=directory)
+    os.close(fd)
+    try:
+        wb.save(tmp_path)
+        with open(tmp_path, "rb") as f:
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def checkpoint_wal():
+    """Fold pending WAL entries into the xlsx files, then drop the folded log"""
+    if _daemon["client"] is not None:
+        try:
+            return _daemon["client"].call("flush")
+        except (OSError, RuntimeError) as e:
+            print(f"Error checkpoint daemon: {str(e)}")
+            return False
+    try:
+        with wal_lock():
+            # A checkpoint that crashed left its log aside: fold that one first
+            while True:
+                if not os.path.exists(WAL_CHECKPOINT_FILE):
+                    if not os.path.exists(WAL_FILE) or os.path.getsize(WAL_FILE) == 0:
+                        return True
+                    # New mutations start a fresh log; nothing fsynced is ever truncated
+                    os.replace(WAL_FILE, WAL_CHECKPOINT_FILE)
+                fold_wal_entries(read_wal_file(WAL_CHECKPOINT_FILE))
+                os.remove(WAL_CHECKPOINT_FILE)
+                _wal_cache["key"] = None
+                save_reference_index()
+    except PermissionError:
+        print("Error: File sedang digunakan. Checkpoint WAL ditunda.")
+        return False
+    except Exception as e:
+        print(f"Error checkpoint WAL: {str(e)}")
         return False
 
+def wal_conflict(entry):
+    """Keep an append whose ID already holds another row instead of dropping it"""
+    print(f"Error: ID {entry['id']} di {entry['file']} dipakai dua kali; baris disimpan di {WAL_CONFLICT_FILE}")
+    values = [format_date(v) if isinstance(v, date) else v for v in entry["values"]]
+    with open(WAL_CONFLICT_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(dict(entry, values=values)) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def same_row(a, b):
+    normalize = lambda row: [format_date(v) if isinstance(v, date) else v for v in row]
+    return normalize(a) == normalize(b)
+
+def fold_wal_entries(entries):
+    """Apply WAL entries to the workbooks (caller holds wal_lock)
+
+    Replaying entries that are already in the files is harmless: a
+    checkpoint that crashed after saving folds its log again. An append
+    whose ID holds a different row, with no later update of that ID in the
+    log, is a conflict and goes to WAL_CONFLICT_FILE.
+    """
+    if not entries:
+        return
+    zakat_mtime = zakat_index_key()[0]
+    # Grouped by physical file: the single workbook is loaded and saved once
+    by_target = {}
+    for entry in entries:
+        files = by_target.setdefault(storage_file(entry["file"]), {})
+        files.setdefault(entry["file"], []).append(entry)
+    
+    for target, files in by_target.items():
+        wb = load_workbook(target)
+        for file_path, file_entries in files.items():
+            ws = dataset_sheet(wb, file_path)
+            row_of = {}
+            for idx, (cell,) in enumerate(ws.iter_rows(min_row=2, max_col=1), start=2):
+                if cell.value is not None:
+                    row_of[cell.value] = idx
+            
+            deleted = set()
+            last_write = {entry["id"]: position for position, entry in enumerate(file_entries)
+                          if entry["op"] != "append"}
+            for position, entry in enumerate(file_entries):
+                id = entry["id"]
+                if entry["op"] == "append" and id not in row_of:
+                    ws.append(list(entry["values"]))
+                    row_of[id] = ws.max_row
+                    deleted.discard(id)
+                elif entry["op"] == "append" and last_write.get(id, -1) < position:
+                    stored = [cell.value for cell in ws[row_of[id]]][:len(entry["values"])]
+                    if not same_row(stored, entry["values"]):
+                        wal_conflict(entry)
+                elif entry["op"] == "update" and id in row_of and id not in deleted:
+                    for column, value in enumerate(entry["values"], start=1):
+                        ws.cell(row=row_of[id], column=column, value=value)
+                elif entry["op"] == "delete" and id in row_of:
+                    deleted.add(id)
+            for idx in sorted((row_of[id] for id in deleted), reverse=True):
+                ws.delete_rows(idx)
+        # Saved to the resolved target, not via whichever file_path came last
+        if target == WORKBOOK_FILE:
+            update_workbook_index(wb)
+        save_workbook_atomic(wb, target)
+    zakat_index_checkpointed(zakat_mtime, [e for e in entries if e["file"] == ZAKAT_DATA_FILE])
+
 def add_zakat(nama, jenis_zakat, jumlah, tanggal):
     """Add new zakat data to the Excel file"""
     try:
@@ -99,12 +825,24 @@ def add_zakat(nama, jenis_zakat, jumlah, tanggal):
             print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
             return False
 
-        wb = load_workbook(ZAKAT_DATA_FILE)
-        ws = wb.active
-        new_id = get_next_id(ZAKAT_DATA_FILE)
-        
-        ws.append([new_id, nama.strip(), jenis_zakat.strip(), jumlah, tanggal])
-        wb.save(ZAKAT_DATA_FILE)
+        # Reserving the ID and writing its row must not interleave with another desk
+        with wal_lock():
+            new_id = get_next_id(ZAKAT_DATA_FILE)
+            row = [new_id, nama.strip(), jenis_zakat.strip(), jumlah, parse_date(tanggal)]
+            # With the daemon another desk may append in between, so the index is rebuilt instead
+            index_current = (_daemon["client"] is None and _zakat_index_cache["index"] is not None
+                             and _zakat_index_cache["mtime"] == zakat_index_key())
+            if USE_WAL:
+                wal_append("append", ZAKAT_DATA_FILE, new_id, row)
+            else:
+                wb, ws = open_sheet(ZAKAT_DATA_FILE)
+                ws.append(row)
+                save_sheet(wb, ZAKAT_DATA_FILE)
+            if index_current:
+                # Keep the search index warm instead of rebuilding it on the next lookup
+                _zakat_index_cache["index"].add(Zakat(*row))
+                _zakat_index_cache["mtime"] = zakat_index_key()
+        bump_data_version("zakat")
         print(f"Data zakat berhasil ditambahkan dengan ID: {new_id}")
         return True
     except PermissionError:
@@ -148,21 +886,29 @@ def update_zakat(id, nama, jenis_zakat, jumlah, tanggal):
             print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
             return False
 
-        wb = load_workbook(ZAKAT_DATA_FILE)
-        ws = wb.active
         found = False
-        
-        for row in ws.iter_rows(min_row=2):
-            if row[0].value == id:
-                row[1].value = nama.strip()
-                row[2].value = jenis_zakat.strip()
-                row[3].value = jumlah
-                row[4].value = tanggal
+        if USE_WAL:
+            if find_record(ZAKAT_DATA_FILE, Zakat, id) is not None:
+                wal_append("update", ZAKAT_DATA_FILE, id,
+                           [id, nama.strip(), jenis_zakat.strip(), jumlah, parse_date(tanggal)])
                 found = True
-                break
+        else:
+            wb, ws = open_sheet(ZAKAT_DATA_FILE)
+            
+            for row in ws.iter_rows(min_row=2):
+                if row[0].value == id:
+                    row[1].value = nama.strip()
+                    row[2].value = jenis_zakat.strip()
+                    row[3].value = jumlah
+                    row[4].value = parse_date(tanggal)
+                    found = True
+                    break
+            if found:
+                save_sheet(wb, ZAKAT_DATA_FILE)
         
         if found:
-            wb.save(ZAKAT_DATA_FILE)
+            mark_export_change("zakat", id)
+            bump_data_version("zakat")
             print(f"Data zakat dengan ID {id} berhasil diperbarui")
             return True
         else:
@@ -188,19 +934,31 @@ def delete_zakat(id):
             print("Error: ID harus berupa angka")
             return False
 
-        wb = load_workbook(ZAKAT_DATA_FILE)
-        ws = wb.active
+        # Check for dependent transactions
+        if count_transaksi_references("zakat", id) > 0:
+            print("Tidak bisa menghapus. Data memiliki transaksi terkait.")
+            return False
+
         rows_to_delete = []
-        
-        for idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
-            if row[0].value == id:
-                rows_to_delete.append(idx)
-        
-        for idx in sorted(rows_to_delete, reverse=True):
-            ws.delete_rows(idx)
+        if USE_WAL:
+            if find_record(ZAKAT_DATA_FILE, Zakat, id) is not None:
+                wal_append("delete", ZAKAT_DATA_FILE, id)
+                rows_to_delete.append(id)
+        else:
+            wb, ws = open_sheet(ZAKAT_DATA_FILE)
+            
+            for idx, row in enumerate(ws.iter_rows(min_row=2), start=2):
+                if row[0].value == id:
+                    rows_to_delete.append(idx)
+            
+            for idx in sorted(rows_to_delete, reverse=True):
+                ws.delete_rows(idx)
+            if rows_to_delete:
+                save_sheet(wb, ZAKAT_DATA_FILE)
         
         if rows_to_delete:
-            wb.save(ZAKAT_DATA_FILE)
+            mark_export_change("zakat", id, deleted=True)
+            bump_data_version("zakat")
             print(f"Data zakat dengan ID {id} berhasil dihapus")
             return True
         else:
@@ -230,12 +988,16 @@ def add_beras(nama_beras, harga_per_kg):
             print("Error: Harga harus berupa angka")
             return False
 
-        wb = load_workbook(MASTER_BERAS_FILE)
-        ws = wb.active
-        new_id = get_next_id(MASTER_BERAS_FILE)
-        
-        ws.append([new_id, nama_beras.strip(), harga_per_kg])
-        wb.save(MASTER_BERAS_FILE)
+        with wal_lock():
+            new_id = get_next_id(MASTER_BERAS_FILE)
+            row = [new_id, nama_beras.strip(), harga_per_kg]
+            if USE_WAL:
+                wal_append("append", MASTER_BERAS_FILE, new_id, row)
+            else:
+                wb, ws = open_sheet(MASTER_BERAS_FILE)
+                ws.append(row)
+                save_sheet(wb, MASTER_BERAS_FILE)
+        bump_data_version("beras")
         print(f"Data beras berhasil ditambahkan dengan ID: {new_id}")
         return True
     except PermissionError:
@@ -245,28 +1007,198 @@ def add_beras(nama_beras, harga_per_kg):
         print(f"Error menambahkan beras: {str(e)}")
         return False
 
-def view_master_beras():
-    """View all master beras data"""
+def iter_file_rows(file_path):
+    """Stream data rows from an Excel file with pending WAL entries applied
+
+    Only the (small) set of pending WAL entries is held in memory; the
+    workbook itself is read row by row in read-only mode.
+    """
+    if _daemon["client"] is not None:
+        yield from _daemon["client"].batch(file_path).rows()
+        return
+    pending = {}
+    for entry in wal_entries(file_path):
+        pending.setdefault(entry["id"], []).append(entry)
+    seen = set()
+    for row in iter_stored_rows(file_path):
+        if row[0] in pending:
+            seen.add(row[0])
+            rows = {row[0]: row}
+            apply_wal_entries(rows, pending[row[0]])
+            row = rows.get(row[0])
+            if row is None:
+                continue
+        yield row
+    for id, entries in pending.items():
+        if id not in seen:
+            rows = {}
+            apply_wal_entries(rows, entries)
+            yield from rows.values()
+
+def iter_stored_rows(file_path):
+    """Saved data rows of a file, streamed in read-only mode
+
+    On the single workbook the rows come from the shared parse of all sheets
+    instead, since the other sheets are needed for the join anyway.
+    """
+    target = storage_file(file_path)
+    if not os.path.exists(target):
+        return
+    if target != file_path:
+        yield from read_file_batch(file_path, SHEET_RECORDS[file_path]).rows()
+        return
+    wb = load_workbook(file_path, read_only=True)
     try:
-        if not os.path.exists(MASTER_BERAS_FILE):
-            print("Belum ada data master beras")
+        for row in wb.active.iter_rows(min_row=2, values_only=True):
+            if row and row[0] is not None:
+                yield row
+    finally:
+        wb.close()
+
+def iter_transaksi_rows(start=None, end=None):
+    """Stream transactions from the active storage, limited to a date range"""
+    start = parse_date(start) if start else None
+    end = parse_date(end) if end else None
+    if USE_TRANSAKSI_LEDGER:
+        if not os.path.exists(TRANSAKSI_LEDGER_FILE):
             return
+        ledger = TransaksiLedger()
+        rows = ledger.iter_rows()
+        try:
+            for row in rows:
+                tanggal = parse_date(row[5])
+                if (start is None or tanggal >= start) and (end is None or tanggal <= end):
+                    yield row
+        finally:
+            rows.close()  # Release the mmap view before closing the ledger
+            ledger.close()
+        return
+    
+    manifest = load_partition_manifest()
+    if manifest is None:
+        files = [TRANSAKSI_ZAKAT_FILE]
+    else:
+        files = [info["file"] for _, info in partitions_in_range(manifest, start, end)]
+    for file_path in files:
+        for row in iter_file_rows(file_path):
+            tanggal = parse_date(row[5])
+            if (start is None or tanggal >= start) and (end is None or tanggal <= end):
+                yield row
+
+def render_paged(title, header, width, make_rows, format_row, page_size=PAGE_SIZE, cache_key=None):
+    """Print a listing one page at a time
+
+    make_rows() must return a fresh row generator. It is read once per
+    listing and only as far as the furthest page shown; the formatted lines
+    are kept, so paging back and forth does not parse the workbook again.
+    With a cache_key (which must include the data versions), a listing read
+    to the end is reused until the data changes.
+    Commands: n(ext), p(rev), j <page>, f <text>, q(uit).
+    """
+    page = 0
+    keyword = ""
+    past_end = False
+    lines, source, stream = None, None, None  # Lines read so far; open row stream until exhausted
+    try:
+        while True:
+            if lines is None:
+                key = cache_key and (cache_key, keyword)
+                lines = render_cache_get(key) if key else None
+                if lines is None:
+                    lines = []
+                    source = make_rows()
+                    stream = (format_row(row) for row in source)
+                    if keyword:
+                        stream = (line for line in stream if keyword in line.casefold())
+            needed = (page + 1) * page_size + 1
+            if stream is not None and len(lines) < needed:
+                lines.extend(islice(stream, needed - len(lines)))
+                if len(lines) < needed:
+                    source.close()
+                    source = stream = None
+                    if key:
+                        render_cache_put(key, lines)
+            page_rows = lines[page * page_size:(page + 1) * page_size]
+            has_next = len(lines) > (page + 1) * page_size
+            
+            if not page_rows and page > 0:
+                page -= 1
+                past_end = True
+                continue
+            if past_end:
+                print("Sudah di halaman terakhir")
+                past_end = False
+            
+            print(f"\n{title}:")
+            print("-" * width)
+            print(header)
+            print("-" * width)
+            if not page_rows:
+                print("Tidak ada data" + (f" yang cocok dengan '{keyword}'" if keyword else ""))
+            for line in page_rows:
+                print(line)
+            print("-" * width)
+            print(f"Halaman {page + 1}" + (f" | filter: '{keyword}'" if keyword else ""))
+            
+            command = input("[n]ext [p]rev [j <hal>] [f <teks>] [q]uit: ").strip()
+            action, _, argument = command.partition(" ")
+            action = action.lower()
+            if action in ("", "n"):
+                if has_next:
+                    page += 1
+                elif action == "":
+                    return  # Enter on the last page closes the listing
+                else:
+                    print("Sudah di halaman terakhir")
+            elif action == "p":
+                page = max(page - 1, 0)
+            elif action == "j":
+                try:
+                    page = max(int(argument) - 1, 0)
+                except ValueError:
+                    print("Error: Nomor halaman harus angka")
+            elif action == "f":
+                keyword = argument.strip().casefold()
+                page = 0
+                if source is not None:
+                    source.close()
+                lines, source, stream = None, None, None
+            elif action == "q":
+                return
+            else:
+                print("Perintah tidak dikenal")
+    finally:
+        if source is not None:
+            source.close()
+
+def view_master_beras(paged=True):
+    """View master beras data, page by page unless paged is False"""
+    try:
+        header = f"{'ID':<5} | {'Nama Beras':<20} | {'Harga per Kg':<15}"
+        format_row = lambda row: f"{row[0]:<5} | {row[1]:<20} | {row[2]:<15.2f}"
         
-        wb = load_workbook(MASTER_BERAS_FILE)
-        ws = wb.active
+        if paged:
+            render_paged("Master Data Beras", header, 50,
+                         lambda: iter_file_rows(MASTER_BERAS_FILE), format_row,
+                         cache_key=("beras",) + data_versions("beras"))
+            return
         
-        if ws.max_row <= 1:
+        key = ("beras_all",) + data_versions("beras")
+        lines = render_cache_get(key)
+        if lines is None:
+            lines = [format_row(row) for row in read_batch(MASTER_BERAS_FILE, Beras).rows()]
+            render_cache_put(key, lines)
+        if not lines:
             print("Belum ada data master beras")
             return
         
         print("\nMaster Data Beras:")
         print("-" * 50)
-        print(f"{'ID':<5} | {'Nama Beras':<20} | {'Harga per Kg':<15}")
+        print(header)
         print("-" * 50)
         
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if row and row[0] is not None:
-                print(f"{row[0]:<5} | {row[1]:<20} | {row[2]:<15.2f}")
+        for line in lines:
+            print(line)
     except Exception as e:
         print(f"Error menampilkan master beras: {str(e)}")
 
@@ -305,47 +1237,50 @@ def add_transaksi_zakat(id_zakat, id_beras, jumlah_beras, tanggal):
             print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
             return False
 
-        # Check if zakat ID exists
-        zakat_exists = False
-        zakat_name = ""
-        if os.path.exists(ZAKAT_DATA_FILE):
-            wb_zakat = load_workbook(ZAKAT_DATA_FILE)
-            ws_zakat = wb_zakat.active
-            for row in ws_zakat.iter_rows(min_row=2, values_only=True):
-                if row and row[0] == id_zakat:
-                    zakat_exists = True
-                    zakat_name = row[1]
-                    break
-        
-        if not zakat_exists:
+        # Check if zakat ID exists (the search index doubles as an ID map)
+        zakat = get_zakat_index().records.get(id_zakat)
+        if zakat is None:
             print(f"Error: ID zakat {id_zakat} tidak ditemukan!")
             return False
+        zakat_name = zakat.nama
         
-        # Check if beras ID exists and get price
-        beras_price = None
-        beras_name = ""
-        if os.path.exists(MASTER_BERAS_FILE):
-            wb_beras = load_workbook(MASTER_BERAS_FILE)
-            ws_beras = wb_beras.active
-            for row in ws_beras.iter_rows(min_row=2, values_only=True):
-                if row and row[0] == id_beras:
-                    beras_price = row[2]
-                    beras_name = row[1]
-                    break
-        
-        if beras_price is None:
+        # Check if beras ID exists and get the price valid on the transaction date
+        beras = find_record(MASTER_BERAS_FILE, Beras, id_beras)
+        if beras is None or beras.harga_per_kg is None:
             print(f"Error: ID beras {id_beras} tidak ditemukan!")
             return False
+        beras_name = beras.nama_beras
         
-        total_harga = beras_price * jumlah_beras
+        total_harga = get_price_history().price_as_of(id_beras, tanggal) * jumlah_beras
         
-        # Add transaction
-        wb = load_workbook(TRANSAKSI_ZAKAT_FILE)
-        ws = wb.active
-        new_id = get_next_id(TRANSAKSI_ZAKAT_FILE)
+        # Add transaction; the ID counter (ledger header, manifest or file) is shared by every desk
+        with wal_lock():
+            if USE_TRANSAKSI_LEDGER:
+                with TransaksiLedger() as ledger:
+                    new_id = ledger.append(id_zakat, id_beras, jumlah_beras, total_harga, tanggal)
+            else:
+                # Partitioned: only the partition of this date is touched
+                manifest = load_partition_manifest()
+                if manifest is not None:
+                    key = partition_key(tanggal, manifest["granularity"])
+                    target_file = ensure_partition(manifest, key)["file"]
+                    new_id = reserve_partition_ids(manifest, 1)
+                else:
+                    target_file = TRANSAKSI_ZAKAT_FILE
+                    new_id = get_next_id(TRANSAKSI_ZAKAT_FILE)
+                row = [new_id, id_zakat, id_beras, jumlah_beras, total_harga, parse_date(tanggal)]
+                if USE_WAL:
+                    wal_append("append", target_file, new_id, row)
+                else:
+                    wb, ws = open_sheet(target_file)
+                    ws.append(row)
+                    save_sheet(wb, target_file)
+                if manifest is not None:
+                    record_partition_append(manifest, key, new_id)
+                    save_partition_manifest(manifest)
         
-        ws.append([new_id, id_zakat, id_beras, jumlah_beras, total_harga, tanggal])
-        wb.save(TRANSAKSI_ZAKAT_FILE)
+        record_transaksi_reference(new_id, id_zakat, id_beras)
+        bump_data_version("transaksi")
         
         print("\nTransaksi zakat berhasil ditambahkan:")
         print(f"ID Transaksi: {new_id}")
@@ -363,103 +1298,1949 @@ def add_transaksi_zakat(id_zakat, id_beras, jumlah_beras, tanggal):
         print(f"Error menambahkan transaksi: {str(e)}")
         return False
 
-def view_transaksi_zakat():
-    """View all zakat transactions"""
+def read_roster(path):
+    """Read a household roster (xlsx or csv) into columns nama, jiwa, id_beras
+
+    Columns are found by header name (ROSTER_HEADERS, case-insensitive).
+    Returns (columns, errors) where errors lists "baris N: ..." messages.
+    """
+    if path.lower().endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.reader(f))
+    else:
+        wb = load_workbook(path, read_only=True)
+        rows = [list(row) for row in wb.active.iter_rows(values_only=True)]
+        wb.close()
+    if not rows:
+        return None, ["roster kosong"]
+    header = [str(h).strip().casefold() if h is not None else "" for h in rows[0]]
+    missing = [h for h in ROSTER_HEADERS if h.casefold() not in header]
+    if missing:
+        return None, [f"kolom tidak ditemukan: {', '.join(missing)}"]
+    positions = [header.index(h.casefold()) for h in ROSTER_HEADERS]
+    
+    columns = {"nama": [], "jiwa": [], "id_beras": []}
+    errors = []
+    for line, row in enumerate(rows[1:], start=2):
+        row = list(row) + [None] * (len(header) - len(row))
+        nama, jiwa, id_beras = (row[i] for i in positions)
+        if all(v in (None, "") for v in (nama, jiwa, id_beras)):
+            continue  # Blank line
+        try:
+            jiwa = int(float(jiwa))
+            id_beras = int(float(id_beras))
+        except (ValueError, TypeError):
+            errors.append(f"baris {line}: jumlah jiwa dan ID beras harus berupa angka")
+            continue
+        if not nama or not str(nama).strip():
+            errors.append(f"baris {line}: nama kosong")
+        elif jiwa <= 0:
+            errors.append(f"baris {line}: jumlah jiwa harus lebih besar dari 0")
+        else:
+            columns["nama"].append(str(nama).strip())
+            columns["jiwa"].append(jiwa)
+            columns["id_beras"].append(id_beras)
+    return columns, errors
+
+def hitung_fitrah(jiwa, id_beras, tanggal):
+    """Required kg and rupiah for whole roster columns in one pass
+
+    kg is jiwa * FITRAH_KG_PER_JIWA; rupiah uses the price valid on tanggal
+    (PriceHistory.totals, vectorized with numpy). Unknown beras gives None.
+    """
+    if np is not None:
+        kg = (np.asarray(jiwa, dtype=float) * FITRAH_KG_PER_JIWA).tolist()
+    else:
+        kg = [j * FITRAH_KG_PER_JIWA for j in jiwa]
+    return kg, get_price_history().totals(id_beras, kg, [tanggal] * len(kg))
+
+def add_fitrah_batch(roster_path, tanggal):
+    """Record zakat fitrah for every household of a roster with one bulk write
+
+    Each household becomes a Fitrah payer (jumlah = rupiah value of its
+    beras, like every other payer) and one transaction carrying the kg. The
+    roster is validated first and nothing is written when any row is
+    invalid. On the single workbook payers and transactions share one save;
+    otherwise payers go to zakat_data.xlsx in a single save, then all
+    transactions in a single save per target (file, partition or ledger),
+    and zakat_data.xlsx is restored when the transactions cannot be written.
+    """
+    if daemon_blocks("Pencatatan zakat fitrah massal"):
+        return False
     try:
-        if not os.path.exists(TRANSAKSI_ZAKAT_FILE):
-            print("Belum ada data transaksi zakat")
-            return
+        if not validate_date(tanggal):
+            print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+            return False
+        if not os.path.exists(roster_path):
+            print(f"Error: File roster {roster_path} tidak ditemukan")
+            return False
         
-        wb_trans = load_workbook(TRANSAKSI_ZAKAT_FILE)
-        ws_trans = wb_trans.active
+        columns, errors = read_roster(roster_path)
+        if columns is not None and columns["nama"]:
+            kg, totals = hitung_fitrah(columns["jiwa"], columns["id_beras"], tanggal)
+            errors += [f"ID beras {b} tidak ditemukan (keluarga {n})"
+                       for n, b, t in zip(columns["nama"], columns["id_beras"], totals) if t is None]
+        elif not errors:
+            errors.append("roster tidak berisi keluarga")
+        if errors:
+            print(f"Error: Roster tidak valid, tidak ada data yang disimpan ({len(errors)} masalah):")
+            for message in errors[:10]:
+                print(f"  - {message}")
+            if len(errors) > 10:
+                print(f"  ... dan {len(errors) - 10} lainnya")
+            return False
         
-        if ws_trans.max_row <= 1:
-            print("Belum ada data transaksi zakat")
-            return
+        # Held from the checkpoint to the last save: no desk logs or reserves IDs in between
+        with wal_lock():
+            # Bulk writes go straight to the files, so pending WAL entries go first
+            if not checkpoint_wal():
+                return False
+            tanggal = parse_date(tanggal)
+            
+            first_zakat = get_next_id(ZAKAT_DATA_FILE)
+            zakat_ids = list(range(first_zakat, first_zakat + len(kg)))
+            wb, ws = open_sheet(ZAKAT_DATA_FILE)
+            for id, nama, total in zip(zakat_ids, columns["nama"], totals):
+                ws.append([id, nama, "Fitrah", total, tanggal])
+            shared_save = single_workbook() and not USE_TRANSAKSI_LEDGER
+            backup = None
+            if not shared_save:
+                # Put back if the transactions fail, so no payer is left without one
+                backup = storage_file(ZAKAT_DATA_FILE) + ".bak"
+                shutil.copy2(storage_file(ZAKAT_DATA_FILE), backup)
+                save_sheet(wb, ZAKAT_DATA_FILE)
+            
+            rows = list(zip(zakat_ids, columns["id_beras"], kg, totals))
+            transaksi_saved = False
+            try:
+                if USE_TRANSAKSI_LEDGER:
+                    with TransaksiLedger() as ledger:
+                        start_count = len(ledger)
+                        try:
+                            transaksi_ids = [ledger.append(id_zakat, id_beras, jumlah, total, tanggal)
+                                             for id_zakat, id_beras, jumlah, total in rows]
+                        except BaseException:
+                            ledger.truncate(start_count)
+                            raise
+                    transaksi_saved = True
+                else:
+                    manifest = load_partition_manifest()
+                    if manifest is not None:
+                        key = partition_key(tanggal, manifest["granularity"])
+                        target_file = ensure_partition(manifest, key)["file"]
+                        first_transaksi = reserve_partition_ids(manifest, len(rows))
+                    else:
+                        target_file = TRANSAKSI_ZAKAT_FILE
+                        first_transaksi = get_next_id(TRANSAKSI_ZAKAT_FILE)
+                    transaksi_ids = list(range(first_transaksi, first_transaksi + len(rows)))
+                    if shared_save:
+                        ws = dataset_sheet(wb, target_file)
+                    else:
+                        wb, ws = open_sheet(target_file)
+                    for id, row in zip(transaksi_ids, rows):
+                        ws.append([id, *row, tanggal])
+                    save_sheet(wb, target_file)
+                    transaksi_saved = True
+                    if manifest is not None:
+                        for id in transaksi_ids:
+                            record_partition_append(manifest, key, id)
+                        save_partition_manifest(manifest)
+            except BaseException:
+                if backup is not None and not transaksi_saved:
+                    os.replace(backup, storage_file(ZAKAT_DATA_FILE))
+                raise
+            finally:
+                if backup is not None and os.path.exists(backup):
+                    os.remove(backup)
+            bump_data_version("zakat")
         
-        # Load zakat data
-        zakat_data = {}
-        if os.path.exists(ZAKAT_DATA_FILE):
-            wb_zakat = load_workbook(ZAKAT_DATA_FILE)
-            ws_zakat = wb_zakat.active
-            for row in ws_zakat.iter_rows(min_row=2, values_only=True):
-                if row and row[0] is not None:
-                    zakat_data[row[0]] = (row[1], row[2])  # (nama, jenis_zakat)
-        
-        # Load beras data
-        beras_data = {}
-        if os.path.exists(MASTER_BERAS_FILE):
-            wb_beras = load_workbook(MASTER_BERAS_FILE)
-            ws_beras = wb_beras.active
-            for row in ws_beras.iter_rows(min_row=2, values_only=True):
-                if row and row[0] is not None:
-                    beras_data[row[0]] = row[1]  # nama_beras
+        for id, (id_zakat, id_beras, _, _) in zip(transaksi_ids, rows):
+            record_transaksi_reference(id, id_zakat, id_beras)
+        bump_data_version("transaksi")
+        
+        print(f"\nZakat fitrah {len(rows)} keluarga ({sum(columns['jiwa'])} jiwa) berhasil dicatat:")
+        print(f"ID Zakat: {zakat_ids[0]}-{zakat_ids[-1]}, ID Transaksi: {transaksi_ids[0]}-{transaksi_ids[-1]}")
+        print(f"Total Beras: {sum(kg):,.2f} kg")
+        print(f"Total Harga: Rp {sum(totals):,.2f}")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error mencatat zakat fitrah: {str(e)}")
+        return False
+
+def view_transaksi_zakat(start=None, end=None):
+    """View zakat transactions page by page, optionally limited to a date range (YYYY-MM-DD, inclusive)"""
+    try:
+        # Lookup columns for the join, built on the first uncached page only;
+        # the transactions themselves are streamed
+        lookups = {}
         
-        print("\nDaftar Transaksi Zakat:")
-        print("-" * 120)
-        print(f"{'ID':<5} | {'Nama':<20} | {'Jenis Zakat':<15} | {'Beras':<15} | {'Jumlah (kg)':<10} | {'Total Harga':<15} | {'Tanggal':<10}")
-        print("-" * 120)
+        def format_row(row):
+            if not lookups:
+                zakat = read_batch(ZAKAT_DATA_FILE, Zakat)
+                lookups["zakat"] = dict(zip(zakat.column("id"),
+                                            zip(zakat.column("nama"), zakat.column("jenis_zakat"))))
+                beras = read_batch(MASTER_BERAS_FILE, Beras)
+                lookups["beras"] = dict(zip(beras.column("id"), beras.column("nama_beras")))
+            nama, jenis_zakat = lookups["zakat"].get(row[1], ("Unknown", "Unknown"))
+            beras_name = lookups["beras"].get(row[2], "Unknown")
+            return (f"{row[0]:<5} | {nama:<20} | {jenis_zakat:<15} | {beras_name:<15} | "
+                    f"{row[3]:<10.2f} | Rp {row[4]:<12.2f} | {format_date(row[5]):<10}")
         
-        for row in ws_trans.iter_rows(min_row=2, values_only=True):
-            if row and row[0] is not None:
-                zakat_info = zakat_data.get(row[1], ("Unknown", "Unknown"))
-                beras_name = beras_data.get(row[2], "Unknown")
-                
-                print(f"{row[0]:<5} | {zakat_info[0]:<20} | {zakat_info[1]:<15} | {beras_name:<15} | "
-                      f"{row[3]:<10.2f} | Rp {row[4]:<12.2f} | {row[5]:<10}")
+        header = (f"{'ID':<5} | {'Nama':<20} | {'Jenis Zakat':<15} | {'Beras':<15} | "
+                  f"{'Jumlah (kg)':<10} | {'Total Harga':<15} | {'Tanggal':<10}")
+        render_paged("Daftar Transaksi Zakat", header, 120,
+                     lambda: iter_transaksi_rows(start, end), format_row,
+                     cache_key=("transaksi", start, end) + data_versions("transaksi", "zakat", "beras"))
     except Exception as e:
         print(f"Error menampilkan transaksi: {str(e)}")
 
-def export_to_excel():
+# Background exports: an export runs on a worker thread so the desk keeps
+# taking payments. The job counts rows as they are written, checks for
+# cancellation between rows and keeps its result lines for the menu.
+class ExportCancelled(BaseException):
+    """Raised inside an export whose job was cancelled
+
+    Derived from BaseException (like KeyboardInterrupt) so the exports'
+    generic error handlers do not report a cancellation as a failure.
+    """
+
+class ExportJob:
+    """One export running on a background thread"""
+
+    def __init__(self, id, name, func, args=()):
+        self.id = id
+        self.name = name
+        self.total = 0
+        self.done = 0
+        self.status = "berjalan"
+        self.messages = []
+        self.failed = False
+        self.reported = False
+        self.started = time.perf_counter()
+        self.finished = None
+        self.cancel_event = threading.Event()
+        self.thread = threading.Thread(target=self.run, args=(func, args),
+                                       name=f"ekspor-{id}", daemon=True)
+
+    def run(self, func, args):
+        try:
+            func(*args, job=self)
+            self.status = "gagal" if self.failed else "selesai"
+        except ExportCancelled:
+            self.status = "dibatalkan"
+        except Exception as e:
+            self.messages.append(f"Error ekspor: {str(e)}")
+            self.status = "gagal"
+        finally:
+            self.finished = time.perf_counter()
+
+    def add_total(self, rows):
+        self.total += rows
+
+    def advance(self, rows=1):
+        """Count written rows; raises ExportCancelled once cancel() was called"""
+        self.done += rows
+        if self.cancel_event.is_set():
+            raise ExportCancelled()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def log(self, message, error=False):
+        self.messages.append(message)
+        self.failed = self.failed or error
+
+    def running(self):
+        return self.finished is None
+
+    def rate(self):
+        """Rows written per second so far"""
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    def eta(self):
+        """Seconds left at the current rate, or None when unknown"""
+        rate = self.rate()
+        if not self.running() or not self.total or rate <= 0:
+            return None
+        return max(self.total - self.done, 0) / rate
+
+_export_jobs = OrderedDict()  # id -> ExportJob
+
+def export_message(job, message, error=False):
+    """Print an export result line, or keep it on the job when running in the background"""
+    if job is None:
+        print(message)
+    else:
+        job.log(message, error)
+
+def append_rows(ws, rows, job=None):
+    """Append rows to a write-only sheet, counting each one on the export job"""
+    try:
+        for row in rows:
+            ws.append(list(row))
+            if job is not None:
+                job.advance()
+    except ExportCancelled:
+        ws.close()  # End the sheet's temp stream instead of leaving it to the garbage collector
+        raise
+
+def start_export_job(name, func, *args):
+    """Run an export function (taking a job= keyword) on a background thread"""
+    for job in _export_jobs.values():
+        if job.name == name and job.running():
+            print(f"Ekspor {name} masih berjalan (#{job.id})")
+            return None
+    job = ExportJob(len(_export_jobs) + 1, name, func, args)
+    _export_jobs[job.id] = job
+    job.thread.start()
+    print(f"Ekspor #{job.id} ({name}) berjalan di latar. Progres ada di menu Ekspor Data.")
+    return job
+
+def format_duration(seconds):
+    if seconds is None:
+        return "-"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+def view_export_jobs():
+    """Show progress, speed and ETA of background exports"""
+    if not _export_jobs:
+        print("Belum ada ekspor latar")
+        return
+    print("\n" + "="*80)
+    print("EKSPOR LATAR".center(80))
+    print("="*80)
+    print(f"{'ID':<4} | {'Ekspor':<12} | {'Status':<10} | {'Baris':<22} | {'Baris/detik':<11} | {'ETA':<6}")
+    print("-"*80)
+    for job in _export_jobs.values():
+        progress = f"{job.done}/{job.total}" if job.total else str(job.done)
+        if job.total:
+            progress += f" ({min(job.done / job.total, 1.0):.0%})"
+        print(f"{job.id:<4} | {job.name:<12} | {job.status:<10} | {progress:<22} | "
+              f"{job.rate():<11.0f} | {format_duration(job.eta()):<6}")
+
+def cancel_export_job(id):
+    """Ask a running background export to stop; its partial files are removed"""
+    try:
+        job = _export_jobs.get(int(id))
+    except ValueError:
+        job = None
+    if job is None:
+        print("Ekspor tidak ditemukan")
+        return False
+    if not job.running():
+        print(f"Ekspor #{job.id} sudah {job.status}")
+        return False
+    job.cancel()
+    print(f"Ekspor #{job.id} akan dihentikan")
+    return True
+
+def report_finished_exports():
+    """Print the result of background exports that finished since the last call"""
+    for job in _export_jobs.values():
+        if job.running() or job.reported:
+            continue
+        job.reported = True
+        print(f"\n[Ekspor #{job.id} {job.name} {job.status}]")
+        for message in job.messages:
+            print(message)
+
+def wait_export_jobs():
+    """Let running exports finish before the program exits"""
+    running = [job for job in _export_jobs.values() if job.running()]
+    if running:
+        print("Menunggu ekspor latar selesai...")
+        for job in running:
+            job.thread.join()
+        report_finished_exports()
+
+def export_to_excel(job=None):
     """Export zakat data to a new Excel file"""
     try:
-        if not os.path.exists(ZAKAT_DATA_FILE):
-            print("Tidak ada data zakat untuk diekspor")
+        if not os.path.exists(storage_file(ZAKAT_DATA_FILE)):
+            export_message(job, "Tidak ada data zakat untuk diekspor")
             return
         
-        wb = load_workbook(ZAKAT_DATA_FILE)
-        ws = wb.active
+        zakat = read_batch(ZAKAT_DATA_FILE, Zakat)
         
-        if ws.max_row <= 1:
-            print("Tidak ada data zakat untuk diekspor")
+        if not zakat:
+            export_message(job, "Tidak ada data zakat untuk diekspor")
             return
+        if job is not None:
+            job.add_total(len(zakat))
         
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"data_zakat_export_{timestamp}.xlsx"
         
-        export_wb = Workbook()
-        export_ws = export_wb.active
-        export_ws.title = "Zakat Data Export"
+        export_wb = Workbook(write_only=True)
+        export_ws = export_wb.create_sheet("Zakat Data Export")
         
-        # Copy headers
-        for row in ws.iter_rows(max_row=1):
-            export_ws.append([cell.value for cell in row])
-        
-        # Copy data
-        for row in ws.iter_rows(min_row=2):
-            export_ws.append([cell.value for cell in row])
+        export_ws.append(["ID", "Nama", "Jenis Zakat", "Jumlah", "Tanggal"])
+        append_rows(export_ws, zakat.rows(), job)
         
         export_wb.save(filename)
-        print(f"\nData zakat berhasil diekspor ke file: {filename}")
-        print(f"Lokasi file: {os.path.abspath(filename)}")
+        export_message(job, f"\nData zakat berhasil diekspor ke file: {filename}")
+        export_message(job, f"Lokasi file: {os.path.abspath(filename)}")
     except PermissionError:
-        print("Error: Tidak bisa menulis file. Pastikan tidak ada file dengan nama yang sama yang sedang terbuka.")
+        export_message(job, "Error: Tidak bisa menulis file. Pastikan tidak ada file dengan nama yang sama yang sedang terbuka.", error=True)
     except Exception as e:
-        print(f"Error ekspor data: {str(e)}")
+        export_message(job, f"Error ekspor data: {str(e)}", error=True)
 
-def input_master_beras():
-    """Input new master beras data from user"""
-    print("\nTambah Data Master Beras")
-    while True:
-        nama_beras = input("Masukkan nama jenis beras (min 3 karakter): ").strip()
-        if len(nama_beras) >= 3:
-            break
-        print("Error: Nama beras harus minimal 3 karakter")
+# Incremental export: each dataset keeps a watermark (last exported ID) plus
+# the IDs updated or deleted since then, so an export only writes new and
+# changed rows into a timestamped delta file.
+EXPORT_DATASETS = {
+    "zakat": (ZAKAT_DATA_FILE, Zakat, ["ID", "Nama", "Jenis Zakat", "Jumlah", "Tanggal"]),
+    "beras": (MASTER_BERAS_FILE, Beras, ["ID", "Nama Beras", "Harga per Kg"]),
+    "transaksi": (TRANSAKSI_ZAKAT_FILE, Transaksi,
+                  ["ID", "ID Zakat", "ID Beras", "Jumlah Beras", "Total Harga", "Tanggal"]),
+}
+
+# Background exports and the desk both update the state file
+_export_state_lock = threading.Lock()
+
+def load_export_state():
+    """Load export watermarks; missing datasets start from zero"""
+    state = {}
+    if os.path.exists(EXPORT_STATE_FILE):
+        with open(EXPORT_STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    for dataset in EXPORT_DATASETS:
+        entry = state.setdefault(dataset, {})
+        entry.setdefault("last_id", 0)
+        entry.setdefault("changed", [])
+        entry.setdefault("deleted", [])
+    return state
+
+def save_export_state(state):
+    """Write export watermarks atomically"""
+    tmp_path = EXPORT_STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, EXPORT_STATE_FILE)
+
+def mark_export_change(dataset, id, deleted=False):
+    """Remember that an already exported row was updated or deleted"""
+    mark_export_changes(dataset, [id], deleted)
+
+def mark_export_changes(dataset, ids, deleted=False):
+    """Bulk form of mark_export_change: the state file is written once"""
+    try:
+        with _export_state_lock:
+            if not os.path.exists(EXPORT_STATE_FILE):
+                return  # Nothing exported yet, the next export covers everything
+            state = load_export_state()
+            entry = state[dataset]
+            key = "deleted" if deleted else "changed"
+            marked = set(entry[key])
+            for id in ids:
+                if id > entry["last_id"] or id in marked:
+                    continue  # Not exported yet (picked up as a new row) or already marked
+                entry[key].append(id)
+                marked.add(id)
+            if deleted:
+                entry["changed"] = [id for id in entry["changed"] if id not in marked]
+            save_export_state(state)
+    except Exception as e:
+        print(f"Peringatan: gagal mencatat perubahan ekspor: {str(e)}")
+
+def iter_delta_rows(dataset, entry):
+    """Yield (status, row) for rows that are new or changed since the watermark"""
+    file_path, record_cls, _ = EXPORT_DATASETS[dataset]
+    last_id = entry["last_id"]
+    changed = set(entry["changed"])
     
-    while True:
-        harga_input = input("Masukkan harga per kg (contoh: 15000): ").strip()
-        try:
-            harga_per_kg = float(harga_input)
+    if dataset == "transaksi" and USE_TRANSAKSI_LEDGER:
+        # Ledger slots are addressed by ID: read only what follows the watermark
+        if not os.path.exists(TRANSAKSI_LEDGER_FILE):
+            return
+        with TransaksiLedger() as ledger:
+            for id in sorted(changed):
+                row = ledger.get(id)
+                if row:
+                    yield "ubah", row
+            yield from (("baru", row) for row in ledger.iter_rows(start_id=last_id + 1))
+        return
+    
+    if dataset == "transaksi" and load_partition_manifest() is not None:
+        # Only partitions holding new IDs or changed rows need to be opened
+        manifest = load_partition_manifest()
+        rows = []
+        for info in manifest["partitions"].values():
+            if info["max_id"] > last_id or any(info["min_id"] <= id <= info["max_id"] for id in changed):
+                rows.extend(read_batch(info["file"], record_cls).rows())
+    else:
+        rows = read_batch(file_path, record_cls).rows()
+    
+    for row in rows:
+        if not isinstance(row[0], (int, float)):
+            continue
+        if row[0] > last_id:
+            yield "baru", row
+        elif row[0] in changed:
+            yield "ubah", row
+
+def export_incremental(job=None):
+    """Export only rows added, changed or deleted since the previous export
+
+    Rows may change while the export runs, so at the end the state file is
+    read again and only the IDs written by this run are cleared.
+    """
+    written = []
+    try:
+        with _export_state_lock:
+            state = load_export_state()
+        os.makedirs(EXPORT_DELTA_DIR, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        exported = {}
+        
+        for dataset, (_, _, headers) in EXPORT_DATASETS.items():
+            entry = state[dataset]
+            delta_rows = []
+            max_id = entry["last_id"]
+            
+            for status, row in iter_delta_rows(dataset, entry):
+                delta_rows.append([status] + list(row))
+                max_id = max(max_id, int(row[0]))
+            for id in entry["deleted"]:
+                delta_rows.append(["hapus", id] + [None] * (len(headers) - 1))
+            
+            if delta_rows:
+                if job is not None:
+                    job.add_total(len(delta_rows))
+                delta_wb = Workbook(write_only=True)
+                delta_ws = delta_wb.create_sheet(f"Delta {dataset}")
+                delta_ws.append(["Status"] + headers)
+                append_rows(delta_ws, delta_rows, job)
+                filename = os.path.join(EXPORT_DELTA_DIR, f"{dataset}_delta_{timestamp}.xlsx")
+                delta_wb.save(filename)
+                written.append((filename, len(delta_rows)))
+            exported[dataset] = (max_id, set(entry["changed"]), set(entry["deleted"]))
+        
+        with _export_state_lock:
+            state = load_export_state()
+            for dataset, (max_id, changed, deleted) in exported.items():
+                entry = state[dataset]
+                entry["last_id"] = max(entry["last_id"], max_id)
+                entry["changed"] = [id for id in entry["changed"] if id not in changed]
+                entry["deleted"] = [id for id in entry["deleted"] if id not in deleted]
+            save_export_state(state)
+        if not written:
+            export_message(job, "Tidak ada perubahan sejak ekspor terakhir")
+            return
+        export_message(job, "\nEkspor inkremental selesai:")
+        for filename, count in written:
+            export_message(job, f"- {filename} ({count} baris)")
+    except ExportCancelled:
+        # The watermarks were not saved, so drop the deltas already written
+        for filename, _ in written:
+            os.remove(filename)
+        raise
+    except PermissionError:
+        export_message(job, "Error: Tidak bisa menulis file. Pastikan tidak ada file dengan nama yang sama yang sedang terbuka.", error=True)
+    except Exception as e:
+        export_message(job, f"Error ekspor inkremental: {str(e)}", error=True)
+
+def consolidate_deltas(dataset=None):
+    """Merge delta files into one consolidated workbook per dataset and remove them"""
+    try:
+        if not os.path.isdir(EXPORT_DELTA_DIR):
+            print("Belum ada file delta")
+            return
+        datasets = [dataset] if dataset else list(EXPORT_DATASETS)
+        
+        for name in datasets:
+            headers = EXPORT_DATASETS[name][2]
+            prefix = f"{name}_delta_"
+            delta_files = sorted(f for f in os.listdir(EXPORT_DELTA_DIR)
+                                 if f.startswith(prefix) and f.endswith(".xlsx"))
+            if not delta_files:
+                continue
+            
+            target = os.path.join(EXPORT_DELTA_DIR, f"{name}_konsolidasi.xlsx")
+            rows = {}
+            if os.path.exists(target):
+                wb = load_workbook(target, read_only=True)
+                for row in wb.active.iter_rows(min_row=2, values_only=True):
+                    if row and row[0] is not None:
+                        rows[row[0]] = row
+                wb.close()
+            
+            # Deltas are applied oldest first, so later changes win
+            for filename in delta_files:
+                wb = load_workbook(os.path.join(EXPORT_DELTA_DIR, filename), read_only=True)
+                for row in wb.active.iter_rows(min_row=2, values_only=True):
+                    if not row or row[1] is None:
+                        continue
+                    if row[0] == "hapus":
+                        rows.pop(row[1], None)
+                    else:
+                        rows[row[1]] = row[1:]
+                wb.close()
+            
+            out_wb = Workbook(write_only=True)
+            out_ws = out_wb.create_sheet(f"Konsolidasi {name}")
+            out_ws.append(headers)
+            for id in sorted(rows):
+                out_ws.append(list(rows[id]))
+            out_wb.save(target)
+            for filename in delta_files:
+                os.remove(os.path.join(EXPORT_DELTA_DIR, filename))
+            print(f"{len(delta_files)} file delta {name} digabung ke {target}")
+    except PermissionError:
+        print("Error: Tidak bisa menulis file. Pastikan tidak ada file dengan nama yang sama yang sedang terbuka.")
+    except Exception as e:
+        print(f"Error konsolidasi delta: {str(e)}")
+
+def load_dataset_rows(dataset):
+    """Return all data rows of an export dataset as a list of tuples"""
+    file_path, record_cls, _ = EXPORT_DATASETS[dataset]
+    if dataset == "transaksi" and USE_TRANSAKSI_LEDGER:
+        if not os.path.exists(TRANSAKSI_LEDGER_FILE):
+            return []
+        with TransaksiLedger() as ledger:
+            return list(ledger.iter_rows())
+    if dataset == "transaksi":
+        return list(read_transaksi_batch().rows())
+    return list(read_batch(file_path, record_cls).rows())
+
+def write_export_part(task):
+    """Serialize one dataset (or row-range shard) to its own workbook
+
+    Runs inside a worker process, so it only receives plain picklable data.
+    """
+    path, title, headers, rows = task
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(title)
+    ws.append(headers)
+    for row in rows:
+        ws.append(list(row))
+    wb.save(path)
+    return path, len(rows)
+
+def build_export_tasks(output_dir, datasets, shard_rows):
+    """Split datasets into (path, title, headers, rows) tasks of at most shard_rows rows"""
+    tasks = []
+    for dataset, rows in datasets.items():
+        headers = EXPORT_DATASETS[dataset][2]
+        if len(rows) <= shard_rows:
+            tasks.append((os.path.join(output_dir, f"data_{dataset}.xlsx"), dataset, headers, rows))
+            continue
+        for part, start in enumerate(range(0, len(rows), shard_rows), start=1):
+            path = os.path.join(output_dir, f"data_{dataset}_part{part:03d}.xlsx")
+            tasks.append((path, f"{dataset} {part}", headers, rows[start:start + shard_rows]))
+    return tasks
+
+def run_export_tasks(tasks, workers, job=None):
+    """Run export tasks inline (1 worker) or in a process pool
+
+    With a job, progress is counted per finished task and a cancellation
+    drops the tasks that have not started yet.
+    """
+    if workers <= 1 or len(tasks) <= 1:
+        results = []
+        for task in tasks:
+            results.append(write_export_part(task))
+            if job is not None:
+                job.advance(results[-1][1])
+        return results
+    # Biggest tasks first so one large shard does not end up last
+    tasks = sorted(tasks, key=lambda task: len(task[3]), reverse=True)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        if job is None:
+            return list(pool.map(write_export_part, tasks))
+        futures = [pool.submit(write_export_part, task) for task in tasks]
+        results = []
+        try:
+            for future in as_completed(futures):
+                results.append(future.result())
+                job.advance(results[-1][1])
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+        return results
+
+def export_parallel(workers=None, shard_rows=None, job=None):
+    """Export zakat, beras and transaksi data using a process pool"""
+    workers = workers or EXPORT_WORKERS
+    shard_rows = shard_rows or EXPORT_SHARD_ROWS
+    output_dir = None
+    try:
+        datasets = {dataset: load_dataset_rows(dataset) for dataset in EXPORT_DATASETS}
+        if not any(datasets.values()):
+            export_message(job, "Tidak ada data untuk diekspor")
+            return
+        if job is not None:
+            job.add_total(sum(len(rows) for rows in datasets.values()))
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_dir = f"data_export_{timestamp}"
+        os.makedirs(output_dir, exist_ok=True)
+        
+        start = time.perf_counter()
+        results = run_export_tasks(build_export_tasks(output_dir, datasets, shard_rows), workers, job)
+        elapsed = time.perf_counter() - start
+        
+        export_message(job, f"\nData berhasil diekspor ke folder: {os.path.abspath(output_dir)}")
+        for path, count in sorted(results):
+            export_message(job, f"- {os.path.basename(path)} ({count} baris)")
+        export_message(job, f"Waktu serialisasi: {elapsed:.2f} detik dengan {workers} worker")
+    except ExportCancelled:
+        if output_dir:
+            shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+    except PermissionError:
+        export_message(job, "Error: Tidak bisa menulis file. Pastikan tidak ada file dengan nama yang sama yang sedang terbuka.", error=True)
+    except Exception as e:
+        export_message(job, f"Error ekspor paralel: {str(e)}", error=True)
+
+def benchmark_export_parallel(rows=200000, worker_counts=None, shard_rows=None):
+    """Time the parallel export on synthetic transactions for several worker counts"""
+    shard_rows = shard_rows or EXPORT_SHARD_ROWS
+    cpu = os.cpu_count() or 1
+    worker_counts = worker_counts or sorted({1, 2, 4, cpu})
+    data = {
+        "zakat": [(i, f"Nama {i}", "Fitrah", 35000.0, date(2025, 3, 1 + i % 28)) for i in range(1, rows // 4 + 1)],
+        "beras": [(i, f"Beras {i}", 12000.0 + i) for i in range(1, 11)],
+        "transaksi": [(i, i % 1000 + 1, i % 10 + 1, 2.5, 30000.0, date(2025, 3, 1 + i % 28))
+                      for i in range(1, rows + 1)],
+    }
+    print(f"Benchmark ekspor paralel: {rows} transaksi, shard {shard_rows} baris, {cpu} CPU")
+    print(f"{'Worker':<8} | {'Detik':<8} | {'Speedup':<8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for workers in worker_counts:
+            tasks = build_export_tasks(tmp_dir, data, shard_rows)
+            start = time.perf_counter()
+            run_export_tasks(tasks, workers)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f"{workers:<8} | {elapsed:<8.2f} | {baseline / elapsed:<8.2f}")
+
+# Ledger layout: 16-byte header (magic, version, record count) followed by
+# fixed-width records. Record N (0-based) always holds transaction ID N + 1,
+# so lookup by ID is a single offset computation. Gaps are kept as
+# tombstones (id == 0).
+LEDGER_MAGIC = b"ZKTL"
+LEDGER_VERSION = 1
+LEDGER_HEADER = struct.Struct("<4sIQ")
+LEDGER_RECORD = struct.Struct("<qqqddii")  # id, id_zakat, id_beras, kg, total, yyyymmdd, flags
+LEDGER_GROW_RECORDS = 4096
+
+if np is not None:
+    LEDGER_DTYPE = np.dtype([
+        ("id", "<i8"), ("id_zakat", "<i8"), ("id_beras", "<i8"),
+        ("jumlah_beras", "<f8"), ("total_harga", "<f8"),
+        ("tanggal", "<i4"), ("flags", "<i4"),
+    ])
+
+def date_to_int(tanggal):
+    """Convert a YYYY-MM-DD string (or date) to a YYYYMMDD integer"""
+    if hasattr(tanggal, "strftime"):
+        tanggal = tanggal.strftime("%Y-%m-%d")
+    return int(str(tanggal).replace("-", ""))
+
+def int_to_date(value):
+    """Convert a YYYYMMDD integer back to a YYYY-MM-DD string"""
+    value = int(value)
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+class TransaksiLedger:
+    """Memory-mapped, append-only store of fixed-width transaction records"""
+
+    def __init__(self, path=TRANSAKSI_LEDGER_FILE):
+        self.path = path
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(LEDGER_HEADER.pack(LEDGER_MAGIC, LEDGER_VERSION, 0))
+        self._file = open(path, "r+b")
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+        magic, version, count = LEDGER_HEADER.unpack_from(self._mm, 0)
+        if magic != LEDGER_MAGIC or version != LEDGER_VERSION:
+            self.close()
+            raise ValueError(f"File {path} bukan ledger transaksi yang valid")
+        self.count = count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        """Flush and release the mapping"""
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _offset(self, index):
+        return LEDGER_HEADER.size + index * LEDGER_RECORD.size
+
+    def _ensure_capacity(self, records):
+        """Grow the file in chunks so appends stay amortized O(1)"""
+        needed = self._offset(records)
+        if needed <= len(self._mm):
+            return
+        new_size = self._offset(records + LEDGER_GROW_RECORDS)
+        self._mm.close()
+        self._file.truncate(new_size)
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _set_count(self, count):
+        self.count = count
+        LEDGER_HEADER.pack_into(self._mm, 0, LEDGER_MAGIC, LEDGER_VERSION, count)
+
+    def next_id(self):
+        return self.count + 1
+
+    def truncate(self, count):
+        """Drop the records after count (rollback of a failed batch of appends)"""
+        if count >= self.count:
+            return
+        start, end = self._offset(count), self._offset(self.count)
+        self._mm[start:end] = bytes(end - start)  # Zero-filled again, like never-written slots
+        self._set_count(count)
+
+    def append(self, id_zakat, id_beras, jumlah_beras, total_harga, tanggal, id=None):
+        """Append a record and return its ID; a larger explicit ID leaves tombstones"""
+        new_id = self.count + 1 if id is None else int(id)
+        if new_id <= self.count:
+            raise ValueError(f"ID {new_id} sudah ada di ledger")
+        self._ensure_capacity(new_id)
+        # Slots between count and new_id - 1 are still zero-filled -> tombstones
+        LEDGER_RECORD.pack_into(self._mm, self._offset(new_id - 1), new_id, int(id_zakat),
+                                int(id_beras), float(jumlah_beras), float(total_harga),
+                                date_to_int(tanggal), 0)
+        self._set_count(new_id)
+        return new_id
+
+    def get(self, id):
+        """Return the record tuple for an ID, or None when missing"""
+        id = int(id)
+        if id <= 0 or id > self.count:
+            return None
+        row = LEDGER_RECORD.unpack_from(self._mm, self._offset(id - 1))
+        if row[0] == 0:
+            return None
+        return (row[0], row[1], row[2], row[3], row[4], int_to_date(row[5]))
+
+    def set_total(self, id, total_harga):
+        """Overwrite total_harga of an existing record in place"""
+        id = int(id)
+        row = LEDGER_RECORD.unpack_from(self._mm, self._offset(id - 1)) if 0 < id <= self.count else None
+        if row is None or row[0] == 0:
+            raise KeyError(f"ID {id} tidak ada di ledger")
+        LEDGER_RECORD.pack_into(self._mm, self._offset(id - 1), *row[:4], float(total_harga), *row[5:])
+
+    def iter_rows(self, start_id=1):
+        """Yield records in the same shape as the xlsx rows (tanggal as string)"""
+        start = min(max(int(start_id), 1), self.count + 1) - 1
+        view = memoryview(self._mm)[self._offset(start):self._offset(self.count)]
+        try:
+            for row in LEDGER_RECORD.iter_unpack(view):
+                if row[0] != 0:
+                    yield (row[0], row[1], row[2], row[3], row[4], int_to_date(row[5]))
+        finally:
+            view.release()
+
+    def as_array(self):
+        """Zero-copy NumPy structured view of all records (requires numpy)
+
+        The returned array is only valid until the next append or close.
+        """
+        if np is None:
+            raise RuntimeError("Modul 'numpy' diperlukan untuk as_array()")
+        arr = np.frombuffer(self._mm, dtype=LEDGER_DTYPE, count=self.count,
+                            offset=LEDGER_HEADER.size)
+        return arr[arr["id"] != 0]
+
+def convert_xlsx_to_ledger(xlsx_path=TRANSAKSI_ZAKAT_FILE, ledger_path=TRANSAKSI_LEDGER_FILE):
+    """Build a ledger file from the transaksi_zakat xlsx layout"""
+    if daemon_blocks("Konversi ke ledger") or layout_blocks("Konversi ke ledger"):
+        return False
+    try:
+        if USE_TRANSAKSI_LEDGER:
+            print("Error: Ledger sedang menjadi penyimpanan transaksi aktif, konversi akan menimpanya")
+            return False
+        if not os.path.exists(xlsx_path):
+            print("Belum ada data transaksi zakat")
+            return False
+        if not checkpoint_wal():
+            return False  # The xlsx would still be missing the rows logged in the WAL
+
+        wb = load_workbook(xlsx_path, read_only=True)
+        ws = wb.active
+        rows = [row for row in ws.iter_rows(min_row=2, values_only=True)
+                if row and isinstance(row[0], (int, float))]
+        wb.close()
+        rows.sort(key=lambda row: int(row[0]))
+
+        # Built next to the target and renamed over it, so a failed rebuild
+        # leaves any existing ledger untouched
+        tmp_path = ledger_path + ".tmp"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            with TransaksiLedger(tmp_path) as ledger:
+                for row in rows:
+                    ledger.append(row[1], row[2], row[3], row[4], row[5], id=row[0])
+                total = len(rows)
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, ledger_path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        bump_data_version("transaksi")
+        print(f"{total} transaksi berhasil dikonversi ke ledger: {ledger_path}")
+        return True
+    except Exception as e:
+        print(f"Error konversi ke ledger: {str(e)}")
+        return False
+
+def convert_ledger_to_xlsx(ledger_path=TRANSAKSI_LEDGER_FILE, xlsx_path=TRANSAKSI_ZAKAT_FILE):
+    """Write the ledger contents back to the transaksi_zakat xlsx layout"""
+    if daemon_blocks("Konversi ke Excel") or layout_blocks("Konversi ke Excel"):
+        return False
+    try:
+        if not USE_TRANSAKSI_LEDGER:
+            print("Error: Excel sedang menjadi penyimpanan transaksi aktif, konversi akan menimpanya")
+            return False
+        if not os.path.exists(ledger_path):
+            print("File ledger tidak ditemukan")
+            return False
+
+        with wal_lock():
+            if not checkpoint_wal():
+                return False
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet("Transaksi Zakat")
+            ws.append(TRANSAKSI_HEADERS)
+            total = 0
+            with TransaksiLedger(ledger_path) as ledger:
+                for row in ledger.iter_rows():
+                    ws.append(list(row))
+                    total += 1
+            save_workbook_atomic(wb, xlsx_path)
+        invalidate_reference_index()
+        bump_data_version("transaksi")
+        print(f"{total} transaksi berhasil ditulis ke: {xlsx_path}")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error konversi ke xlsx: {str(e)}")
+        return False
+
+def load_partition_manifest():
+    """Return the transaction partition manifest, or None when not partitioned"""
+    if not os.path.exists(PARTITION_MANIFEST_FILE):
+        return None
+    with open(PARTITION_MANIFEST_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_partition_manifest(manifest):
+    tmp_path = PARTITION_MANIFEST_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, PARTITION_MANIFEST_FILE)
+
+def partition_key(tanggal, granularity):
+    """Partition key for a date: 'YYYY' for year, 'YYYY-MM' for month"""
+    tanggal = parse_date(tanggal)
+    return f"{tanggal.year:04d}" if granularity == "year" else f"{tanggal.year:04d}-{tanggal.month:02d}"
+
+def partition_file(key):
+    return f"transaksi_zakat_{key}.xlsx"
+
+def partition_bounds(start, end, granularity):
+    """Keys bounding a date range; None means open-ended"""
+    return (partition_key(start, granularity) if start else None,
+            partition_key(end, granularity) if end else None)
+
+def partitions_in_range(manifest, start=None, end=None):
+    """Partition entries whose key falls inside the date range (pruning)"""
+    lo, hi = partition_bounds(start, end, manifest["granularity"])
+    return [(key, info) for key, info in sorted(manifest["partitions"].items())
+            if (lo is None or key >= lo) and (hi is None or key <= hi)]
+
+def ensure_partition(manifest, key):
+    """Create the workbook for a partition on first use"""
+    info = manifest["partitions"].get(key)
+    if info is None:
+        info = {"file": partition_file(key), "rows": 0, "min_id": None, "max_id": 0}
+        manifest["partitions"][key] = info
+    if not os.path.exists(info["file"]):
+        wb = Workbook()
+        ws = wb.active
+        ws.title = f"Transaksi {key}"
+        ws.append(TRANSAKSI_HEADERS)
+        wb.save(info["file"])
+    return info
+
+def reserve_partition_ids(manifest, count):
+    """Hand out count new transaction IDs and persist them before any row is written
+
+    A crash after the reservation only leaves a gap; it never hands the same
+    ID out twice (the checkpoint would drop the second row as a duplicate).
+    """
+    first_id = manifest["max_id"] + 1
+    manifest["max_id"] += count
+    save_partition_manifest(manifest)
+    return first_id
+
+def record_partition_append(manifest, key, new_id):
+    """Update manifest statistics after a row was appended to a partition"""
+    info = manifest["partitions"][key]
+    info["rows"] += 1
+    info["min_id"] = new_id if info["min_id"] is None else min(info["min_id"], new_id)
+    info["max_id"] = max(info["max_id"], new_id)
+    manifest["max_id"] = max(manifest["max_id"], new_id)
+
+def partition_transaksi(granularity="year"):
+    """Split transaksi_zakat.xlsx into per-year or per-month workbooks plus a manifest"""
+    if daemon_blocks("Partisi transaksi") or layout_blocks("Partisi transaksi"):
+        return False
+    try:
+        if granularity not in ("year", "month"):
+            print("Error: Granularitas harus 'year' atau 'month'")
+            return False
+        if load_partition_manifest() is not None:
+            print("Transaksi sudah dipartisi")
+            return False
+        if not checkpoint_wal():
+            return False
+        
+        rows = list(read_batch(TRANSAKSI_ZAKAT_FILE, Transaksi).rows())
+        groups = {}
+        for row in rows:
+            groups.setdefault(partition_key(row[5], granularity), []).append(row)
+        
+        manifest = {"granularity": granularity, "max_id": 0, "partitions": {}}
+        for key, part_rows in sorted(groups.items()):
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet(f"Transaksi {key}")
+            ws.append(TRANSAKSI_HEADERS)
+            for row in part_rows:
+                ws.append(list(row))
+            wb.save(partition_file(key))
+            ids = [int(row[0]) for row in part_rows]
+            manifest["partitions"][key] = {"file": partition_file(key), "rows": len(part_rows),
+                                           "min_id": min(ids), "max_id": max(ids)}
+            manifest["max_id"] = max(manifest["max_id"], max(ids))
+        save_partition_manifest(manifest)
+        
+        # Keep the original as a backup so it is not mistaken for live data
+        if os.path.exists(TRANSAKSI_ZAKAT_FILE):
+            os.replace(TRANSAKSI_ZAKAT_FILE, "transaksi_zakat_sebelum_partisi.xlsx")
+        bump_data_version("transaksi")
+        print(f"{len(rows)} transaksi dipartisi ke {len(groups)} file ({granularity})")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error partisi transaksi: {str(e)}")
+        return False
+
+def layout_blocks(action):
+    """Operations that swap the transaction storage cannot run on the single workbook"""
+    if not single_workbook():
+        return False
+    print(f"Error: {action} tidak bisa dilakukan pada workbook gabungan. "
+          f"Jalankan --migrate-split-files dulu.")
+    return True
+
+def migrate_to_single_workbook():
+    """Move the per-dataset xlsx files into WORKBOOK_FILE
+
+    The old files are kept as <name>_sebelum_gabung.xlsx so they are not
+    mistaken for live data.
+    """
+    if daemon_blocks("Migrasi ke workbook gabungan"):
+        return False
+    try:
+        if single_workbook():
+            print(f"Data sudah memakai workbook gabungan {WORKBOOK_FILE}")
+            return False
+        if USE_TRANSAKSI_LEDGER or load_partition_manifest() is not None:
+            print("Error: Workbook gabungan membutuhkan transaksi dalam satu file xlsx (bukan ledger/partisi)")
+            return False
+        initialize_files()  # Creates missing files and checkpoints the WAL
+        
+        batches = {file_path: read_file_batch(file_path, SHEET_RECORDS[file_path])
+                   for file_path in WORKBOOK_SHEETS}
+        write_single_workbook({file_path: batch.rows() for file_path, batch in batches.items()})
+        for file_path in WORKBOOK_SHEETS:
+            os.replace(file_path, file_path.replace(".xlsx", "_sebelum_gabung.xlsx"))
+        bump_data_version(*DATASET_FILES)
+        counts = ", ".join(f"{len(batches[f])} {title}" for f, (title, _) in WORKBOOK_SHEETS.items())
+        print(f"Data dipindahkan ke {WORKBOOK_FILE}: {counts}")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error migrasi ke workbook gabungan: {str(e)}")
+        return False
+
+def migrate_to_split_files():
+    """Write every sheet of WORKBOOK_FILE back to its own xlsx file
+
+    The workbook is kept as <name>_sebelum_pisah.xlsx.
+    """
+    if daemon_blocks("Migrasi ke file terpisah"):
+        return False
+    try:
+        if not single_workbook():
+            print("Data sudah memakai file terpisah per dataset")
+            return False
+        if not checkpoint_wal():
+            return False
+        
+        batches = {file_path: read_file_batch(file_path, SHEET_RECORDS[file_path])
+                   for file_path in WORKBOOK_SHEETS}
+        for file_path, (title, headers) in WORKBOOK_SHEETS.items():
+            write_sheets(file_path, [(title, headers, batches[file_path].rows())])
+        os.replace(WORKBOOK_FILE, WORKBOOK_FILE.replace(".xlsx", "_sebelum_pisah.xlsx"))
+        bump_data_version(*DATASET_FILES)
+        print(f"Data dipindahkan dari {WORKBOOK_FILE} ke {len(batches)} file terpisah")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error migrasi ke file terpisah: {str(e)}")
+        return False
+
+def read_transaksi_batch(start=None, end=None):
+    """Transactions as a RecordBatch, opening only the partitions in the date range"""
+    manifest = load_partition_manifest()
+    if manifest is None:
+        files = [TRANSAKSI_ZAKAT_FILE]
+    else:
+        files = [info["file"] for _, info in partitions_in_range(manifest, start, end)]
+    
+    start = parse_date(start) if start else None
+    end = parse_date(end) if end else None
+    result = RecordBatch(Transaksi.FIELDS)
+    for file_path in files:
+        batch = read_batch(file_path, Transaksi)
+        if start is None and end is None:
+            for target, source in zip(result.columns, batch.columns):
+                target.extend(source)
+            continue
+        for row in batch.rows():
+            tanggal = parse_date(row[5])
+            if (start is None or tanggal >= start) and (end is None or tanggal <= end):
+                for target, value in zip(result.columns, row):
+                    target.append(value)
+    return result
+
+_reference_index = {"data": None, "dirty": False}
+
+def current_transaksi_max_id():
+    """Highest transaction ID in whichever storage is active"""
+    if _daemon["client"] is not None:
+        return _daemon["client"].call("max_id", TRANSAKSI_ZAKAT_FILE)
+    if USE_TRANSAKSI_LEDGER:
+        if not os.path.exists(TRANSAKSI_LEDGER_FILE):
+            return 0
+        with TransaksiLedger() as ledger:
+            return len(ledger)
+    manifest = load_partition_manifest()
+    if manifest is not None:
+        return manifest["max_id"]
+    return get_next_id(TRANSAKSI_ZAKAT_FILE) - 1
+
+def rebuild_reference_index():
+    """Count transactions per id_zakat and id_beras with one full scan"""
+    zakat_counts = {}
+    beras_counts = {}
+    max_id = 0
+    if USE_TRANSAKSI_LEDGER:
+        rows = load_dataset_rows("transaksi")
+    else:
+        rows = read_transaksi_batch().rows()
+    for row in rows:
+        zakat_counts[row[1]] = zakat_counts.get(row[1], 0) + 1
+        beras_counts[row[2]] = beras_counts.get(row[2], 0) + 1
+        max_id = max(max_id, int(row[0]))
+    max_id = max(max_id, current_transaksi_max_id())  # Archived IDs above the live ones count as seen
+    _reference_index["data"] = {"max_id": max_id, "zakat": zakat_counts, "beras": beras_counts}
+    _reference_index["dirty"] = True
+    return _reference_index["data"]
+
+def get_reference_index():
+    """Load the persisted reverse index, rebuilding it if transactions moved on without it"""
+    if _reference_index["data"] is not None:
+        return _reference_index["data"]
+    if os.path.exists(REFERENCE_INDEX_FILE):
+        with open(REFERENCE_INDEX_FILE, "r", encoding="utf-8") as f:
+            stored = json.load(f)
+        if stored.get("max_id") == current_transaksi_max_id():
+            # JSON object keys are strings; IDs are ints everywhere else
+            _reference_index["data"] = {
+                "max_id": stored["max_id"],
+                "zakat": {int(k): v for k, v in stored["zakat"].items()},
+                "beras": {int(k): v for k, v in stored["beras"].items()},
+            }
+            return _reference_index["data"]
+    return rebuild_reference_index()
+
+def record_transaksi_reference(new_id, id_zakat, id_beras):
+    """Incrementally count a newly added transaction"""
+    if _daemon["client"] is not None:
+        return  # The daemon keeps the counts
+    index = get_reference_index()
+    if new_id <= index["max_id"]:
+        return  # Already included by a rebuild that saw this row
+    index["zakat"][id_zakat] = index["zakat"].get(id_zakat, 0) + 1
+    index["beras"][id_beras] = index["beras"].get(id_beras, 0) + 1
+    index["max_id"] = new_id
+    _reference_index["dirty"] = True
+
+def count_transaksi_references(kind, id):
+    """Number of transactions referencing a zakat ('zakat') or beras ('beras') ID"""
+    if _daemon["client"] is not None:
+        return _daemon["client"].call("references", kind, id)
+    return get_reference_index()[kind].get(id, 0)
+
+def save_reference_index():
+    """Persist the reverse index when it changed"""
+    if _reference_index["data"] is None or not _reference_index["dirty"]:
+        return
+    try:
+        tmp_path = REFERENCE_INDEX_FILE + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(_reference_index["data"], f)
+        os.replace(tmp_path, REFERENCE_INDEX_FILE)
+        _reference_index["dirty"] = False
+    except Exception as e:
+        print(f"Peringatan: gagal menyimpan index referensi: {str(e)}")
+
+def invalidate_reference_index():
+    """Drop the reverse index after transactions were changed outside add_transaksi_zakat"""
+    _reference_index["data"] = None
+    _reference_index["dirty"] = False
+    if os.path.exists(REFERENCE_INDEX_FILE):
+        os.remove(REFERENCE_INDEX_FILE)
+
+_archive_summary = {"key": None, "data": None}
+
+def load_archive_summary():
+    """Archive bookkeeping: per-season totals and the highest archived ID per file"""
+    key = os.path.getmtime(ARCHIVE_SUMMARY_FILE) if os.path.exists(ARCHIVE_SUMMARY_FILE) else None
+    if _archive_summary["data"] is None or _archive_summary["key"] != key:
+        data = {}
+        if key is not None:
+            with open(ARCHIVE_SUMMARY_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        data.setdefault("max_id", {})
+        data.setdefault("musim", {})
+        _archive_summary["data"] = data
+        _archive_summary["key"] = key
+    return _archive_summary["data"]
+
+def save_archive_summary(summary):
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    tmp_path = ARCHIVE_SUMMARY_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(tmp_path, ARCHIVE_SUMMARY_FILE)
+    _archive_summary["data"] = None
+
+def archive_file(file_path, tahun):
+    base = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(ARCHIVE_DIR, f"{base}_{tahun}.jsonl.gz")
+
+def archived_seasons():
+    return sorted(int(tahun) for tahun in load_archive_summary()["musim"])
+
+def iter_archive(file_path, tahun):
+    """Stream archived rows of one season (tanggal as YYYY-MM-DD strings)"""
+    path = archive_file(file_path, tahun)
+    if not os.path.exists(path):
+        return
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+def archived_ids(file_path):
+    """IDs of every archived row of a file, across all seasons"""
+    return {int(row[0]) for tahun in archived_seasons() for row in iter_archive(file_path, tahun)}
+
+def append_archive(file_path, tahun, rows):
+    """Add rows to a season archive; rows already archived (same ID) are skipped"""
+    existing = {row[0] for row in iter_archive(file_path, tahun)}
+    new_rows = [row for row in rows if row[0] not in existing]
+    if not new_rows:
+        return
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    # Appending a gzip member keeps earlier members readable as one stream
+    with gzip.open(archive_file(file_path, tahun), "at", encoding="utf-8") as f:
+        for row in new_rows:
+            f.write(json.dumps([format_date(v) if isinstance(v, date) else v for v in row]) + "\n")
+    with open(archive_file(file_path, tahun), "rb") as f:
+        os.fsync(f.fileno())
+
+def rewrite_rows(file_path, title, headers, rows):
+    """Replace a workbook's data rows in one atomic write-only save
+
+    On the single workbook the other sheets are written back from their
+    cached batches.
+    """
+    if storage_file(file_path) != file_path:
+        tables = {f: read_file_batch(f, SHEET_RECORDS[f]).rows() for f in WORKBOOK_SHEETS}
+        tables[file_path] = rows
+        write_single_workbook(tables)
+        return
+    write_sheets(file_path, [(title, headers, rows)])
+
+def summarize_season(tahun):
+    """Totals of one archived season, computed from the archive files"""
+    per_jenis = {}
+    pembayar = 0
+    for row in iter_archive(ZAKAT_DATA_FILE, tahun):
+        entry = per_jenis.setdefault(str(row[2]).strip().capitalize(), {"pembayar": 0, "jumlah": 0.0})
+        entry["pembayar"] += 1
+        entry["jumlah"] += float(row[3] or 0)
+        pembayar += 1
+    transaksi = {"jumlah": 0, "total_beras_kg": 0.0, "total_harga": 0.0}
+    for row in iter_archive(TRANSAKSI_ZAKAT_FILE, tahun):
+        transaksi["jumlah"] += 1
+        transaksi["total_beras_kg"] += float(row[3] or 0)
+        transaksi["total_harga"] += float(row[4] or 0)
+    return {"pembayar": pembayar, "per_jenis_zakat": per_jenis, "transaksi": transaksi,
+            "diarsipkan_pada": datetime.now().isoformat(timespec="seconds")}
+
+def archive_season(tahun):
+    """Move one closed season's transactions and payers from the live files to the archive
+
+    Payers stay live while any of their transactions is outside the season.
+    Archive files are written (and fsynced) before the live files are
+    rewritten, and archiving the same rows twice is harmless, so a crash in
+    between can simply be retried.
+    """
+    if daemon_blocks("Arsip musim"):
+        return False
+    try:
+        tahun = int(tahun)
+        if tahun >= date.today().year:
+            print("Error: Hanya musim yang sudah lewat yang bisa diarsipkan")
+            return False
+        if USE_TRANSAKSI_LEDGER:
+            print("Error: Arsip membutuhkan transaksi dalam format xlsx. Konversi ledger ke Excel dulu.")
+            return False
+        if not checkpoint_wal():
+            return False
+        
+        def in_season(value):
+            try:
+                return parse_date(value).year == tahun
+            except (ValueError, TypeError):
+                return False
+        
+        summary = load_archive_summary()
+        max_ids = summary["max_id"]
+        
+        # Transactions: whole partitions of the season, or the rows of the season
+        moved_transaksi = 0
+        manifest = load_partition_manifest()
+        if manifest is not None:
+            archived_files = []
+            for key in [k for k in manifest["partitions"] if k.startswith(str(tahun))]:
+                info = manifest["partitions"][key]
+                rows = list(read_file_batch(info["file"], Transaksi).rows())
+                append_archive(TRANSAKSI_ZAKAT_FILE, tahun, rows)
+                moved_transaksi += len(rows)
+                archived_files.append(info["file"])
+                del manifest["partitions"][key]
+            # The manifest stops pointing at the files before they are removed;
+            # a crash in between only leaves orphan workbooks behind
+            save_partition_manifest(manifest)
+            for file_path in archived_files:
+                os.remove(file_path)
+        elif os.path.exists(storage_file(TRANSAKSI_ZAKAT_FILE)):
+            rows = list(read_file_batch(TRANSAKSI_ZAKAT_FILE, Transaksi).rows())
+            moved = [row for row in rows if in_season(row[5])]
+            if moved:
+                append_archive(TRANSAKSI_ZAKAT_FILE, tahun, moved)
+                max_ids[TRANSAKSI_ZAKAT_FILE] = max([max_ids.get(TRANSAKSI_ZAKAT_FILE, 0)] +
+                                                    [int(row[0]) for row in rows])
+                rewrite_rows(TRANSAKSI_ZAKAT_FILE, "Transaksi Zakat", TRANSAKSI_HEADERS,
+                             (row for row in rows if not in_season(row[5])))
+                moved_transaksi = len(moved)
+        invalidate_reference_index()
+        
+        # Payers of the season that no live transaction refers to any more
+        rows = list(read_file_batch(ZAKAT_DATA_FILE, Zakat).rows())
+        moved = [row for row in rows if in_season(row[4]) and count_transaksi_references("zakat", row[0]) == 0]
+        if moved:
+            append_archive(ZAKAT_DATA_FILE, tahun, moved)
+            max_ids[ZAKAT_DATA_FILE] = max([max_ids.get(ZAKAT_DATA_FILE, 0)] + [int(row[0]) for row in rows])
+            moved_ids = {row[0] for row in moved}
+            rewrite_rows(ZAKAT_DATA_FILE, "Zakat Data", ["ID", "Nama", "Jenis Zakat", "Jumlah", "Tanggal"],
+                         (row for row in rows if row[0] not in moved_ids))
+        kept = sum(1 for row in rows if in_season(row[4])) - len(moved)
+        
+        summary["musim"][str(tahun)] = summarize_season(tahun)
+        save_archive_summary(summary)
+        bump_data_version("zakat", "transaksi")
+        print(f"Musim {tahun} diarsipkan: {len(moved)} data zakat, {moved_transaksi} transaksi")
+        if kept:
+            print(f"{kept} data zakat tetap aktif karena masih punya transaksi di luar musim {tahun}")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error mengarsipkan musim: {str(e)}")
+        return False
+
+def query_archive(tahun, dataset="zakat", prefix=None):
+    """Archived rows of a season on demand; zakat rows can be filtered by name prefix"""
+    file_path = ZAKAT_DATA_FILE if dataset == "zakat" else TRANSAKSI_ZAKAT_FILE
+    key = fold_name(prefix) if prefix else None
+    for row in iter_archive(file_path, tahun):
+        if key is None or (dataset == "zakat" and fold_name(row[1]).startswith(key)):
+            yield row
+
+def view_archive_summary():
+    """Print the kept totals of every archived season"""
+    musim = load_archive_summary()["musim"]
+    if not musim:
+        print("Belum ada musim yang diarsipkan")
+        return
+    print("\nRingkasan Musim Terarsip:")
+    print("-" * 80)
+    print(f"{'Tahun':<6} | {'Pembayar':<9} | {'Jenis Zakat':<25} | {'Transaksi':<9} | {'Beras (kg)':<10} | {'Total Harga':<15}")
+    print("-" * 80)
+    for tahun in sorted(musim):
+        info = musim[tahun]
+        jenis = ", ".join(f"{k} {v['pembayar']}" for k, v in sorted(info["per_jenis_zakat"].items()))
+        t = info["transaksi"]
+        print(f"{tahun:<6} | {info['pembayar']:<9} | {jenis:<25} | {t['jumlah']:<9} | "
+              f"{t['total_beras_kg']:<10.2f} | Rp {t['total_harga']:,.2f}")
+
+def input_cari_arsip():
+    """Look up archived payers of one season"""
+    seasons = archived_seasons()
+    if not seasons:
+        print("Belum ada musim yang diarsipkan")
+        return
+    tahun = input(f"Tahun musim ({', '.join(map(str, seasons))}): ").strip()
+    if not tahun.isdigit() or int(tahun) not in seasons:
+        print("Error: Musim tersebut tidak ada di arsip")
+        return
+    prefix = input("Awalan nama (kosongkan untuk semua): ").strip()
+    rows = list(islice(query_archive(int(tahun), "zakat", prefix), PAGE_SIZE))
+    if not rows:
+        print("Tidak ada data yang cocok")
+        return
+    print(f"{'ID':<5} | {'Nama':<20} | {'Jenis Zakat':<15} | {'Jumlah':<12} | {'Tanggal':<10}")
+    print("-" * 75)
+    for row in rows:
+        print(f"{row[0]:<5} | {row[1]:<20} | {row[2]:<15} | {row[3]:<12} | {row[4]:<10}")
+    if len(rows) == PAGE_SIZE:
+        print(f"(hanya {PAGE_SIZE} data pertama yang ditampilkan, persempit dengan awalan nama)")
+
+def fold_name(text):
+    """Normalize a name for lookups: case- and diacritic-insensitive, single spaces"""
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+def remove_sorted(keys, ids, key, id):
+    """Remove the (key, id) pair from parallel sorted lists"""
+    for position in range(bisect_left(keys, key), bisect_right(keys, key)):
+        if ids[position] == id:
+            del keys[position]
+            del ids[position]
+            return
+
+class ZakatIndex:
+    """In-memory search indexes over zakat_data
+
+    Folded names are kept in a sorted list so a prefix query is two bisects,
+    every word of a name in a second one for type-ahead, dates in a third for
+    range queries, and jenis_zakat in a hash map.
+    """
+
+    def __init__(self, batch):
+        self.records = batch.index_by("id", Zakat)
+        names = sorted((fold_name(z.nama), z.id) for z in self.records.values())
+        self.name_keys = [n for n, _ in names]
+        self.name_ids = [i for _, i in names]
+        words = sorted((word, id) for name, id in names for word in name.split()[1:])
+        self.word_keys = [w for w, _ in words]
+        self.word_ids = [i for _, i in words]
+        dates = []
+        for z in self.records.values():
+            try:
+                dates.append((parse_date(z.tanggal), z.id))
+            except (ValueError, TypeError):
+                continue
+        dates.sort()
+        self.date_keys = [d for d, _ in dates]
+        self.date_ids = [i for _, i in dates]
+        self.by_jenis = {}
+        for z in self.records.values():
+            self.by_jenis.setdefault(str(z.jenis_zakat).casefold(), set()).add(z.id)
+
+    def add(self, z):
+        """Insert one new record without rebuilding the index"""
+        self.records[z.id] = z
+        name = fold_name(z.nama)
+        for key, keys, ids in [(name, self.name_keys, self.name_ids)] + \
+                [(word, self.word_keys, self.word_ids) for word in name.split()[1:]]:
+            position = bisect_right(keys, key)
+            keys.insert(position, key)
+            ids.insert(position, z.id)
+        try:
+            position = bisect_right(self.date_keys, parse_date(z.tanggal))
+            self.date_keys.insert(position, parse_date(z.tanggal))
+            self.date_ids.insert(position, z.id)
+        except (ValueError, TypeError):
+            pass
+        self.by_jenis.setdefault(str(z.jenis_zakat).casefold(), set()).add(z.id)
+
+    def remove(self, id):
+        """Drop one record without rebuilding the index"""
+        z = self.records.pop(id, None)
+        if z is None:
+            return
+        name = fold_name(z.nama)
+        for key, keys, ids in [(name, self.name_keys, self.name_ids)] + \
+                [(word, self.word_keys, self.word_ids) for word in name.split()[1:]]:
+            remove_sorted(keys, ids, key, id)
+        try:
+            remove_sorted(self.date_keys, self.date_ids, parse_date(z.tanggal), id)
+        except (ValueError, TypeError):
+            pass
+        self.by_jenis.get(str(z.jenis_zakat).casefold(), set()).discard(id)
+
+    def apply(self, entries):
+        """Replay WAL-style entries (append/update/delete), like apply_wal_entries"""
+        for entry in entries:
+            id, values = entry["id"], entry.get("values")
+            if entry["op"] == "append" and values is not None and id not in self.records:
+                self.add(Zakat(*values))
+            elif entry["op"] == "update" and values is not None and id in self.records:
+                self.remove(id)
+                self.add(Zakat(*values))
+            elif entry["op"] == "delete":
+                self.remove(id)
+
+    def lookup(self, prefix, limit=10):
+        """Type-ahead: up to limit payers whose name, then any word of it, starts with prefix"""
+        key = fold_name(prefix)
+        found = []
+        if not key:
+            return found
+        seen = set()
+        for keys, ids in ((self.name_keys, self.name_ids), (self.word_keys, self.word_ids)):
+            for i in range(bisect_left(keys, key), len(keys)):
+                if len(found) >= limit or not keys[i].startswith(key):
+                    break
+                if ids[i] not in seen:
+                    seen.add(ids[i])
+                    found.append(self.records[ids[i]])
+        return found
+
+    def ids_by_prefix(self, prefix):
+        prefix = fold_name(prefix)
+        lo = bisect_left(self.name_keys, prefix)
+        hi = bisect_left(self.name_keys, prefix + "\U0010ffff", lo)
+        return self.name_ids[lo:hi]
+
+    def ids_by_date(self, start=None, end=None):
+        lo = 0 if start is None else bisect_left(self.date_keys, start)
+        hi = len(self.date_keys) if end is None else bisect_right(self.date_keys, end)
+        return self.date_ids[lo:hi]
+
+    def ids_by_jenis(self, jenis):
+        return self.by_jenis.get(jenis.casefold(), set())
+
+    def search(self, prefix=None, start=None, end=None, jenis=None):
+        """Return Zakat records matching every given criterion, ordered by name"""
+        candidates = None
+        if jenis:
+            candidates = set(self.ids_by_jenis(jenis))
+        if start is not None or end is not None:
+            ids = set(self.ids_by_date(start, end))
+            candidates = ids if candidates is None else candidates & ids
+        ordered = self.ids_by_prefix(prefix) if prefix else self.name_ids
+        if candidates is None:
+            return [self.records[i] for i in ordered]
+        return [self.records[i] for i in ordered if i in candidates]
+
+_zakat_index_cache = {"mtime": None, "index": None}
+
+def storage_key(file_path):
+    """Changes whenever the rows of a file change: daemon version, or mtime plus pending WAL entries"""
+    if _daemon["client"] is not None:
+        return _daemon["client"].call("version", file_path)
+    target = storage_file(file_path)
+    mtime = os.path.getmtime(target) if os.path.exists(target) else None
+    return (mtime, len(wal_entries(file_path)))
+
+def zakat_index_key():
+    return storage_key(ZAKAT_DATA_FILE)
+
+def zakat_index_changes(key):
+    """(entries logged since key, new key), or None when only a rebuild will do
+
+    Pending WAL entries (or the daemon's change log) are replayed into the
+    index; a rewritten file (another process saving or checkpointing) or a
+    log that no longer reaches back to key needs a full reload.
+    """
+    if _daemon["client"] is not None:
+        if not isinstance(key, int):
+            return None
+        result = _daemon["client"].call("changes", ZAKAT_DATA_FILE, key)
+        if result is None:
+            return None
+        column = wal_date_column(ZAKAT_DATA_FILE)
+        for entry in result["entries"]:
+            if entry["values"] is not None and entry["values"][column]:
+                entry["values"][column] = parse_date(entry["values"][column])
+        return result["entries"], result["version"]
+    if not isinstance(key, tuple):
+        return None
+    mtime, applied = key
+    target = storage_file(ZAKAT_DATA_FILE)
+    entries = wal_entries(ZAKAT_DATA_FILE)
+    if (os.path.getmtime(target) if os.path.exists(target) else None) != mtime or len(entries) < applied:
+        return None
+    return entries[applied:], (mtime, len(entries))
+
+def get_zakat_index():
+    """Return the ZakatIndex, replaying new mutations into it instead of reloading zakat_data"""
+    index = _zakat_index_cache["index"]
+    changes = zakat_index_changes(_zakat_index_cache["mtime"]) if index is not None else None
+    if changes is None:
+        key = zakat_index_key()
+        index = ZakatIndex(read_batch(ZAKAT_DATA_FILE, Zakat))
+    else:
+        entries, key = changes
+        index.apply(entries)
+    _zakat_index_cache["index"] = index
+    _zakat_index_cache["mtime"] = key
+    return index
+
+def zakat_index_checkpointed(mtime, entries):
+    """Keep the index across a checkpoint that folded entries into zakat_data (saved at mtime before)"""
+    key = _zakat_index_cache["mtime"]
+    if _zakat_index_cache["index"] is None or not isinstance(key, tuple):
+        return
+    if key[0] != mtime or key[1] > len(entries):
+        _zakat_index_cache["index"] = None
+        return
+    _zakat_index_cache["index"].apply(entries[key[1]:])
+    _zakat_index_cache["mtime"] = zakat_index_key()
+
+def lookup_payers(prefix, limit=10):
+    """Top payer matches for a (partial) name, for type-ahead selection"""
+    return get_zakat_index().lookup(prefix, limit)
+
+def pick_zakat():
+    """Let the user narrow down payers by typing part of a name, then pick an ID
+
+    Returns the chosen Zakat record, or None when cancelled with an empty input.
+    """
+    index = get_zakat_index()
+    if not index.records:
+        print("Belum ada data zakat. Tambahkan data zakat terlebih dahulu.")
+        return None
+    while True:
+        text = input("\nKetik nama pembayar untuk mencari, atau ID (kosong = batal): ").strip()
+        if not text:
+            return None
+        if text.isdigit():
+            zakat = get_zakat_index().records.get(int(text))
+            if zakat is not None:
+                return zakat
+            print(f"Error: ID zakat {text} tidak ditemukan!")
+            continue
+        matches = lookup_payers(text)
+        if not matches:
+            print("Tidak ada pembayar yang cocok")
+            continue
+        if len(matches) == 1:
+            z = matches[0]
+            if input(f"Pilih {z.id} - {z.nama} ({z.jenis_zakat})? (y/n): ").strip().lower() == "y":
+                return z
+            continue
+        print(f"{'ID':<5} | {'Nama':<25} | {'Jenis Zakat':<15}")
+        print("-" * 50)
+        for z in matches:
+            print(f"{z.id:<5} | {z.nama:<25} | {z.jenis_zakat:<15}")
+
+def search_zakat(prefix=None, start=None, end=None, jenis=None):
+    """Search zakat data by name prefix, date range (inclusive) and jenis zakat"""
+    try:
+        start = parse_date(start) if start else None
+        end = parse_date(end) if end else None
+    except ValueError:
+        print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+        return []
+    try:
+        return get_zakat_index().search(prefix or None, start, end, jenis or None)
+    except Exception as e:
+        print(f"Error mencari data zakat: {str(e)}")
+        return []
+
+def input_cari_zakat():
+    """Search zakat data from user input"""
+    print("\nCari Data Zakat (kosongkan untuk mengabaikan kriteria)")
+    prefix = input("Awalan nama: ").strip()
+    jenis = input("Jenis zakat: ").strip()
+    start = input("Dari tanggal (YYYY-MM-DD): ").strip()
+    end = input("Sampai tanggal (YYYY-MM-DD): ").strip()
+    
+    results = search_zakat(prefix, start, end, jenis)
+    if not results:
+        print("Tidak ada data yang cocok")
+        return
+    
+    print(f"\nDitemukan {len(results)} data:")
+    print("-" * 75)
+    print(f"{'ID':<5} | {'Nama':<20} | {'Jenis Zakat':<15} | {'Jumlah':<12} | {'Tanggal':<10}")
+    print("-" * 75)
+    for z in results:
+        print(f"{z.id:<5} | {z.nama:<20} | {z.jenis_zakat:<15} | {z.jumlah:<12} | {format_date(z.tanggal):<10}")
+
+class PriceHistory:
+    """Per-beras price timelines answering "what was the price on date X"
+
+    Effective dates are kept as sorted YYYYMMDD integers next to their
+    prices, so a lookup is a bisect per beras. Before the first entry the
+    master_beras price applies; several entries on one day keep the last.
+    """
+
+    def __init__(self, beras, history):
+        self.base = dict(zip(beras.column("id"), beras.column("harga_per_kg")))
+        self.dates = {}
+        self.prices = {}
+        entries = sorted(zip(history.column("id_beras"),
+                             (date_to_int(d) for d in history.column("berlaku_mulai")),
+                             history.column("id"), history.column("harga_per_kg")))
+        for id_beras, day, _, harga in entries:
+            dates = self.dates.setdefault(id_beras, [])
+            prices = self.prices.setdefault(id_beras, [])
+            if dates and dates[-1] == day:
+                prices[-1] = harga  # Later correction for the same day wins
+            else:
+                dates.append(day)
+                prices.append(harga)
+
+    def price_as_of(self, id_beras, tanggal):
+        """Price per kg valid on tanggal, or None for an unknown beras"""
+        dates = self.dates.get(id_beras)
+        if dates:
+            i = bisect_right(dates, date_to_int(tanggal)) - 1
+            if i >= 0:
+                return self.prices[id_beras][i]
+        return self.base.get(id_beras)
+
+    def totals(self, id_beras, jumlah_beras, tanggal):
+        """total_harga for whole columns at once; None where the price is unknown
+
+        With numpy every beras is priced by one searchsorted over its
+        timeline; without it each row falls back to price_as_of.
+        """
+        if np is None:
+            result = []
+            for b, kg, t in zip(id_beras, jumlah_beras, tanggal):
+                harga = self.price_as_of(b, t)
+                result.append(None if harga is None or kg is None else harga * kg)
+            return result
+        id_beras = np.asarray(id_beras, dtype=np.int64)
+        jumlah = np.asarray(jumlah_beras, dtype=float)
+        days = np.fromiter((date_to_int(t) for t in tanggal), dtype=np.int64, count=len(id_beras))
+        result = np.full(len(id_beras), np.nan)
+        for b in np.unique(id_beras):
+            mask = id_beras == b
+            base = self.base.get(int(b))
+            table = np.array([np.nan if base is None else base] + self.prices.get(int(b), []), dtype=float)
+            dates = np.array(self.dates.get(int(b), []), dtype=np.int64)
+            result[mask] = table[np.searchsorted(dates, days[mask], side="right")] * jumlah[mask]
+        return [None if np.isnan(v) else float(v) for v in result]
+
+_price_history_cache = {"key": None, "history": None}
+
+def get_price_history():
+    """Return the PriceHistory, rebuilding it only when the beras or price files changed"""
+    key = tuple(storage_key(f) for f in (MASTER_BERAS_FILE, HARGA_BERAS_FILE))
+    if _price_history_cache["history"] is None or _price_history_cache["key"] != key:
+        history = read_batch(HARGA_BERAS_FILE, HargaBeras) if os.path.exists(storage_file(HARGA_BERAS_FILE)) \
+            else RecordBatch(HargaBeras.FIELDS)
+        _price_history_cache["history"] = PriceHistory(read_batch(MASTER_BERAS_FILE, Beras), history)
+        _price_history_cache["key"] = key
+    return _price_history_cache["history"]
+
+def add_harga_beras(id_beras, harga_per_kg, berlaku_mulai, reprice=True):
+    """Record a beras price valid from berlaku_mulai and reprice the affected transactions"""
+    if reprice and daemon_blocks("Ubah harga beras"):
+        return False
+    try:
+        try:
+            id_beras = int(id_beras)
+            harga_per_kg = float(harga_per_kg)
+        except (ValueError, TypeError):
+            print("Error: ID beras dan harga harus berupa angka")
+            return False
+        if harga_per_kg <= 0:
+            print("Error: Harga harus lebih besar dari 0")
+            return False
+        if not validate_date(berlaku_mulai):
+            print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+            return False
+        if find_record(MASTER_BERAS_FILE, Beras, id_beras) is None:
+            print(f"Error: ID beras {id_beras} tidak ditemukan!")
+            return False
+        
+        with wal_lock():
+            new_id = get_next_id(HARGA_BERAS_FILE)
+            row = [new_id, id_beras, harga_per_kg, parse_date(berlaku_mulai)]
+            if USE_WAL:
+                wal_append("append", HARGA_BERAS_FILE, new_id, row)
+            else:
+                wb, ws = open_sheet(HARGA_BERAS_FILE)
+                ws.append(row)
+                save_sheet(wb, HARGA_BERAS_FILE)
+        bump_data_version("harga")
+        print(f"Harga beras {id_beras} Rp {harga_per_kg:,.2f} berlaku mulai {berlaku_mulai}")
+        
+        if reprice:
+            return reprice_transaksi(id_beras, berlaku_mulai)
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error menambahkan harga beras: {str(e)}")
+        return False
+
+def reprice_transaksi(id_beras=None, start=None):
+    """Recompute total_harga from the price history for one beras (or all) from a date on
+
+    Totals are computed column-wise per file and only changed rows are
+    written back, each file in one atomic save.
+    """
+    if daemon_blocks("Hitung ulang transaksi"):
+        return False
+    try:
+        start = parse_date(start) if start else None
+        history = get_price_history()
+        
+        def affected(ids, beras_col, tanggal_col):
+            return [i for i, (b, t) in enumerate(zip(beras_col, tanggal_col))
+                    if ids[i] is not None and (id_beras is None or b == id_beras)
+                    and (start is None or parse_date(t) >= start)]
+        
+        def changes(ids, beras_col, kg_col, total_col, tanggal_col):
+            rows = affected(ids, beras_col, tanggal_col)
+            new_totals = history.totals([beras_col[i] for i in rows], [kg_col[i] for i in rows],
+                                        [tanggal_col[i] for i in rows])
+            return {ids[i]: total for i, total in zip(rows, new_totals)
+                    if total is not None and abs(total - (total_col[i] or 0)) > 0.005}
+        
+        changed_ids = []
+        if USE_TRANSAKSI_LEDGER:
+            if not os.path.exists(TRANSAKSI_LEDGER_FILE):
+                print("Belum ada data transaksi zakat")
+                return True
+            with TransaksiLedger() as ledger:
+                cols = list(zip(*ledger.iter_rows())) or [[]] * 6
+                updates = changes(list(cols[0]), cols[2], cols[3], cols[4], cols[5])
+                for id, total in updates.items():
+                    ledger.set_total(id, total)
+            changed_ids.extend(updates)
+        else:
+            if not checkpoint_wal():
+                return False
+            manifest = load_partition_manifest()
+            if manifest is None:
+                files = [TRANSAKSI_ZAKAT_FILE]
+            else:
+                files = [info["file"] for _, info in partitions_in_range(manifest, start, None)]
+            for file_path in files:
+                batch = read_file_batch(file_path, Transaksi)
+                updates = changes(batch.column("id"), batch.column("id_beras"), batch.column("jumlah_beras"),
+                                  batch.column("total_harga"), batch.column("tanggal"))
+                if not updates:
+                    continue
+                wb, ws = open_sheet(file_path)
+                for (cell,) in ws.iter_rows(min_row=2, max_col=1):
+                    if cell.value in updates:
+                        ws.cell(row=cell.row, column=5, value=updates[cell.value])
+                save_sheet(wb, file_path)
+                changed_ids.extend(updates)
+        
+        mark_export_changes("transaksi", changed_ids)
+        if changed_ids:
+            bump_data_version("transaksi")
+        print(f"{len(changed_ids)} transaksi dihitung ulang dengan harga yang berlaku")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error menghitung ulang transaksi: {str(e)}")
+        return False
+
+def view_harga_beras(id_beras):
+    """Show the price timeline of one beras"""
+    try:
+        key = ("harga", id_beras, date.today()) + data_versions("beras", "harga")
+        lines = render_cache_get(key)
+        if lines is None:
+            beras = find_record(MASTER_BERAS_FILE, Beras, id_beras)
+            if beras is None:
+                print(f"Error: ID beras {id_beras} tidak ditemukan!")
+                return
+            history = get_price_history()
+            lines = [f"\nRiwayat Harga {beras.nama_beras}:", "-" * 40,
+                     f"{'Berlaku Mulai':<15} | {'Harga per Kg':<15}", "-" * 40,
+                     f"{'(awal)':<15} | {beras.harga_per_kg:<15.2f}"]
+            for day, harga in zip(history.dates.get(id_beras, []), history.prices.get(id_beras, [])):
+                lines.append(f"{int_to_date(day):<15} | {harga:<15.2f}")
+            lines.append("-" * 40)
+            lines.append(f"Harga hari ini: Rp {history.price_as_of(id_beras, date.today()):,.2f}")
+            render_cache_put(key, lines)
+        print("\n".join(lines))
+    except Exception as e:
+        print(f"Error menampilkan riwayat harga: {str(e)}")
+
+def input_master_beras():
+    """Input new master beras data from user"""
+    print("\nTambah Data Master Beras")
+    while True:
+        nama_beras = input("Masukkan nama jenis beras (min 3 karakter): ").strip()
+        if len(nama_beras) >= 3:
+            break
+        print("Error: Nama beras harus minimal 3 karakter")
+    
+    while True:
+        harga_input = input("Masukkan harga per kg (contoh: 15000): ").strip()
+        try:
+            harga_per_kg = float(harga_input)
             if harga_per_kg > 0:
                 break
             print("Error: Harga harus lebih besar dari 0")
@@ -469,6 +3250,36 @@ def input_master_beras():
     if add_beras(nama_beras, harga_per_kg):
         print("Data master beras berhasil ditambahkan!")
 
+def input_harga_beras():
+    """Ask for a new effective-dated beras price"""
+    print("\nUbah Harga Beras")
+    view_master_beras(paged=False)
+    while True:
+        id_beras_input = input("\nMasukkan ID beras: ").strip()
+        try:
+            id_beras = int(id_beras_input)
+            if id_beras > 0:
+                break
+            print("Error: ID harus lebih besar dari 0")
+        except ValueError:
+            print("Error: Masukkan angka ID yang valid")
+    view_harga_beras(id_beras)
+    while True:
+        harga_input = input("Masukkan harga baru per kg: ").strip()
+        try:
+            harga_per_kg = float(harga_input)
+            if harga_per_kg > 0:
+                break
+            print("Error: Harga harus lebih besar dari 0")
+        except ValueError:
+            print("Error: Masukkan angka yang valid")
+    while True:
+        berlaku_mulai = input("Berlaku mulai tanggal (YYYY-MM-DD): ").strip()
+        if validate_date(berlaku_mulai):
+            break
+        print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+    add_harga_beras(id_beras, harga_per_kg, berlaku_mulai)
+
 def input_zakat_data():
     """Input zakat data from user"""
     print("\nTambah Data Zakat")
@@ -507,34 +3318,14 @@ def input_transaksi_zakat():
     """Input zakat transaction from user"""
     print("\nTambah Transaksi Zakat")
     
-    # Show available zakat data
-    try:
-        if os.path.exists(ZAKAT_DATA_FILE):
-            wb = load_workbook(ZAKAT_DATA_FILE)
-            ws = wb.active
-            if ws.max_row > 1:
-                print("\nDaftar Zakat Tersedia:")
-                print("-" * 60)
-                print(f"{'ID':<5} | {'Nama':<20} | {'Jenis Zakat':<15} | {'Jumlah':<10}")
-                print("-" * 60)
-                for row in ws.iter_rows(min_row=2, values_only=True):
-                    if row and row[0] is not None:
-                        print(f"{row[0]:<5} | {row[1]:<20} | {row[2]:<15} | {row[3]:<10}")
-    except Exception:
-        pass
-    
-    while True:
-        id_zakat_input = input("\nMasukkan ID zakat: ").strip()
-        try:
-            id_zakat = int(id_zakat_input)
-            if id_zakat > 0:
-                break
-            print("Error: ID harus lebih besar dari 0")
-        except ValueError:
-            print("Error: Masukkan angka ID yang valid")
+    # Type-ahead lookup instead of listing every payer
+    zakat = pick_zakat()
+    if zakat is None:
+        return
+    id_zakat = zakat.id
     
     # Show available beras data
-    view_master_beras()
+    view_master_beras(paged=False)
     
     while True:
         id_beras_input = input("\nMasukkan ID beras: ").strip()
@@ -564,6 +3355,332 @@ def input_transaksi_zakat():
     
     add_transaksi_zakat(id_zakat, id_beras, jumlah_beras, tanggal)
 
+def input_fitrah_batch():
+    """Input a household roster file for the batch fitrah calculator"""
+    print("\nHitung Zakat Fitrah per Keluarga")
+    print(f"Roster (xlsx/csv) berisi kolom: {', '.join(ROSTER_HEADERS)}")
+    print(f"Setiap jiwa membayar {FITRAH_KG_PER_JIWA} kg beras")
+    roster_path = input("Masukkan path file roster: ").strip().strip('"')
+    
+    while True:
+        tanggal = input("Masukkan tanggal transaksi (YYYY-MM-DD): ").strip()
+        if validate_date(tanggal):
+            break
+        print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+    
+    add_fitrah_batch(roster_path, tanggal)
+
+def input_periode_transaksi():
+    """Ask for a date range and show the transactions in it"""
+    print("\nLihat Transaksi per Periode (kosongkan untuk tanpa batas)")
+    while True:
+        start = input("Dari tanggal (YYYY-MM-DD): ").strip()
+        if not start or validate_date(start):
+            break
+        print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+    while True:
+        end = input("Sampai tanggal (YYYY-MM-DD): ").strip()
+        if not end or validate_date(end):
+            break
+        print("Error: Format tanggal tidak valid. Gunakan format YYYY-MM-DD")
+    view_transaksi_zakat(start or None, end or None)
+
+# Desk daemon. The daemon process loads the workbooks once and keeps every
+# row in memory. Connection threads answer reads directly; mutations go
+# through one queue to a single writer thread, which logs a whole batch of
+# them to the WAL with one fsync (group commit), applies them in memory and
+# saves the changed workbooks every DAEMON_FLUSH_SECONDS. Desks that find the
+# socket route read_batch/get_next_id/wal_append/... to it, so the menus and
+# functions stay the same.
+DAEMON_RECORDS = {ZAKAT_DATA_FILE: Zakat, MASTER_BERAS_FILE: Beras,
+                  HARGA_BERAS_FILE: HargaBeras, TRANSAKSI_ZAKAT_FILE: Transaksi}
+_daemon = {"client": None}
+
+class DaemonClient:
+    """Line-delimited JSON requests to the desk daemon over its Unix socket"""
+
+    def __init__(self, path=DAEMON_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.reader = self.sock.makefile("r", encoding="utf-8")
+        self.lock = threading.Lock()
+        self.batches = {}  # file_path -> (version, RecordBatch)
+
+    def call(self, op, *args):
+        request = json.dumps({"op": op, "args": args}, default=format_date) + "\n"
+        with self.lock:
+            self.sock.sendall(request.encode("utf-8"))
+            line = self.reader.readline()
+        if not line:
+            raise ConnectionError("Koneksi ke daemon terputus")
+        reply = json.loads(line)
+        if not reply["ok"]:
+            raise RuntimeError(reply["error"])
+        return reply["result"]
+
+    def batch(self, file_path, record_cls=None):
+        """Rows of a file as a RecordBatch, fetched again only when its version moved"""
+        version = self.call("version", file_path)
+        cached = self.batches.get(file_path)
+        if cached is None or cached[0] != version:
+            result = self.call("rows", file_path)
+            column = wal_date_column(file_path)
+            rows = []
+            for row in result["rows"]:
+                if column is not None and row[column]:
+                    row[column] = parse_date(row[column])
+                rows.append(row)
+            cached = (result["version"], RecordBatch.from_rows(DAEMON_RECORDS[file_path].FIELDS, rows))
+            self.batches[file_path] = cached
+        return cached[1]
+
+def daemon_running():
+    """True when a daemon is listening on DAEMON_SOCKET"""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(DAEMON_SOCKET):
+        return False
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(DAEMON_SOCKET)
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+def connect_daemon():
+    """Route this desk's storage calls to a running daemon, if there is one"""
+    if not daemon_running():
+        return False
+    try:
+        _daemon["client"] = DaemonClient()
+        return True
+    except OSError:
+        return False
+
+def daemon_blocks(action):
+    """Operations that rewrite files directly cannot run while the daemon owns them"""
+    if _daemon["client"] is None and not daemon_running():
+        return False
+    print(f"Error: {action} tidak bisa dilakukan selama daemon berjalan. Hentikan daemon dulu.")
+    return True
+
+class DeskDaemon:
+    """In-memory owner of the workbooks; mutations are applied by one writer thread"""
+
+    def __init__(self):
+        self.lock = threading.Lock()  # Guards the tables between readers and the writer
+        self.queue = queue.Queue()
+        self.tables = {}    # file_path -> {id: row}
+        self.layout = {}    # file_path -> (sheet title, header row)
+        self.versions = {}
+        self.changes = {}   # file_path -> deque of (version, op, id, row after the change)
+        self.next_ids = {}
+        self.references = {"zakat": {}, "beras": {}}
+        self.dirty = set()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        for file_path, record_cls in DAEMON_RECORDS.items():
+            wb, ws = open_sheet(file_path, read_only=True)
+            self.layout[file_path] = (ws.title, list(next(ws.iter_rows(max_row=1, values_only=True))))
+            wb.close()
+            self.tables[file_path] = {row[0]: row for row in read_file_batch(file_path, record_cls).rows()}
+            self.versions[file_path] = 0
+            self.changes[file_path] = deque(maxlen=DAEMON_CHANGE_LOG)
+            self.next_ids[file_path] = get_next_id(file_path)
+        for row in self.tables[TRANSAKSI_ZAKAT_FILE].values():
+            self.count_reference(row, 1)
+
+    def count_reference(self, row, delta):
+        for kind, value in (("zakat", row[1]), ("beras", row[2])):
+            counts = self.references[kind]
+            counts[value] = counts.get(value, 0) + delta
+
+    def dispatch(self, op, args):
+        """Answer one desk request"""
+        if op in ("apply", "flush"):
+            reply = queue.Queue(maxsize=1)
+            self.queue.put((op, args, reply))
+            ok, result = reply.get()
+            if not ok:
+                raise RuntimeError(result)
+            return result
+        with self.lock:
+            if op == "rows":
+                return {"version": self.versions[args[0]], "rows": list(self.tables[args[0]].values())}
+            if op == "version":
+                return self.versions[args[0]]
+            if op == "versions":
+                return dict(self.versions)
+            if op == "changes":
+                # Mutations after a version, or None once the log no longer reaches back to it
+                file_path, since = args
+                log = self.changes[file_path]
+                version = self.versions[file_path]
+                if since > version or (since < version and (not log or log[0][0] > since + 1)):
+                    return None
+                return {"version": version,
+                        "entries": [{"op": op, "id": id, "values": row}
+                                    for v, op, id, row in log if v > since]}
+            if op == "reserve_id":
+                new_id = self.next_ids[args[0]]
+                self.next_ids[args[0]] += 1
+                return new_id
+            if op == "max_id":
+                return max(self.tables[args[0]], default=0)
+            if op == "references":
+                return self.references[args[0]].get(args[1], 0)
+        raise ValueError(f"Operasi tidak dikenal: {op}")
+
+    def apply(self, op, file_path, id, values):
+        """Apply one WAL-style mutation to the in-memory rows (caller holds the lock)"""
+        rows = self.tables[file_path]
+        if values is not None:
+            column = wal_date_column(file_path)
+            values = list(values)
+            if column is not None and values[column]:
+                values[column] = parse_date(values[column])
+        old = rows.get(id)
+        apply_wal_entries(rows, [{"op": op, "id": id, "values": values}])
+        if file_path == TRANSAKSI_ZAKAT_FILE and rows.get(id) is not old:
+            if old is not None:
+                self.count_reference(old, -1)
+            if id in rows:
+                self.count_reference(rows[id], 1)
+        self.versions[file_path] += 1
+        self.changes[file_path].append((self.versions[file_path], op, id, rows.get(id)))
+        self.next_ids[file_path] = max(self.next_ids[file_path], id + 1)
+        self.dirty.add(file_path)
+        self.pending += 1
+
+    def flush(self):
+        """Save the changed workbooks from memory, then start the WAL over"""
+        single = single_workbook()
+        with self.lock:
+            # The single workbook is rewritten whole, straight from memory
+            files = set(self.tables) if single and self.dirty else self.dirty
+            snapshot = {f: sorted(self.tables[f].values(), key=lambda row: row[0]) for f in files}
+            self.dirty.clear()
+            self.pending = 0
+        self.last_flush = time.monotonic()
+        try:
+            if single and snapshot:
+                write_single_workbook(snapshot)
+            elif not single:
+                for file_path, rows in snapshot.items():
+                    title, headers = self.layout[file_path]
+                    rewrite_rows(file_path, title, headers, rows)
+        except Exception as e:
+            # The WAL still holds every mutation, so nothing is lost; retry later
+            print(f"Error menyimpan workbook: {str(e)}")
+            with self.lock:
+                self.dirty.update(snapshot)
+            return False
+        with open(WAL_FILE, "w", encoding="utf-8") as f:
+            f.flush()
+            os.fsync(f.fileno())
+        return True
+
+    def run_writer(self):
+        """Writer thread: group-commit queued mutations and flush on schedule"""
+        while True:
+            try:
+                batch = [self.queue.get(timeout=DAEMON_FLUSH_SECONDS)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < DAEMON_GROUP_COMMIT:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            results = []
+            mutations = [(args, reply) for op, args, reply in batch if op == "apply"]
+            try:
+                if mutations:
+                    with open(WAL_FILE, "a", encoding="utf-8") as f:
+                        for (op, file_path, id, values), _ in mutations:
+                            entry = {"op": op, "file": file_path, "id": id}
+                            if values is not None:
+                                entry["values"] = values
+                            f.write(json.dumps(entry) + "\n")
+                        f.flush()
+                        os.fsync(f.fileno())
+                with self.lock:
+                    for args, reply in mutations:
+                        try:
+                            self.apply(*args)
+                            results.append((reply, (True, True)))
+                        except Exception as e:
+                            results.append((reply, (False, str(e))))
+            except OSError as e:
+                results = [(reply, (False, f"WAL gagal ditulis: {e}")) for _, reply in mutations]
+            
+            flush_requested = any(op in ("flush", "stop") for op, _, _ in batch)
+            due = self.dirty and time.monotonic() - self.last_flush >= DAEMON_FLUSH_SECONDS
+            flushed = True
+            if flush_requested or due or self.pending >= DAEMON_FLUSH_MUTATIONS:
+                flushed = self.flush()
+            for op, _, reply in batch:
+                if op != "apply":
+                    results.append((reply, (True, flushed)))
+            for reply, result in results:
+                reply.put(result)
+            if any(op == "stop" for op, _, _ in batch):
+                return
+
+    def stop(self):
+        """Flush everything and end the writer thread"""
+        reply = queue.Queue(maxsize=1)
+        self.queue.put(("stop", None, reply))
+        return reply.get()[1]
+
+class DaemonRequestHandler(socketserver.StreamRequestHandler):
+    """One desk connection: a JSON request per line, a JSON reply per line"""
+
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+                reply = {"ok": True, "result": self.server.desk_daemon.dispatch(request["op"], request["args"])}
+            except Exception as e:
+                reply = {"ok": False, "error": str(e)}
+            self.wfile.write((json.dumps(reply, default=format_date) + "\n").encode("utf-8"))
+
+def run_daemon():
+    """Serve desks over DAEMON_SOCKET until interrupted"""
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: Mode daemon membutuhkan Unix socket")
+        return False
+    if USE_TRANSAKSI_LEDGER or load_partition_manifest() is not None:
+        print("Error: Mode daemon membutuhkan transaksi dalam satu file xlsx (bukan ledger/partisi)")
+        return False
+    if daemon_running():
+        print("Error: Daemon sudah berjalan")
+        return False
+    if os.path.exists(DAEMON_SOCKET):
+        os.remove(DAEMON_SOCKET)  # Left behind by a daemon that crashed
+    
+    initialize_files()  # Also checkpoints a WAL left by a crash
+    desk_daemon = DeskDaemon()
+    writer = threading.Thread(target=desk_daemon.run_writer, daemon=True)
+    writer.start()
+    server = socketserver.ThreadingUnixStreamServer(DAEMON_SOCKET, DaemonRequestHandler)
+    server.daemon_threads = True
+    server.desk_daemon = desk_daemon
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    print(f"Daemon melayani meja di {DAEMON_SOCKET} (Ctrl+C untuk berhenti)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(DAEMON_SOCKET):
+            os.remove(DAEMON_SOCKET)
+        desk_daemon.stop()
+        print("Daemon berhenti, semua perubahan sudah disimpan")
+    return True
+
 def main_menu():
     """Display main menu"""
     print("\n" + "="*50)
@@ -573,7 +3690,8 @@ def main_menu():
     print("2. Kelola Master Beras")
     print("3. Kelola Transaksi Zakat")
     print("4. Ekspor Data")
-    print("5. Keluar")
+    print("5. Arsip Musim")
+    print("6. Keluar")
 
 def zakat_menu():
     """Display zakat management menu"""
@@ -583,7 +3701,8 @@ def zakat_menu():
     print("1. Tambah Data Zakat")
     print("2. Edit Data Zakat")
     print("3. Hapus Data Zakat")
-    print("4. Kembali ke Menu Utama")
+    print("4. Cari Data Zakat")
+    print("5. Kembali ke Menu Utama")
 
 def beras_menu():
     """Display beras management menu"""
@@ -592,7 +3711,9 @@ def beras_menu():
     print("="*50)
     print("1. Tambah Data Beras")
     print("2. Lihat Data Beras")
-    print("3. Kembali ke Menu Utama")
+    print("3. Ubah Harga (Berlaku Mulai Tanggal)")
+    print("4. Hitung Ulang Total Transaksi")
+    print("5. Kembali ke Menu Utama")
 
 def transaksi_menu():
     """Display transaction management menu"""
@@ -601,19 +3722,54 @@ def transaksi_menu():
     print("="*50)
     print("1. Tambah Transaksi Zakat")
     print("2. Lihat Transaksi Zakat")
-    print("3. Kembali ke Menu Utama")
+    print("3. Konversi Transaksi ke Ledger Biner")
+    print("4. Konversi Ledger Biner ke Excel")
+    print("5. Lihat Transaksi per Periode")
+    print("6. Partisi Transaksi per Tahun/Bulan")
+    print("7. Hitung Zakat Fitrah per Keluarga (Roster)")
+    print("8. Kembali ke Menu Utama")
+
+def ekspor_menu():
+    """Display export menu"""
+    print("\n" + "="*50)
+    print("EKSPOR DATA".center(50))
+    print("="*50)
+    print("1. Ekspor Lengkap Data Zakat")
+    print("2. Ekspor Inkremental (Perubahan Saja)")
+    print("3. Konsolidasi File Delta")
+    print("4. Ekspor Paralel Semua Data")
+    print("5. Lihat Progres Ekspor Latar")
+    print("6. Batalkan Ekspor Latar")
+    print("7. Kembali ke Menu Utama")
+
+def arsip_menu():
+    """Display season archive menu"""
+    print("\n" + "="*50)
+    print("ARSIP MUSIM".center(50))
+    print("="*50)
+    print("1. Arsipkan Musim yang Sudah Ditutup")
+    print("2. Ringkasan Musim Terarsip")
+    print("3. Cari Pembayar di Arsip")
+    print("4. Kembali ke Menu Utama")
 
 def main():
-    initialize_files()
+    if connect_daemon():
+        print(f"Terhubung ke daemon ({DAEMON_SOCKET}); data dilayani dari memori daemon")
+    else:
+        initialize_files()
+        atexit.register(checkpoint_wal)  # Fold the WAL into the xlsx files on exit
+        atexit.register(save_reference_index)
     
     while True:
+        report_finished_exports()
         main_menu()
-        choice = input("Pilih menu (1-5): ").strip()
+        choice = input("Pilih menu (1-6): ").strip()
         
         if choice == "1":  # Kelola Data Zakat
             while True:
+                report_finished_exports()
                 zakat_menu()
-                sub_choice = input("Pilih opsi (1-4): ").strip()
+                sub_choice = input("Pilih opsi (1-5): ").strip()
                 
                 if sub_choice == "1":  # Tambah Data Zakat
                     input_zakat_data()
@@ -633,7 +3789,9 @@ def main():
                         delete_zakat(id_zakat)
                     except Exception as e:
                         print(f"Error: {str(e)}")
-                elif sub_choice == "4":  # Kembali
+                elif sub_choice == "4":  # Cari Data Zakat
+                    input_cari_zakat()
+                elif sub_choice == "5":  # Kembali
                     break
                 else:
                     print("Pilihan tidak valid. Silakan coba lagi.")
@@ -641,40 +3799,106 @@ def main():
         elif choice == "2":  # Kelola Master Beras
             while True:
                 beras_menu()
-                sub_choice = input("Pilih opsi (1-3): ").strip()
+                sub_choice = input("Pilih opsi (1-5): ").strip()
                 
                 if sub_choice == "1":  # Tambah Data Beras
                     input_master_beras()
                 elif sub_choice == "2":  # Lihat Data Beras
                     view_master_beras()
-                elif sub_choice == "3":  # Kembali
+                elif sub_choice == "3":  # Ubah Harga
+                    input_harga_beras()
+                elif sub_choice == "4":  # Hitung Ulang
+                    reprice_transaksi()
+                elif sub_choice == "5":  # Kembali
                     break
                 else:
                     print("Pilihan tidak valid. Silakan coba lagi.")
         
         elif choice == "3":  # Kelola Transaksi Zakat
             while True:
+                report_finished_exports()
                 transaksi_menu()
-                sub_choice = input("Pilih opsi (1-3): ").strip()
+                sub_choice = input("Pilih opsi (1-8): ").strip()
                 
                 if sub_choice == "1":  # Tambah Transaksi
                     input_transaksi_zakat()
                 elif sub_choice == "2":  # Lihat Transaksi
                     view_transaksi_zakat()
-                elif sub_choice == "3":  # Kembali
+                elif sub_choice == "3":  # Konversi ke Ledger
+                    convert_xlsx_to_ledger()
+                elif sub_choice == "4":  # Konversi ke Excel
+                    convert_ledger_to_xlsx()
+                elif sub_choice == "5":  # Lihat per Periode
+                    input_periode_transaksi()
+                elif sub_choice == "6":  # Partisi
+                    granularity = input("Partisi per tahun atau bulan? (tahun/bulan): ").strip().lower()
+                    partition_transaksi("month" if granularity == "bulan" else "year")
+                elif sub_choice == "7":  # Zakat Fitrah per Keluarga
+                    input_fitrah_batch()
+                elif sub_choice == "8":  # Kembali
                     break
                 else:
                     print("Pilihan tidak valid. Silakan coba lagi.")
         
         elif choice == "4":  # Ekspor Data
-            export_to_excel()
+            while True:
+                report_finished_exports()
+                ekspor_menu()
+                sub_choice = input("Pilih opsi (1-7): ").strip()
+                
+                if sub_choice == "1":  # Ekspor Lengkap
+                    start_export_job("lengkap", export_to_excel)
+                elif sub_choice == "2":  # Ekspor Inkremental
+                    start_export_job("inkremental", export_incremental)
+                elif sub_choice == "3":  # Konsolidasi Delta
+                    consolidate_deltas()
+                elif sub_choice == "4":  # Ekspor Paralel
+                    start_export_job("paralel", export_parallel)
+                elif sub_choice == "5":  # Progres Ekspor
+                    view_export_jobs()
+                elif sub_choice == "6":  # Batalkan Ekspor
+                    cancel_export_job(input("ID ekspor yang akan dibatalkan: ").strip())
+                elif sub_choice == "7":  # Kembali
+                    break
+                else:
+                    print("Pilihan tidak valid. Silakan coba lagi.")
+        
+        elif choice == "5":  # Arsip Musim
+            while True:
+                arsip_menu()
+                sub_choice = input("Pilih opsi (1-4): ").strip()
+                
+                if sub_choice == "1":  # Arsipkan Musim
+                    tahun = input("Tahun musim yang sudah ditutup (YYYY): ").strip()
+                    if tahun.isdigit():
+                        archive_season(int(tahun))
+                    else:
+                        print("Error: Tahun harus berupa angka")
+                elif sub_choice == "2":  # Ringkasan
+                    view_archive_summary()
+                elif sub_choice == "3":  # Cari di Arsip
+                    input_cari_arsip()
+                elif sub_choice == "4":  # Kembali
+                    break
+                else:
+                    print("Pilihan tidak valid. Silakan coba lagi.")
         
-        elif choice == "5":  # Keluar
+        elif choice == "6":  # Keluar
+            wait_export_jobs()
             print("Terima kasih telah menggunakan Sistem Manajemen Zakat.")
             break
         
         else:
-            print("Pilihan tidak valid. Silakan pilih 1-5.")
+            print("Pilihan tidak valid. Silakan pilih 1-6.")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if "--benchmark-export" in sys.argv:
+        benchmark_export_parallel()
+    elif "--migrate-single-workbook" in sys.argv:
+        migrate_to_single_workbook()
+    elif "--migrate-split-files" in sys.argv:
+        migrate_to_split_files()
+    elif "--daemon" in sys.argv:
+        run_daemon()
+    else:
+        main()
\ No newline at end of file
@@ -0,0 +1,369 @@
+"""Sinkronisasi dua arah antara ledger xlsx (uts openpyxl.py) dan MySQL (uts mysql.py)
+
+Setiap baris diringkas menjadi hash isi. Status sinkronisasi terakhir
+(pemetaan ID lokal <-> ID MySQL dan hash per sisi) disimpan di
+SYNC_STATE_FILE, sehingga hanya baris yang ditambah, diubah atau dihapus
+sejak sinkronisasi terakhir yang dikirim. Jika baris yang sama berubah di
+kedua sisi, data MySQL (kantor pusat) yang dipakai.
+
+Jalankan dari folder yang berisi file xlsx meja:
+    python "uts sync.py"
+    python "uts sync.py" --lokasi 2   # meja milik lokasi 2
+
+Pembayar dan transaksi hanya disinkronkan dengan data lokasi meja ini.
+"""
+import os
+import sys
+import json
+import hashlib
+import importlib.util
+from datetime import datetime, date
+from decimal import Decimal
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SYNC_STATE_FILE = "sync_state.json"
+SYNC_BATCH_SIZE = 500
+
+def load_backend(module_name, filename):
+    """Memuat script backend (nama file mengandung spasi) sebagai modul"""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(BASE_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+xlsx = load_backend("uts_openpyxl", "uts openpyxl.py")
+db = load_backend("uts_mysql", "uts mysql.py")
+
+# Urutan penting: induk disinkronkan sebelum transaksi yang mereferensikannya
+SYNC_DATASETS = {
+    "beras": {
+        "file": xlsx.MASTER_BERAS_FILE, "record": xlsx.Beras, "table": "master_beras",
+        "columns": ["nama_beras", "harga_per_kg"], "refs": {},
+    },
+    "harga": {
+        "file": xlsx.HARGA_BERAS_FILE, "record": xlsx.HargaBeras, "table": "harga_beras",
+        "columns": ["id_beras", "harga_per_kg", "berlaku_mulai"], "refs": {"id_beras": "beras"},
+    },
+    "zakat": {
+        "file": xlsx.ZAKAT_DATA_FILE, "record": xlsx.Zakat, "table": "zakat_data",
+        "columns": ["nama", "jenis_zakat", "jumlah", "tanggal"], "refs": {}, "per_lokasi": True,
+    },
+    "transaksi": {
+        "file": xlsx.TRANSAKSI_ZAKAT_FILE, "record": xlsx.Transaksi, "table": "transaksi_zakat",
+        "columns": ["id_zakat", "id_beras", "jumlah_beras", "total_harga", "tanggal"],
+        "refs": {"id_zakat": "zakat", "id_beras": "beras"}, "per_lokasi": True,
+    },
+}
+
+JENIS_ZAKAT_MYSQL = {"fitrah": "Fitrah", "mal": "Mal", "maal": "Mal"}
+
+def normalize(value):
+    """Bentuk kanonik nilai agar hash xlsx dan MySQL bisa dibandingkan"""
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (float, Decimal)):
+        return round(float(value), 2)
+    if isinstance(value, str):
+        return value.strip()
+    return value
+
+def row_hash(values):
+    payload = json.dumps([normalize(v) for v in values], default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+def load_sync_state():
+    state = {}
+    if os.path.exists(SYNC_STATE_FILE):
+        with open(SYNC_STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    for dataset in SYNC_DATASETS:
+        entry = state.setdefault(dataset, {})
+        entry.setdefault("pairs", [])          # [id_lokal, id_mysql]
+        entry.setdefault("local_hash", {})     # id_lokal -> hash saat sinkron terakhir
+        entry.setdefault("remote_hash", {})    # id_mysql -> hash saat sinkron terakhir
+        entry.setdefault("archived_remote", [])  # id_mysql yang pasangan lokalnya sudah diarsipkan
+    return state
+
+def save_sync_state(state):
+    tmp_path = SYNC_STATE_FILE + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp_path, SYNC_STATE_FILE)
+
+def read_local(spec):
+    """id_lokal -> tuple nilai (tanpa ID) dari file xlsx"""
+    batch = xlsx.read_batch(spec["file"], spec["record"])
+    cols = [batch.column(name) for name in spec["record"].FIELDS[1:]]
+    return {int(id): values for id, values in zip(batch.column("id"), zip(*cols))
+            if isinstance(id, (int, float))}
+
+def read_remote(conn, spec):
+    """id_mysql -> tuple nilai (tanpa ID) dari tabel MySQL (hanya lokasi meja ini untuk tabel per lokasi)"""
+    if spec.get("per_lokasi"):
+        batch = db.fetch_batch(conn, f"SELECT id, {', '.join(spec['columns'])} FROM {spec['table']} "
+                                     f"WHERE id_lokasi = %s", (db.SITE_ID,))
+    else:
+        batch = db.fetch_batch(conn, f"SELECT id, {', '.join(spec['columns'])} FROM {spec['table']}")
+    cols = [batch.column(name) for name in spec["columns"]]
+    return dict(zip(batch.column("id"), zip(*cols)))
+
+def diff_side(current, mapped_ids, last_hash):
+    """Membandingkan kondisi sekarang dengan hash sinkron terakhir"""
+    inserted = [id for id in current if id not in mapped_ids]
+    updated = [id for id in current if id in mapped_ids and row_hash(current[id]) != last_hash.get(str(id))]
+    deleted = [id for id in mapped_ids if id not in current]
+    return inserted, updated, deleted
+
+def translate(spec, values, id_maps, direction):
+    """Mengganti ID referensi (id_zakat/id_beras) ke ID sisi tujuan"""
+    values = list(values)
+    for index, column in enumerate(spec["columns"]):
+        parent = spec["refs"].get(column)
+        if parent and values[index] is not None:
+            mapped = id_maps[parent][direction].get(int(values[index]))
+            if mapped is None:
+                raise ValueError(f"{column} {values[index]} belum tersinkron")
+            values[index] = mapped
+        elif column == "jenis_zakat" and direction == "l2r":
+            values[index] = JENIS_ZAKAT_MYSQL.get(str(values[index]).strip().casefold(), values[index])
+        elif column in ("tanggal", "berlaku_mulai"):
+            values[index] = xlsx.parse_date(values[index])
+        elif isinstance(values[index], Decimal):
+            values[index] = float(values[index])
+    return tuple(values)
+
+def referenced_ids(cursor, dataset, ids):
+    """ID induk yang masih dipakai baris anak di MySQL
+
+    migrasi_partisi melepas foreign key tabel berpartisi, jadi pemeriksaan
+    referensi sebelum menghapus dilakukan di sini, seperti delete_zakat.
+    """
+    per_lokasi = SYNC_DATASETS[dataset].get("per_lokasi")
+    found = set()
+    for child in SYNC_DATASETS.values():
+        for column, parent in child["refs"].items():
+            if parent != dataset:
+                continue
+            # ID zakat hanya unik per lokasi; ID beras berlaku di semua lokasi
+            lokasi = (db.SITE_ID,) if per_lokasi and child.get("per_lokasi") else ()
+            scope = " AND id_lokasi = %s" if lokasi else ""
+            for start in range(0, len(ids), SYNC_BATCH_SIZE):
+                chunk = list(ids[start:start + SYNC_BATCH_SIZE])
+                marks = ", ".join(["%s"] * len(chunk))
+                cursor.execute(f"SELECT DISTINCT {column} FROM {child['table']} "
+                               f"WHERE {column} IN ({marks}){scope}", chunk + list(lokasi))
+                found.update(int(row[0]) for row in cursor.fetchall())
+    return found
+
+def apply_remote(conn, dataset, inserts, updates, deletes):
+    """Menulis perubahan ke MySQL dalam batch; mengembalikan ID baru untuk inserts"""
+    spec = SYNC_DATASETS[dataset]
+    cursor = conn.cursor()
+    try:
+        columns = spec["columns"]
+        # Tabel per lokasi: baris baru milik lokasi meja ini, ubah/hapus tidak menyentuh lokasi lain
+        lokasi = (db.SITE_ID,) if spec.get("per_lokasi") else ()
+        insert_columns = (["id_lokasi"] if lokasi else []) + columns
+        placeholders = ", ".join(["%s"] * len(insert_columns))
+        insert_sql = f"INSERT INTO {spec['table']} ({', '.join(insert_columns)}) VALUES ({placeholders})"
+        scope = " AND id_lokasi = %s" if lokasi else ""
+        new_ids = []
+        for values in inserts:
+            cursor.execute(insert_sql, lokasi + tuple(values))  # Satu per satu agar lastrowid bisa dipetakan
+            new_ids.append(cursor.lastrowid)
+        for start in range(0, len(new_ids), SYNC_BATCH_SIZE):
+            chunk = new_ids[start:start + SYNC_BATCH_SIZE]
+            db.catat_outbox(cursor, dataset, "insert", f"id IN ({', '.join(['%s'] * len(chunk))})", chunk)
+
+        update_sql = (f"UPDATE {spec['table']} SET {', '.join(c + ' = %s' for c in columns)} "
+                      f"WHERE id = %s{scope}")
+        for start in range(0, len(updates), SYNC_BATCH_SIZE):
+            chunk = updates[start:start + SYNC_BATCH_SIZE]
+            cursor.executemany(update_sql, [tuple(values) + (id,) + lokasi for id, values in chunk])
+            ids = [id for id, _ in chunk]
+            db.catat_outbox(cursor, dataset, "update", f"id IN ({', '.join(['%s'] * len(ids))})", ids)
+
+        referenced = referenced_ids(cursor, dataset, deletes)
+        if referenced:
+            raise ValueError(f"{dataset} {sorted(referenced)} masih dipakai data lain di MySQL")
+        for start in range(0, len(deletes), SYNC_BATCH_SIZE):
+            chunk = deletes[start:start + SYNC_BATCH_SIZE]
+            marks = ", ".join(["%s"] * len(chunk))
+            db.catat_outbox(cursor, dataset, "delete", f"id IN ({marks})", chunk)
+            cursor.execute(f"DELETE FROM {spec['table']} WHERE id IN ({marks}){scope}", list(chunk) + list(lokasi))
+            if lokasi:
+                # Tombstone untuk ekspor inkremental, seperti delete_zakat
+                cursor.executemany("INSERT INTO ekspor_hapus (dataset, id_data, id_lokasi) VALUES (%s, %s, %s)",
+                                   [(dataset, id) + lokasi for id in chunk])
+        if inserts or updates or deletes:
+            db.bump_data_version(cursor, dataset)
+        conn.commit()
+        return new_ids
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def apply_local(spec, inserts, updates, deletes):
+    """Menulis perubahan ke file xlsx dengan satu kali load dan satu kali save
+
+    ID baru diambil dari xlsx.get_next_id, yang juga melewati ID yang sudah
+    diarsipkan dan ID di WAL. Kunci WAL dipegang sampai save selesai agar
+    meja lain tidak memakai ID yang sama atau checkpoint di tengah jalan.
+    """
+    if not (inserts or updates or deletes):
+        return []
+    with xlsx.wal_lock():
+        wb, ws = xlsx.open_sheet(spec["file"])
+        row_of = {}
+        for idx, (cell,) in enumerate(ws.iter_rows(min_row=2, max_col=1), start=2):
+            if isinstance(cell.value, (int, float)):
+                row_of[int(cell.value)] = idx
+
+        for id, values in updates:
+            for offset, value in enumerate(values, start=2):
+                ws.cell(row=row_of[id], column=offset, value=value)
+        for idx in sorted((row_of[id] for id in deletes if id in row_of), reverse=True):
+            ws.delete_rows(idx)
+        first_id = xlsx.get_next_id(spec["file"])
+        new_ids = list(range(first_id, first_id + len(inserts)))
+        for id, values in zip(new_ids, inserts):
+            ws.append([id] + list(values))
+        xlsx.save_sheet(wb, spec["file"])
+    return new_ids
+
+def sync_dataset(conn, dataset, state, id_maps):
+    """Sinkronisasi satu dataset; mengembalikan ringkasan jumlah perubahan"""
+    spec = SYNC_DATASETS[dataset]
+    entry = state[dataset]
+    l2r = {int(l): int(r) for l, r in entry["pairs"]}
+    r2l = {r: l for l, r in l2r.items()}
+    id_maps[dataset] = {"l2r": l2r, "r2l": r2l}
+
+    # Baris yang diarsipkan di meja bukan penghapusan: pasangannya dilepas dan
+    # baris MySQL-nya tidak disentuh maupun ditarik kembali
+    archived = xlsx.archived_ids(spec["file"])
+    archived_remote = set(entry["archived_remote"])
+    local = read_local(spec)
+    for l in [l for l in l2r if l in archived and l not in local]:
+        r = l2r.pop(l)
+        r2l.pop(r, None)
+        archived_remote.add(r)
+    entry["archived_remote"] = sorted(archived_remote)
+    remote = {r: values for r, values in read_remote(conn, spec).items() if r not in archived_remote}
+    l_ins, l_upd, l_del = diff_side(local, l2r, entry["local_hash"])
+    r_ins, r_upd, r_del = diff_side(remote, r2l, entry["remote_hash"])
+    r_upd_set, r_del_set = set(r_upd), set(r_del)
+
+    # Perubahan lokal -> MySQL (MySQL menang jika baris yang sama juga berubah di sana)
+    push_upd = [(l2r[l], translate(spec, local[l], id_maps, "l2r")) for l in l_upd
+                if l2r[l] not in r_upd_set and l2r[l] not in r_del_set]
+    push_del = [l2r[l] for l in l_del if l2r[l] not in r_upd_set and l2r[l] not in r_del_set]
+    # Induk yang masih dipakai di MySQL (misalnya transaksinya baru dihapus
+    # di dataset berikutnya) ditunda: pasangannya tetap, dicoba lagi nanti
+    cursor = conn.cursor()
+    try:
+        deferred = referenced_ids(cursor, dataset, push_del)
+    finally:
+        cursor.close()
+    push_del = [r for r in push_del if r not in deferred]
+    push_ins = [translate(spec, local[l], id_maps, "l2r") for l in l_ins]
+    new_remote = apply_remote(conn, dataset, push_ins, push_upd, push_del)
+    for l, r, values in zip(l_ins, new_remote, push_ins):
+        l2r[l], r2l[r] = r, l
+        remote[r] = values
+    for r, values in push_upd:
+        remote[r] = values
+    for r in push_del:
+        remote.pop(r, None)
+
+    # MySQL sudah commit: pasangan ID baru dan hash baris yang dikirim disimpan
+    # sekarang, sebelum workbook disentuh. Jika apply_local gagal (misalnya
+    # file sedang dibuka di Excel), baris yang sama tidak dikirim ulang.
+    local_hash, remote_hash = entry["local_hash"], entry["remote_hash"]
+    for l, r in zip(l_ins, new_remote):
+        local_hash[str(l)], remote_hash[str(r)] = row_hash(local[l]), row_hash(remote[r])
+    for r, values in push_upd:
+        local_hash[str(r2l[r])], remote_hash[str(r)] = row_hash(local[r2l[r]]), row_hash(values)
+    for r in push_del:
+        l = r2l.pop(r, None)
+        l2r.pop(l, None)
+        local_hash.pop(str(l), None)
+        remote_hash.pop(str(r), None)
+    entry["pairs"] = sorted(l2r.items())
+    save_sync_state(state)
+
+    # Perubahan MySQL -> lokal
+    pull_upd = [(r2l[r], translate(spec, remote[r], id_maps, "r2l")) for r in r_upd if r2l[r] in local]
+    pull_del = [r2l[r] for r in r_del]
+    pull_ins = [translate(spec, remote[r], id_maps, "r2l") for r in r_ins]
+    new_local = apply_local(spec, pull_ins, pull_upd, pull_del)
+    if dataset == "transaksi" and (new_local or pull_upd or pull_del):
+        xlsx.invalidate_reference_index()
+    for r, l, values in zip(r_ins, new_local, pull_ins):
+        l2r[l], r2l[r] = r, l
+        local[l] = values
+    for l, values in pull_upd:
+        local[l] = values
+    for l in pull_del:
+        local.pop(l, None)
+
+    # Hapus pasangan yang sudah tidak ada di kedua sisi, lalu simpan hash baru
+    for l in [l for l, r in l2r.items() if (l not in local and r not in deferred) or r not in remote]:
+        r2l.pop(l2r.pop(l), None)
+    entry["pairs"] = sorted(l2r.items())
+    entry["local_hash"] = {str(l): row_hash(local[l]) if l in local else local_hash[str(l)] for l in l2r}
+    entry["remote_hash"] = {str(r): row_hash(remote[r]) for r in r2l}
+    return {"ke_mysql": len(push_ins) + len(push_upd) + len(push_del),
+            "ke_xlsx": len(pull_ins) + len(pull_upd) + len(pull_del), "ditunda": len(deferred)}
+
+def sync_all():
+    """Sinkronisasi semua dataset antara file xlsx dan MySQL"""
+    if xlsx.USE_TRANSAKSI_LEDGER:
+        print("Error: Sinkronisasi membutuhkan transaksi dalam format xlsx. Konversi ledger ke Excel dulu.")
+        return False
+    if xlsx.load_partition_manifest() is not None:
+        print("Error: Sinkronisasi belum mendukung transaksi yang dipartisi.")
+        return False
+    if xlsx.daemon_running():
+        print("Error: Daemon meja sedang memegang file xlsx. Hentikan daemon dulu.")
+        return False
+    conn = db.create_database_connection()
+    if not conn:
+        return False
+    try:
+        xlsx.initialize_files()  # Also checkpoints the desk's WAL into the xlsx files
+        state = load_sync_state()
+        id_maps = {}
+        print("\nHasil sinkronisasi:")
+        deferred = []
+        for dataset in SYNC_DATASETS:
+            summary = sync_dataset(conn, dataset, state, id_maps)
+            save_sync_state(state)  # Simpan per dataset agar pemetaan ID tidak hilang jika gagal di tengah
+            print(f"- {dataset}: {summary['ke_mysql']} baris ke MySQL, {summary['ke_xlsx']} baris ke xlsx")
+            if summary["ditunda"]:
+                deferred.append(dataset)
+        # Ulangi sekali dataset yang penghapusannya ditunda: anak-anaknya sudah terkirim sekarang
+        for dataset in deferred:
+            summary = sync_dataset(conn, dataset, state, id_maps)
+            save_sync_state(state)
+            print(f"- {dataset} (ulang): {summary['ke_mysql']} baris ke MySQL, {summary['ke_xlsx']} baris ke xlsx")
+            if summary["ditunda"]:
+                print(f"  {summary['ditunda']} baris {dataset} tidak dihapus dari MySQL karena masih dipakai")
+        return True
+    except PermissionError:
+        print("Error: File sedang digunakan. Tutup file Excel terlebih dahulu.")
+        return False
+    except Exception as e:
+        print(f"Error sinkronisasi: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    if "--lokasi" in sys.argv:
+        db.SITE_ID = int(sys.argv[sys.argv.index("--lokasi") + 1])
+    sync_all()